@@ -5,18 +5,60 @@ Flask Frontend for XTTS, Chatterbox, Kokoro, OpenAudio
 With optimized presets for best voice cloning quality
 """
 
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g, has_request_context
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 import requests
 import base64
+import io
+import itertools
+import json
+import queue
+import re
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import sys
 import time
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+import pcm_wire
+import unix_http
+from tracing import TRACE_HEADER, Trace
 
 app = Flask(__name__)
+sock = Sock(app)
+
+# Prometheus metrics, scraped from /metrics
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 90, 180)
+HUB_REQUEST_SECONDS = Histogram("hub_request_seconds", "Hub request time by route", ["endpoint"],
+                                buckets=LATENCY_BUCKETS)
+HUB_IN_FLIGHT = Gauge("hub_requests_in_flight", "Hub requests being processed")
+UPSTREAM_SECONDS = Histogram("hub_upstream_seconds", "Engine call time (streams: until headers)",
+                             ["engine", "status"], buckets=LATENCY_BUCKETS)
+UPSTREAM_CHARS = Counter("hub_upstream_chars_total", "Characters sent to engines", ["engine"])
+HUB_RSS = Gauge("hub_process_rss_bytes", "Resident set size (peak on macOS)")
+
+# Traffic capture for benchmarks/replay_traffic.py: one JSON line per synthesis request.
+# Texts are only stored with CAPTURE_TEXT=1, otherwise just their length.
+CAPTURE_FILE = os.environ.get("CAPTURE_FILE", "")
+CAPTURE_TEXT = os.environ.get("CAPTURE_TEXT", "0") == "1"
+CAPTURED_ENDPOINTS = {"api_tts", "api_tts_stream", "api_compare", "talk", "compare", "openai_speech"}
+# Field that holds the text, if not "text"
+TEXT_FIELDS = {"openai_speech": "input"}
+capture_lock = threading.Lock()
+
+# One keep-alive session for all engine calls; also speaks unix:///path/engine.sock URLs
+engine_http = unix_http.session()
+
+# Engines that can send raw PCM (pcm_wire) instead of WAV; the hub wraps it at the edge
+PCM_ENGINES = {"xtts", "chatterbox"}
 
-# Server Configuration
+# Server Configuration (URLs overridable per engine, e.g. XTTS_URL for local stubs,
+# or XTTS_URL=unix:///tmp/tts-xtts.sock for a co-located engine)
 SERVERS = {
     "xtts": {
-        "url": "http://10.200.0.12:8766",
+        "url": os.environ.get("XTTS_URL", "http://10.200.0.12:8766"),
         "name": "XTTS v2",
         "desc": "Voice cloning, 16 languages",
         "port": 8766,
@@ -25,7 +67,7 @@ SERVERS = {
         "languages": ["en", "de", "fr", "es", "it", "pt", "pl", "tr", "ru", "nl", "cs", "ar", "zh", "ja", "ko", "hu"]
     },
     "chatterbox": {
-        "url": "http://10.200.0.12:8767",
+        "url": os.environ.get("CHATTERBOX_URL", "http://10.200.0.12:8767"),
         "name": "Chatterbox",
         "desc": "Expressive emotional speech",
         "port": 8767,
@@ -34,7 +76,7 @@ SERVERS = {
         "languages": ["en"]
     },
     "kokoro": {
-        "url": "http://10.200.0.12:8769",
+        "url": os.environ.get("KOKORO_URL", "http://10.200.0.12:8769"),
         "name": "Kokoro",
         "desc": "Fast, 11 preset voices",
         "port": 8769,
@@ -43,7 +85,7 @@ SERVERS = {
         "languages": ["en"]
     },
     "openaudio": {
-        "url": "http://10.200.0.12:8770",
+        "url": os.environ.get("OPENAUDIO_URL", "http://10.200.0.12:8770"),
         "name": "OpenAudio S1",
         "desc": "50+ emotions, 14 languages",
         "port": 8770,
@@ -209,6 +251,125 @@ OPENAUDIO_PRESETS = {
 }
 
 
+def process_rss():
+    """Current RSS from /proc (Linux), otherwise the peak from getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+HUB_RSS.set_function(process_rss)
+
+
+# Polling and static files would drown the trace log
+UNTRACED_ENDPOINTS = {None, "static", "metrics", "api_health", "api_voices", "api_languages"}
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.time()
+    # Trace ID goes to the engines in X-Trace-Id; a caller may supply its own
+    g.trace = Trace("hub", request.headers.get(TRACE_HEADER))
+    HUB_IN_FLIGHT.inc()
+
+
+@app.after_request
+def add_trace_header(response):
+    if "trace" in g:
+        response.headers[TRACE_HEADER] = g.trace.trace_id
+    g.response_status = response.status_code
+    return response
+
+
+def capture_request(elapsed, exc=None):
+    """Append the shape of the current request to CAPTURE_FILE"""
+    if request.method == "GET" and request.endpoint != "api_tts_stream":
+        return
+    data = request.get_json(silent=True)
+    body = "json"
+    if data is None:
+        data, body = (request.form, "form") if request.method == "POST" else (request.args, "query")
+    text_field = TEXT_FIELDS.get(request.endpoint, "text")
+    params = {k: v for k, v in dict(data).items() if k != text_field}
+    text = str(data.get(text_field, ""))
+    record = {
+        "ts": round(g.request_start, 3),
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "body": body,
+        "engine": params.get("engine") or OPENAI_MODELS.get(params.get("model"), params.get("model")),
+        "voice": params.get("voice"),
+        "language": params.get("language"),
+        "chars": len(text),
+        "params": params,
+        "status": 500 if exc else g.get("response_status"),
+        "seconds": round(elapsed, 3),
+        "trace_id": g.trace.trace_id,
+    }
+    if CAPTURE_TEXT:
+        record["text"] = text
+    with capture_lock:
+        with open(CAPTURE_FILE, "a") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+@app.teardown_request
+def finish_request_metrics(exc=None):
+    # Runs after streamed responses have finished, so streams count in full
+    if "request_start" in g:
+        elapsed = time.time() - g.request_start
+        HUB_IN_FLIGHT.dec()
+        HUB_REQUEST_SECONDS.labels(endpoint=request.endpoint or "unknown").observe(elapsed)
+        if request.endpoint not in UNTRACED_ENDPOINTS:
+            g.trace.add("request", g.request_start, elapsed, endpoint=request.endpoint,
+                        status="error" if exc else "ok")
+            g.trace.write()
+        if CAPTURE_FILE and request.endpoint in CAPTURED_ENDPOINTS:
+            capture_request(elapsed, exc)
+
+
+def engine_post(engine, path, payload, timeout, stream=False, trace=None):
+    """POST JSON to an engine server, timed per engine in /metrics and traced.
+    
+    Pass trace explicitly from worker threads, which have no request context.
+    """
+    if trace is None and has_request_context():
+        trace = g.get("trace")
+    headers = {TRACE_HEADER: trace.trace_id} if trace else {}
+    if engine in PCM_ENGINES and "format" not in payload:
+        headers["Accept"] = pcm_wire.ACCEPT
+    start = time.time()
+    status = "error"
+    try:
+        r = engine_http.post(f"{SERVERS[engine]['url']}{path}", json=payload, headers=headers,
+                          timeout=timeout, stream=stream)
+        status = str(r.status_code)
+        return r
+    finally:
+        elapsed = time.time() - start
+        UPSTREAM_SECONDS.labels(engine=engine, status=status).observe(elapsed)
+        UPSTREAM_CHARS.labels(engine=engine).inc(len(payload.get("text", "")))
+        if trace:
+            trace.add("upstream", start, elapsed, engine=engine, path=path, status=status,
+                      chars=len(payload.get("text", "")))
+
+
+def engine_audio(r):
+    """Audio bytes and content type of an engine response.
+    
+    Raw PCM from the engines is wrapped into WAV here, the only place that builds containers.
+    """
+    content_type = r.headers.get("Content-Type", "audio/wav")
+    if pcm_wire.is_pcm(content_type):
+        return pcm_wire.to_wav(r.content), "audio/wav"
+    return r.content, content_type
+
+
 def get_common_languages():
     """Get languages supported by ALL engines that support cloning"""
     clone_engines = [k for k, v in SERVERS.items() if v.get("supports_cloning")]
@@ -230,7 +391,7 @@ def get_all_languages():
     return sorted(list(all_langs))
 
 
-def generate_tts_for_engine(engine, text, language, voice=None):
+def generate_tts_for_engine(engine, text, language, voice=None, trace=None):
     """Generate TTS for a single engine with best clone settings"""
     server = SERVERS.get(engine)
     if not server:
@@ -240,7 +401,6 @@ def generate_tts_for_engine(engine, text, language, voice=None):
     if language not in server.get("languages", []):
         return {"engine": engine, "error": f"Language '{language}' not supported", "audio": None, "time": 0}
     
-    url = server["url"]
     settings = BEST_CLONE_SETTINGS.get(engine, {}).get("settings", {})
     clean_text = text.replace("\n", " ").replace("\r", "").strip()
     
@@ -250,7 +410,7 @@ def generate_tts_for_engine(engine, text, language, voice=None):
         if engine == "xtts":
             payload = {"text": clean_text, "language": language}
             payload["voice"] = voice if voice else "sven"  # Default voice
-            r = requests.post(f"{url}/tts", json=payload, timeout=120)
+            r = engine_post(engine, "/tts", payload, timeout=120, trace=trace)
             
         elif engine == "chatterbox":
             payload = {
@@ -260,7 +420,7 @@ def generate_tts_for_engine(engine, text, language, voice=None):
                 "temperature": settings.get("temperature", 0.3)
             }
             payload["voice"] = voice if voice else "sven"  # Default voice
-            r = requests.post(f"{url}/tts", json=payload, timeout=180)
+            r = engine_post(engine, "/tts", payload, timeout=180, trace=trace)
             
         elif engine == "kokoro":
             payload = {
@@ -268,7 +428,7 @@ def generate_tts_for_engine(engine, text, language, voice=None):
                 "voice": voice if voice else "af_heart",
                 "speed": settings.get("speed", 1.0)
             }
-            r = requests.post(f"{url}/tts", json=payload, timeout=60)
+            r = engine_post(engine, "/tts", payload, timeout=60, trace=trace)
             
         elif engine == "openaudio":
             payload = {
@@ -278,7 +438,7 @@ def generate_tts_for_engine(engine, text, language, voice=None):
                 "top_p": settings.get("top_p", 0.7)
             }
             payload["reference_id"] = voice if voice else "sven"  # Default voice
-            r = requests.post(f"{url}/v1/tts", json=payload, timeout=180)
+            r = engine_post(engine, "/v1/tts", payload, timeout=180, trace=trace)
             
         else:
             return {"engine": engine, "error": "Engine not implemented", "audio": None, "time": 0}
@@ -286,7 +446,7 @@ def generate_tts_for_engine(engine, text, language, voice=None):
         elapsed = round(time.time() - start_time, 2)
         
         if r.status_code == 200 and len(r.content) > 100:
-            audio_b64 = base64.b64encode(r.content).decode()
+            audio_b64 = base64.b64encode(engine_audio(r)[0]).decode()
             return {
                 "engine": engine,
                 "name": server["name"],
@@ -356,7 +516,7 @@ def compare():
         if run_parallel:
             with ThreadPoolExecutor(max_workers=4) as executor:
                 futures = {
-                    executor.submit(generate_tts_for_engine, engine, text, language, voice): engine
+                    executor.submit(generate_tts_for_engine, engine, text, language, voice, g.trace): engine
                     for engine in engines_to_run
                 }
                 for future in as_completed(futures):
@@ -434,7 +594,7 @@ def voice_clone():
                         import io
                         files = {"audio": (audio_filename, io.BytesIO(audio_data), audio_content_type)}
                         data = {"name": name}
-                        r = requests.post(f"{url}/clone", files=files, data=data, timeout=120)
+                        r = engine_http.post(f"{url}/clone", files=files, data=data, timeout=120)
                         
                         if r.status_code == 200:
                             results.append(f"{server['name']}: OK")
@@ -460,7 +620,7 @@ def voice_clone():
         data = {"name": name}
         
         try:
-            r = requests.post(f"{url}/clone", files=files, data=data, timeout=120)
+            r = engine_http.post(f"{url}/clone", files=files, data=data, timeout=120)
             if r.status_code == 200:
                 return render_template("clone.html",
                     success=f"Voice '{name}' cloned successfully ({server['name']})!",
@@ -513,13 +673,12 @@ def talk():
                 chatterbox_presets=CHATTERBOX_PRESETS, kokoro_voices=KOKORO_VOICES,
                 openaudio_emotions=OPENAUDIO_EMOTIONS, openaudio_presets=OPENAUDIO_PRESETS)
         
-        url = server["url"]
         clean_text = text.replace("\n", " ").replace("\r", "").strip()
         
         try:
             # XTTS
             if engine == "xtts":
-                r = requests.post(f"{url}/tts", json={
+                r = engine_post(engine, "/tts", {
                     "text": clean_text,
                     "voice": voice,
                     "language": language
@@ -533,7 +692,7 @@ def talk():
                     cfg_weight = p["cfg_weight"]
                     temperature = p["temperature"]
                 
-                r = requests.post(f"{url}/tts", json={
+                r = engine_post(engine, "/tts", {
                     "text": clean_text,
                     "voice": voice if voice else None,
                     "exaggeration": exaggeration,
@@ -543,7 +702,7 @@ def talk():
             
             # Kokoro
             elif engine == "kokoro":
-                r = requests.post(f"{url}/tts", json={
+                r = engine_post(engine, "/tts", {
                     "text": clean_text,
                     "voice": voice if voice else "af_heart",
                     "speed": speed
@@ -568,7 +727,7 @@ def talk():
                 if voice:
                     payload["reference_id"] = voice
                 
-                r = requests.post(f"{url}/v1/tts", json=payload, timeout=180)
+                r = engine_post(engine, "/v1/tts", payload, timeout=180)
             
             else:
                 return render_template("talk.html", error="Engine not implemented",
@@ -577,7 +736,7 @@ def talk():
                     openaudio_emotions=OPENAUDIO_EMOTIONS, openaudio_presets=OPENAUDIO_PRESETS)
             
             if r.status_code == 200 and len(r.content) > 100:
-                audio_b64 = base64.b64encode(r.content).decode()
+                audio_b64 = base64.b64encode(engine_audio(r)[0]).decode()
                 return render_template("talk.html",
                     voices=all_voices, servers=SERVERS,
                     chatterbox_presets=CHATTERBOX_PRESETS, kokoro_voices=KOKORO_VOICES,
@@ -623,22 +782,33 @@ def api_voices():
 @app.route("/api/health")
 def api_health():
     status = {}
+    # /ready answers 503 until model load and warmup are done
     health_endpoints = {
-        "xtts": "/health",
-        "chatterbox": "/health",
+        "xtts": "/ready",
+        "chatterbox": "/ready",
         "kokoro": "/",
         "openaudio": "/v1/health"
     }
     for engine, server in SERVERS.items():
         try:
             endpoint = health_endpoints.get(engine, "/health")
-            r = requests.get(f"{server['url']}{endpoint}", timeout=3)
-            status[engine] = {"status": "ok"} if r.status_code == 200 else {"status": "error"}
+            r = engine_http.get(f"{server['url']}{endpoint}", timeout=3)
+            if r.status_code == 200:
+                status[engine] = {"status": "ok"}
+            elif r.status_code == 503:
+                status[engine] = {"status": "starting"}
+            else:
+                status[engine] = {"status": "error"}
         except:
             status[engine] = {"status": "offline"}
     return jsonify(status)
 
 
+@app.route("/metrics")
+def metrics():
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
 @app.route("/api/languages")
 def api_languages():
     """Get language information"""
@@ -677,6 +847,9 @@ def api_tts():
     text = data.get("text", "")
     engine = data.get("engine", "kokoro")
     voice = data.get("voice", "")
+    # Optional compressed output (wav, flac, opus, mp3), encoded by the engine server.
+    # Without it XTTS/Chatterbox send raw PCM and the hub builds the WAV.
+    audio_format = data.get("format")
     
     server = SERVERS.get(engine)
     if not server:
@@ -684,37 +857,621 @@ def api_tts():
     
     try:
         if engine == "kokoro":
-            r = requests.post(f"{server['url']}/tts", json={
+            payload = {
                 "text": text,
                 "voice": voice or "af_heart",
                 "speed": data.get("speed", 1.0)
-            }, timeout=60)
+            }
+            if audio_format:
+                payload["format"] = audio_format
+            r = engine_post(engine, "/tts", payload, timeout=60)
         elif engine == "openaudio":
-            r = requests.post(f"{server['url']}/v1/tts", json={
+            r = engine_post(engine, "/v1/tts", {
                 "text": text,
-                "format": "wav"
+                "format": audio_format or "wav"
             }, timeout=180)
         elif engine == "chatterbox":
-            r = requests.post(f"{server['url']}/tts", json={
+            payload = {
                 "text": text,
                 "exaggeration": data.get("exaggeration", 0.15),
                 "cfg_weight": data.get("cfg_weight", 0.9),
                 "temperature": data.get("temperature", 0.3)
-            }, timeout=180)
+            }
+            if audio_format:
+                payload["format"] = audio_format
+            r = engine_post(engine, "/tts", payload, timeout=180)
         else:  # xtts
-            r = requests.post(f"{server['url']}/tts", json={
+            payload = {
                 "text": text,
                 "voice": voice,
                 "language": data.get("language", "en")
-            }, timeout=120)
+            }
+            if audio_format:
+                payload["format"] = audio_format
+            r = engine_post(engine, "/tts", payload, timeout=120)
         
         if r.status_code == 200:
-            return r.content, 200, {"Content-Type": "audio/wav"}
+            audio, content_type = engine_audio(r)
+            return audio, 200, {"Content-Type": content_type}
         return jsonify({"error": f"TTS failed: {r.status_code}"}), r.status_code
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Engines whose servers can stream audio chunk by chunk
+STREAM_ENDPOINTS = {
+    "chatterbox": "/tts/stream",
+}
+
+
+@app.route("/api/tts/stream", methods=["GET", "POST"])
+def api_tts_stream():
+    """Streaming TTS: playback can start after the first chunk.
+    
+    Accepts JSON (POST) or query parameters (GET, usable as <audio src>).
+    """
+    data = request.get_json(silent=True) or request.args
+    text = data.get("text", "")
+    engine = data.get("engine", "chatterbox")
+    voice = data.get("voice", "")
+    
+    if not text:
+        return jsonify({"error": "Text required"}), 400
+    
+    server = SERVERS.get(engine)
+    if not server or engine not in STREAM_ENDPOINTS:
+        return jsonify({"error": f"Streaming not supported for engine '{engine}'"}), 400
+    
+    clean_text = text.replace("\n", " ").replace("\r", "").strip()
+    
+    if engine == "chatterbox":
+        preset = data.get("preset", "custom")
+        p = CHATTERBOX_PRESETS.get(preset, {})
+        payload = {
+            "text": clean_text,
+            "exaggeration": float(p.get("exaggeration", data.get("exaggeration", 0.15))),
+            "cfg_weight": float(p.get("cfg_weight", data.get("cfg_weight", 0.9))),
+            "temperature": float(p.get("temperature", data.get("temperature", 0.3)))
+        }
+        if voice:
+            payload["voice"] = voice
+    
+    try:
+        r = engine_post(engine, STREAM_ENDPOINTS[engine], payload, stream=True, timeout=(5, 180))
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": str(e)}), 502
+    
+    if r.status_code != 200:
+        return jsonify({"error": f"TTS failed: {r.status_code}"}), r.status_code
+    
+    content_type = r.headers.get("Content-Type", "audio/wav")
+    frames = r.iter_content(chunk_size=None)
+    if pcm_wire.is_pcm(content_type):
+        frames, content_type = pcm_wire.wav_stream(frames), "audio/wav"
+    return Response(stream_with_context(frames), content_type=content_type)
+
+
+# OpenAI-compatible speech API. Model names map to engines; engine keys work as model names too.
+OPENAI_MODELS = {
+    "tts-1": "kokoro",
+    "tts-1-hd": "xtts",
+    "gpt-4o-mini-tts": "chatterbox",
+}
+
+# OpenAI stock voices -> Kokoro voices. Clone engines use their default voice for these names.
+OPENAI_VOICES = {
+    "alloy": "af_heart",
+    "ash": "am_adam",
+    "ballad": "bm_lewis",
+    "coral": "af_sarah",
+    "echo": "am_michael",
+    "fable": "bm_george",
+    "nova": "af_nova",
+    "onyx": "am_adam",
+    "sage": "bf_emma",
+    "shimmer": "af_bella",
+    "verse": "bf_isabella",
+}
+
+OPENAI_FORMATS = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+}
+# Formats that can be streamed: concatenated PCM, or MP3 files back to back
+OPENAI_STREAM_FORMATS = {"wav", "pcm", "mp3"}
+# mp3/opus/flac have to come encoded from the engine (engine_utils.encode_audio), the hub
+# has no encoder. Kokoro and OpenAudio only return WAV, so they only serve wav and pcm.
+OPENAI_ENCODING_ENGINES = {"xtts", "chatterbox"}
+ENGINE_MEDIA_FORMATS = {
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+    "audio/ogg": "opus", "audio/opus": "opus",
+    "audio/flac": "flac", "audio/x-flac": "flac",
+}
+OPENAI_MAX_INPUT = 4096
+
+# Streaming without a native stream endpoint: one engine request per sentence group.
+# The first group is a single sentence for a fast first byte, later groups are bigger.
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+SPEECH_GROUP_CHARS = 300
+SPEECH_PAUSE_SECONDS = 0.15
+
+
+def openai_error(message, status=400, param=None, error_type="invalid_request_error"):
+    return jsonify({"error": {"message": message, "type": error_type, "param": param, "code": None}}), status
+
+
+def split_sentences(text, group_chars=SPEECH_GROUP_CHARS):
+    """First sentence on its own, then sentences grouped up to group_chars"""
+    sentences = [s for s in SENTENCE_END.split(text) if s.strip()]
+    groups = sentences[:1]
+    for sentence in sentences[1:]:
+        if len(groups) > 1 and len(groups[-1]) + len(sentence) + 1 <= group_chars:
+            groups[-1] += " " + sentence
+        else:
+            groups.append(sentence)
+    return groups
+
+
+def speech_request(engine, text, voice, data, fmt="wav"):
+    """Engine path, payload and timeout for /v1/audio/speech and /ws/tts.
+    
+    Starts from BEST_CLONE_SETTINGS; a named preset (Chatterbox, OpenAudio) overrides them.
+    mp3/opus/flac are encoded by the engine, wav/pcm come as raw PCM (or WAV from Kokoro/OpenAudio).
+    """
+    settings = dict(BEST_CLONE_SETTINGS.get(engine, {}).get("settings", {}))
+    presets = {"chatterbox": CHATTERBOX_PRESETS, "openaudio": OPENAUDIO_PRESETS}.get(engine, {})
+    settings.update({k: v for k, v in presets.get(data.get("preset"), {}).items()
+                     if k not in ("label", "description")})
+    
+    if engine == "xtts":
+        path, timeout = "/tts", 120
+        payload = {"text": text, "voice": voice, "language": data.get("language", "en")}
+    elif engine == "chatterbox":
+        path, timeout = "/tts", 180
+        payload = {
+            "text": text,
+            "voice": voice,
+            "exaggeration": settings.get("exaggeration", 0.15),
+            "cfg_weight": settings.get("cfg_weight", 0.9),
+            "temperature": settings.get("temperature", 0.3)
+        }
+    elif engine == "kokoro":
+        path, timeout = "/tts", 60
+        payload = {"text": text, "voice": voice, "speed": float(data.get("speed", settings.get("speed", 1.0)))}
+    else:
+        path, timeout = "/v1/tts", 180
+        payload = {
+            "text": text,
+            "reference_id": voice,
+            "temperature": settings.get("temperature", 0.3),
+            "top_p": settings.get("top_p", 0.7)
+        }
+    
+    if fmt in ("mp3", "opus", "flac"):
+        payload["format"] = fmt
+    elif engine == "openaudio":
+        payload["format"] = "wav"
+    return path, payload, timeout
+
+
+def engine_error(r):
+    try:
+        return r.json().get("detail", r.json().get("message", f"Error {r.status_code}"))
+    except ValueError:
+        return f"Error {r.status_code}"
+
+
+def engine_samples(r):
+    """(sample rate, channels, 16-bit samples) of a PCM or WAV engine response.
+    
+    WAV may have any sample width (8/16/24/32 bit, float). Raises ValueError for anything else.
+    """
+    content_type = r.headers.get("Content-Type", "audio/wav")
+    if pcm_wire.is_pcm(content_type):
+        sample_rate, channels, _ = pcm_wire.parse_header(r.content)
+        return sample_rate, channels, pcm_wire.samples(r.content)
+    if not pcm_wire.is_wav(content_type) and not r.content.startswith(b"RIFF"):
+        raise ValueError(f"engine returned {content_type}, not PCM or WAV")
+    return pcm_wire.wav_samples(r.content)
+
+
+def speech_audio(r, fmt):
+    """Engine response in response_format; raises ValueError if the engine sent something else.
+    
+    wav and pcm are built here from the engine's PCM or WAV, mp3/opus/flac are passed through.
+    """
+    if fmt in ("wav", "pcm"):
+        sample_rate, channels, samples = engine_samples(r)
+        return pcm_wire.wav_header(sample_rate, channels, len(samples)) + samples if fmt == "wav" else samples
+    content_type = r.headers.get("Content-Type", "")
+    if ENGINE_MEDIA_FORMATS.get(content_type.split(";")[0].strip().lower()) != fmt:
+        raise ValueError(f"engine returned {content_type or 'no Content-Type'} instead of {fmt}")
+    return r.content
+
+
+def speech_voice(engine, voice):
+    """Voice for an engine: Kokoro maps OpenAI voice names, clone engines fall back to sven"""
+    voice = voice or ""
+    if engine == "kokoro":
+        return OPENAI_VOICES.get(voice, voice or "af_heart")
+    if not voice or voice in OPENAI_VOICES:
+        return "sven"  # Default voice
+    return voice
+
+
+def speech_response(engine, text, voice, data, fmt, trace):
+    """One engine request for text; raises RuntimeError with the engine's message on failure"""
+    path, payload, timeout = speech_request(engine, text, voice, data, fmt)
+    r = engine_post(engine, path, payload, timeout=timeout, trace=trace)
+    if r.status_code != 200:
+        raise RuntimeError(engine_error(r))
+    return r
+
+
+def speech_segments(engine, sentences, voice, data, fmt, trace):
+    """Synthesize sentence groups in order. The next group is requested as soon as the
+    previous one is back, so the engine keeps working while the hub sends audio.
+    One request at a time keeps the engine from starting a later sentence first.
+    
+    Yields WAV header (wav only) and samples, or whole MP3 files back to back.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        futures = [executor.submit(speech_response, engine, sentences[0], voice, data, fmt, trace)]
+        try:
+            for i in range(len(sentences)):
+                try:
+                    r = futures[i].result()
+                    if i + 1 < len(sentences):
+                        futures.append(executor.submit(speech_response, engine, sentences[i + 1], voice, data, fmt,
+                                                       trace))
+                    audio = speech_audio(r, fmt) if fmt == "mp3" else engine_samples(r)
+                except Exception as e:
+                    if i == 0:
+                        raise
+                    app.logger.error(f"Speech stream stopped after {i} of {len(sentences)} parts: {e}")
+                    return
+                if fmt == "mp3":
+                    yield audio
+                    continue
+                sample_rate, channels, samples = audio
+                if i == 0 and fmt == "wav":
+                    yield pcm_wire.wav_header(sample_rate, channels)
+                if i > 0:
+                    yield bytes(int(sample_rate * SPEECH_PAUSE_SECONDS) * 2 * channels)
+                yield samples
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def native_speech_stream(r, fmt):
+    """Frames of an engine /tts/stream response as WAV or headerless PCM.
+    
+    Reads the stream header right away, so a bad stream raises ValueError before any audio is sent.
+    """
+    content_type = r.headers.get("Content-Type", "audio/wav")
+    frames = r.iter_content(chunk_size=None)
+    if pcm_wire.is_pcm(content_type):
+        sample_rate, channels, samples = pcm_wire.read_stream(frames)
+    elif pcm_wire.is_wav(content_type):
+        # Older servers stream WAV; any sample width is converted to 16 bit
+        sample_rate, channels, samples = pcm_wire.read_wav_stream(frames)
+    else:
+        raise ValueError(f"engine streamed {content_type}, not PCM or WAV")
+    header = [pcm_wire.wav_header(sample_rate, channels)] if fmt == "wav" else []
+    return itertools.chain(header, samples)
+
+
+@app.route("/v1/models")
+def openai_models():
+    """Model list for OpenAI clients that check it before calling /v1/audio/speech"""
+    models = {**OPENAI_MODELS, **{engine: engine for engine in SERVERS}}
+    return jsonify({"object": "list", "data": [
+        {"id": name, "object": "model", "created": 0, "owned_by": engine} for name, engine in models.items()
+    ]})
+
+
+@app.route("/v1/audio/speech", methods=["POST"])
+def openai_speech():
+    """OpenAI-compatible TTS: {model, input, voice, response_format, speed, stream}.
+    
+    Hub extras: language (XTTS) and preset (Chatterbox, OpenAudio).
+    With stream, audio is sent as it is synthesized.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return openai_error("Request body must be JSON")
+    
+    model = data.get("model", "tts-1")
+    engine = OPENAI_MODELS.get(model, model)
+    if engine not in SERVERS:
+        return openai_error(f"Unknown model '{model}' (use {', '.join([*OPENAI_MODELS, *SERVERS])})",
+                            param="model")
+    text = " ".join(str(data.get("input", "")).split())
+    if not text:
+        return openai_error("'input' is required", param="input")
+    if len(text) > OPENAI_MAX_INPUT:
+        return openai_error(f"'input' is longer than {OPENAI_MAX_INPUT} characters", param="input")
+    fmt = data.get("response_format")
+    if fmt is None:
+        # OpenAI default is mp3; engines without an encoder answer with WAV (labelled as such) instead
+        fmt = "mp3" if engine in OPENAI_ENCODING_ENGINES else "wav"
+    if fmt not in OPENAI_FORMATS:
+        return openai_error(f"Unsupported response_format '{fmt}' (use {', '.join(OPENAI_FORMATS)})",
+                            param="response_format")
+    if fmt not in ("wav", "pcm") and engine not in OPENAI_ENCODING_ENGINES:
+        return openai_error(f"Model '{model}' only returns WAV, use response_format 'wav' or 'pcm'",
+                            param="response_format")
+    try:
+        speed = float(data.get("speed", 1.0))
+    except (TypeError, ValueError):
+        speed = 0
+    if not 0.25 <= speed <= 4.0:
+        return openai_error("'speed' must be between 0.25 and 4.0", param="speed")
+    if speed != 1.0 and engine != "kokoro":
+        return openai_error(f"'speed' is only supported by Kokoro (tts-1), not by '{model}'", param="speed")
+    data = {**data, "speed": speed}
+    
+    voice = speech_voice(engine, data.get("voice"))
+    
+    if data.get("stream"):
+        if fmt not in OPENAI_STREAM_FORMATS:
+            return openai_error(f"Streaming supports {', '.join(sorted(OPENAI_STREAM_FORMATS))}",
+                                param="response_format")
+        try:
+            if engine in STREAM_ENDPOINTS and fmt != "mp3":
+                _, payload, _ = speech_request(engine, text, voice, data, fmt)
+                r = engine_post(engine, STREAM_ENDPOINTS[engine], payload, stream=True, timeout=(5, 180))
+                if r.status_code != 200:
+                    return openai_error(f"TTS failed: {engine_error(r)}", r.status_code, error_type="api_error")
+                frames = native_speech_stream(r, fmt)
+            else:
+                frames = speech_segments(engine, split_sentences(text), voice, data, fmt, g.trace)
+                # Wait for the first sentence here, so engine errors still get a status code
+                frames = itertools.chain([next(frames)], frames)
+        except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+            return openai_error(f"TTS failed: {e}", 502, error_type="api_error")
+        return Response(stream_with_context(frames), content_type=OPENAI_FORMATS[fmt])
+    
+    path, payload, timeout = speech_request(engine, text, voice, data, fmt)
+    try:
+        r = engine_post(engine, path, payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return openai_error(f"TTS failed: {e}", 502, error_type="api_error")
+    if r.status_code != 200:
+        return openai_error(f"TTS failed: {engine_error(r)}", r.status_code, error_type="api_error")
+    try:
+        audio = speech_audio(r, fmt)
+    except ValueError as e:
+        return openai_error(f"TTS failed: {e}", 502, error_type="api_error")
+    return audio, 200, {"Content-Type": OPENAI_FORMATS[fmt]}
+
+
+# Realtime voice sessions (/ws/tts): text arrives token by token, complete sentences go to
+# the engine as soon as they end, audio comes back in order. Protocol in docs/tts-guide.md.
+WS_FORMATS = {"pcm", "wav"}
+WS_MAX_SENTENCE_CHARS = 400   # no sentence end by then: cut at a comma or space
+WS_IDLE_SECONDS = 300         # close sessions without messages
+WS_WARM_SECONDS = 60          # re-warm the voice while the session is idle
+WARM_ENGINES = {"xtts", "chatterbox"}
+
+
+def warm_voice(engine, voice, trace=None):
+    """Load the voice conditioning into the engine's cache; older servers just 404"""
+    if engine not in WARM_ENGINES:
+        return
+    start = time.time()
+    try:
+        status = str(engine_http.post(f"{SERVERS[engine]['url']}/voices/{voice}/warm", timeout=60).status_code)
+    except requests.exceptions.RequestException as e:
+        status = type(e).__name__
+    if trace:
+        trace.add("warm", start, time.time() - start, engine=engine, voice=voice, status=status)
+
+
+def take_sentences(buffer, force=False):
+    """Split complete sentences off the text buffer -> (sentences, rest).
+    
+    A sentence ends at .!? followed by whitespace, so "3.5" or a final "." waits for more text.
+    force also returns the unfinished rest (flush, end of session).
+    """
+    sentences = []
+    while True:
+        match = SENTENCE_END.search(buffer)
+        if match:
+            sentences.append(buffer[:match.start()].strip())
+            buffer = buffer[match.end():]
+        elif len(buffer) > WS_MAX_SENTENCE_CHARS:
+            cut = buffer.rfind(", ", 0, WS_MAX_SENTENCE_CHARS) + 1
+            if cut < WS_MAX_SENTENCE_CHARS // 2:
+                cut = buffer.rfind(" ", 0, WS_MAX_SENTENCE_CHARS)
+            if cut <= 0:
+                cut = WS_MAX_SENTENCE_CHARS
+            sentences.append(buffer[:cut].strip())
+            buffer = buffer[cut:].lstrip()
+        else:
+            break
+    if force:
+        sentences.append(buffer.strip())
+        buffer = ""
+    return [s for s in sentences if s], buffer
+
+
+class SpeechSession:
+    """Synthesis side of one /ws/tts connection.
+    
+    A single worker thread renders the queued sentences in order. The first sentence
+    (also the first after a cancel) goes out alone for a fast first byte. Sentences that
+    queue up while the engine is busy after that go out together in one request. Voice
+    warming runs in the background, next to the first synthesis.
+    """
+    
+    def __init__(self, ws, engine, voice, data, fmt, trace):
+        self.ws = ws
+        self.engine = engine
+        self.voice = voice
+        self.data = data
+        self.fmt = fmt
+        self.trace = trace
+        self.sentences = queue.Queue()
+        self.send_lock = threading.Lock()
+        self.generation = 0  # bumped by cancel; results of older sentences are dropped
+        self.count = 0
+        self.first = True  # next sentence is the start of an utterance
+        self.warming = None
+        self.worker = threading.Thread(target=self.run, name="ws-tts", daemon=True)
+    
+    def send(self, message, audio=None):
+        with self.send_lock:
+            self.ws.send(json.dumps(message))
+            if audio is not None:
+                self.ws.send(audio)
+    
+    def cancel(self):
+        """Barge-in: drop everything not yet spoken"""
+        self.generation += 1
+        self.first = True
+        while True:
+            try:
+                self.sentences.get_nowait()
+            except queue.Empty:
+                return
+    
+    def warm(self):
+        """warm_voice in the background, at most one at a time; never delays a sentence"""
+        if self.warming and self.warming.is_alive():
+            return
+        self.warming = threading.Thread(target=warm_voice, args=(self.engine, self.voice, self.trace),
+                                        name="ws-tts-warm", daemon=True)
+        self.warming.start()
+    
+    def next_group(self):
+        """Next sentences to synthesize -> (text, end of session reached)"""
+        while True:
+            try:
+                text = self.sentences.get(timeout=WS_WARM_SECONDS)
+                break
+            except queue.Empty:
+                self.warm()
+        if text is None:
+            return None, True
+        if self.first:
+            self.first = False
+            return text, False
+        parts = [text]
+        while len(" ".join(parts)) < SPEECH_GROUP_CHARS:
+            try:
+                text = self.sentences.get_nowait()
+            except queue.Empty:
+                break
+            if text is None:
+                return " ".join(parts), True
+            parts.append(text)
+        return " ".join(parts), False
+    
+    def run(self):
+        try:
+            self.warm()
+            end = False
+            while not end:
+                text, end = self.next_group()
+                if text is None:
+                    break
+                generation = self.generation
+                index = self.count
+                self.count += 1
+                start = time.time()
+                try:
+                    r = speech_response(self.engine, text, self.voice, self.data, "pcm", self.trace)
+                    sample_rate, channels, samples = engine_samples(r)
+                except Exception as e:
+                    if generation == self.generation:
+                        self.send({"type": "error", "index": index, "text": text, "message": str(e)})
+                    continue
+                if generation != self.generation:
+                    continue
+                audio = samples
+                if self.fmt == "wav":
+                    audio = pcm_wire.wav_header(sample_rate, channels, len(samples)) + samples
+                self.send({"type": "audio", "index": index, "text": text, "format": self.fmt,
+                           "sample_rate": sample_rate, "channels": channels, "bytes": len(audio),
+                           "seconds": round(time.time() - start, 3)}, audio)
+            self.send({"type": "done", "sentences": self.count})
+        except ConnectionClosed:
+            pass
+
+
+@sock.route("/ws/tts")
+def ws_tts(ws):
+    """Incremental TTS session: JSON control messages in, JSON + binary audio frames out"""
+    try:
+        config = json.loads(ws.receive(timeout=WS_IDLE_SECONDS) or "null")
+    except ValueError:
+        config = None
+    if not isinstance(config, dict) or config.get("type", "start") != "start":
+        ws.send(json.dumps({"type": "error", "message": "First message must be {\"type\": \"start\", ...}"}))
+        return
+    
+    model = config.get("engine", config.get("model", "kokoro"))
+    engine = OPENAI_MODELS.get(model, model)
+    fmt = config.get("format", "pcm")
+    if engine not in SERVERS:
+        ws.send(json.dumps({"type": "error", "message": f"Unknown engine '{model}' (use {', '.join(SERVERS)})"}))
+        return
+    if fmt not in WS_FORMATS:
+        ws.send(json.dumps({"type": "error", "message": f"Unknown format '{fmt}' (use pcm or wav)"}))
+        return
+    voice = speech_voice(engine, config.get("voice"))
+    
+    session = SpeechSession(ws, engine, voice, config, fmt, g.trace)
+    session.worker.start()
+    buffer = ""
+    ended = False
+    try:
+        session.send({"type": "ready", "engine": engine, "voice": voice, "format": fmt})
+        while True:
+            raw = ws.receive(timeout=WS_IDLE_SECONDS)
+            if raw is None:
+                break
+            try:
+                message = json.loads(raw) if isinstance(raw, str) else None
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                session.send({"type": "error", "message": "Expected a JSON object"})
+                continue
+            
+            kind = message.get("type", "text")
+            if kind == "text":
+                buffer += str(message.get("text", ""))
+                sentences, buffer = take_sentences(buffer)
+            elif kind in ("flush", "end"):
+                sentences, buffer = take_sentences(buffer, force=True)
+            elif kind == "cancel":
+                buffer = ""
+                session.cancel()
+                session.send({"type": "cancelled"})
+                continue
+            else:
+                session.send({"type": "error", "message": f"Unknown message type '{kind}'"})
+                continue
+            for sentence in sentences:
+                session.sentences.put(sentence)
+            if kind == "end":
+                ended = True
+                break
+    except ConnectionClosed:
+        pass
+    finally:
+        if not ended:
+            session.cancel()
+        session.sentences.put(None)
+    session.worker.join()
+
+
 def get_all_voices():
     """Get voices from all servers"""
     voices = {}
@@ -726,10 +1483,10 @@ def get_all_voices():
             continue
         try:
             if engine == "openaudio":
-                r = requests.get(f"{server['url']}/v1/health", timeout=3)
+                r = engine_http.get(f"{server['url']}/v1/health", timeout=3)
                 voices[engine] = []
             else:
-                r = requests.get(f"{server['url']}/voices", timeout=3)
+                r = engine_http.get(f"{server['url']}/voices", timeout=3)
                 if r.status_code == 200:
                     data = r.json()
                     voices[engine] = data.get("voices", data) if isinstance(data, dict) else data
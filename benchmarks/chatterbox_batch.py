@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Chatterbox Batch Benchmark: Durchsatz bei 1, 4 und 8 Chunks pro T3-Durchlauf
+
+Erzeugt dieselben N Chunks einmal pro Batch-Groesse und misst Rechenzeit,
+Real-Time-Factor und Chunks pro Sekunde. Batch 1 ist der bisherige Weg
+(model.generate() pro Chunk), alle anderen laufen ueber generate_batch().
+Der Sweet Spot ist die Groesse mit dem niedrigsten RTF.
+
+Usage:
+    python benchmarks/chatterbox_batch.py
+    python benchmarks/chatterbox_batch.py --voice ~/chatterbox-server/voices/sven.wav --chunks 8
+    python benchmarks/chatterbox_batch.py --batch-sizes 1,2,4,8 --json batch.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch
+
+import chatterbox_server
+
+SENTENCES = [
+    "Good morning and welcome to the weekly update.",
+    "Today we are looking at the numbers from the last quarter.",
+    "Revenue grew a little faster than we expected.",
+    "The new office opens at the beginning of next month.",
+    "Please remember to book your meeting rooms in advance.",
+    "Our support team answered more tickets than ever before.",
+    "Thanks to everyone who helped with the migration.",
+    "That is all for today, see you next week.",
+]
+
+
+def run(model, conds, texts, batch_size, args):
+    """Alle Texte in Gruppen von batch_size -> (Sekunden, Audiosekunden)"""
+    torch.manual_seed(0)
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    for i in range(0, len(texts), batch_size):
+        group = texts[i:i + batch_size]
+        if batch_size == 1:
+            model.conds = conds
+            wav = model.generate(group[0], exaggeration=args.exaggeration,
+                                 cfg_weight=args.cfg_weight, temperature=args.temperature)
+            audio_seconds += wav.shape[-1] / model.sr
+        else:
+            wavs = chatterbox_server.generate_batch(model, group, conds, exaggeration=args.exaggeration,
+                                                    cfg_weight=args.cfg_weight, temperature=args.temperature)
+            audio_seconds += sum(len(w) for w in wavs) / model.sr
+    return time.perf_counter() - start, audio_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Chatterbox throughput per T3 batch size.")
+    parser.add_argument('--voice', help='Reference WAV (default: built-in voice)')
+    parser.add_argument('--device', default='cpu', help='Torch device (default: cpu)')
+    parser.add_argument('--chunks', type=int, default=8, help='Chunks per run (default: 8)')
+    parser.add_argument('--batch-sizes', default='1,4,8', help='Comma list (default: 1,4,8)')
+    parser.add_argument('--exaggeration', type=float, default=0.5)
+    parser.add_argument('--cfg-weight', type=float, default=0.5)
+    parser.add_argument('--temperature', type=float, default=0.8)
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    from chatterbox.tts import ChatterboxTTS
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b.strip()]
+    texts = [SENTENCES[i % len(SENTENCES)] for i in range(args.chunks)]
+
+    print(f"Loading model on {args.device}...")
+    model = ChatterboxTTS.from_pretrained(device=args.device)
+    if args.voice:
+        model.prepare_conditionals(args.voice, exaggeration=args.exaggeration)
+    conds = model.conds
+
+    # Ein Durchlauf zum Aufwaermen, zaehlt nicht
+    run(model, conds, texts[:1], 1, args)
+
+    results = []
+    for batch_size in batch_sizes:
+        seconds, audio_seconds = run(model, conds, texts, batch_size, args)
+        results.append({
+            "batch_size": batch_size,
+            "seconds": seconds,
+            "audio_seconds": audio_seconds,
+            "rtf": seconds / audio_seconds,
+            "chunks_per_second": len(texts) / seconds,
+        })
+        print(f"  batch {batch_size}: {seconds:.1f}s for {audio_seconds:.1f}s audio")
+
+    print()
+    print(f"{'batch':>6} {'time':>8} {'RTF':>8} {'chunks/s':>9}")
+    for r in results:
+        print(f"{r['batch_size']:>6} {r['seconds']:>7.1f}s {r['rtf']:>8.3f} {r['chunks_per_second']:>9.3f}")
+    best = min(results, key=lambda r: r["rtf"])
+    print(f"\nBest: batch size {best['batch_size']} (CHATTERBOX_BATCH_SIZE={best['batch_size']})")
+
+    if args.json:
+        report = {"device": args.device, "chunks": len(texts), "results": results}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Micro-Benchmarks fuer die Text- und Audio-Hotpaths
+
+Misst Durchsatz und Spitzenspeicher der reinen Python/NumPy-Pfade ohne
+Modell: Textaufteilung (tts_generator.split_text_into_chunks und die
+split_text-Varianten von XTTS und Chatterbox), das Zusammenfuegen der
+Chunks mit Pausen (engine_utils.join_chunks), das base64-Encoding der
+Antwort im Hub und die ffmpeg-Schritte des CLI (merge_wav_files,
+convert_audio).
+
+Fixtures werden deterministisch erzeugt: mehrere MB deutscher und
+englischer Text (inkl. ueberlanger Saetze ohne Punkt) und eine Stunde
+24-kHz-Audio in ~10s-Chunks. Spitzenspeicher ueber tracemalloc (NumPy
+meldet seine Puffer dort an), bei ffmpeg das Spitzen-RSS des Kindprozesses.
+Benchmarks, deren Module oder Werkzeuge fehlen, werden uebersprungen.
+
+Usage:
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --quick
+    python benchmarks/hot_paths.py --only split,join --text-mb 8 --repeat 5
+    python benchmarks/hot_paths.py --json hot_paths.json
+"""
+
+import argparse
+import base64
+import gc
+import json
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 24000
+
+WORDS = {
+    "de": ("die der und in zu den das nicht von sie ist des sich mit dem dass er es ein ich auf so eine auch als "
+           "an nach wie im fuer man aber aus durch wenn nur war noch werden bei hat wir was wird sein einen "
+           "Sprachsynthese Umsatzentwicklung Quartalsbericht Geschaeftsjahr Mitarbeiterinnen Veranstaltung "
+           "Besprechungsraum Rechenzentrum Sprachmodell Stimmenklon Aufnahmequalitaet").split(),
+    "en": ("the of and to in is you that it he was for on are as with his they at be this have from or one had "
+           "by word but not what all were we when your can said there use an each which she do how their if "
+           "synthesis quarterly revenue announcement infrastructure conversation recording meeting voice").split(),
+}
+
+
+def make_text(language: str, size_bytes: int, seed: int = 0) -> str:
+    """Absaetze aus Saetzen von 3-40 Woertern mit Kommas; etwa jeder 50. Satz ist
+    ein ueberlanger Satz ohne Satzzeichen (zwingt die Wortaufteilung)"""
+    rng = random.Random(f"{seed}:{language}")
+    words = WORDS[language]
+    parts, size = [], 0
+    while size < size_bytes:
+        paragraph = []
+        for _ in range(rng.randint(3, 8)):
+            n = rng.randint(150, 250) if rng.random() < 0.02 else rng.randint(3, 40)
+            sentence = [rng.choice(words) for _ in range(n)]
+            if n < 150:
+                for i in range(rng.randint(0, 3)):
+                    sentence[rng.randrange(len(sentence))] += ","
+            sentence[0] = sentence[0].capitalize()
+            paragraph.append(" ".join(sentence).rstrip(",") + rng.choice(".....!?"))
+        text = " ".join(paragraph)
+        parts.append(text)
+        size += len(text.encode()) + 2
+    return "\n\n".join(parts)
+
+
+def make_chunks(minutes: float, seed: int = 0) -> list:
+    """Synthetisches Sprach-Audio (float32) in Chunks von 4-16 Sekunden"""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    chunks, done = [], 0
+    while done < total:
+        n = min(total - done, int(rng.uniform(4, 16) * SAMPLE_RATE))
+        chunks.append((rng.standard_normal(n, dtype=np.float32) * 0.1).clip(-1, 1))
+        done += n
+    return chunks
+
+
+def measure(fn, repeat: int):
+    """Bester Lauf aus repeat -> (Sekunden, Spitzenspeicher in Bytes, Rueckgabe)"""
+    best, peak, result = float("inf"), 0, None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = min(best, elapsed)
+    return best, peak, result
+
+
+def child_peak_rss() -> int:
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def text_benchmarks(texts, repeat):
+    variants = [("split_text_into_chunks", lambda: __import__("tts_generator").split_text_into_chunks)]
+    for module in ("xtts_server", "chatterbox_server"):
+        variants.append((f"{module}.split_text", lambda m=module: __import__(m).split_text))
+
+    for name, load in variants:
+        try:
+            fn = load()
+        except Exception as e:
+            yield {"name": name, "skipped": f"{type(e).__name__}: {e}"}
+            continue
+        for language, text in texts.items():
+            seconds, peak, chunks = measure(lambda: fn(text), repeat)
+            size = len(text.encode())
+            yield {"name": f"{name}[{language}]", "seconds": seconds, "peak_bytes": peak,
+                   "throughput": size / 1e6 / seconds, "unit": "MB/s", "input_bytes": size, "chunks": len(chunks)}
+
+
+def audio_benchmarks(chunks, repeat, only):
+    from engine_utils import encode_audio, join_chunks
+    audio_seconds = sum(len(c) for c in chunks) / SAMPLE_RATE
+
+    def row(name, seconds, peak, **extra):
+        return {"name": name, "seconds": seconds, "peak_bytes": peak,
+                "throughput": audio_seconds / seconds, "unit": "x realtime", **extra}
+
+    if "join" in only:
+        seconds, peak, joined = measure(lambda: join_chunks(chunks, SAMPLE_RATE, 0.15), repeat)
+        yield row("join_chunks", seconds, peak, chunks=len(chunks), dtype=str(joined.dtype))
+        del joined
+        # Bisheriger Weg in den Servern: float64-Pause zieht alles auf float64 hoch
+        pause = np.zeros(int(SAMPLE_RATE * 0.15))
+        seconds, peak, joined = measure(
+            lambda: np.concatenate([x for c in chunks for x in (c, pause)][:-1]), repeat)
+        yield row("join_chunks[float64 pause]", seconds, peak, chunks=len(chunks), dtype=str(joined.dtype))
+        del joined
+
+    if "base64" in only:
+        wav = encode_audio(np.concatenate(chunks), SAMPLE_RATE, "wav")
+        # Wie app.py: base64.b64encode(r.content).decode()
+        seconds, peak, _ = measure(lambda: base64.b64encode(wav).decode(), repeat)
+        yield row("hub base64", seconds, peak, input_bytes=len(wav), mb_per_second=len(wav) / 1e6 / seconds)
+        del wav
+
+    if not {"merge", "convert"} & set(only):
+        return
+    if not shutil.which("ffmpeg"):
+        yield {"name": "merge_wav_files / convert_audio", "skipped": "ffmpeg not found"}
+        return
+    try:
+        import tts_generator
+    except ImportError as e:
+        yield {"name": "merge_wav_files / convert_audio", "skipped": f"{type(e).__name__}: {e}"}
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i, c in enumerate(chunks):
+            files.append(str(Path(tmp) / f"chunk_{i:04d}.wav"))
+            sf.write(files[-1], c, SAMPLE_RATE, subtype="PCM_16")
+        merged = str(Path(tmp) / "merged.wav")
+        if "merge" in only:
+            seconds, peak, _ = measure(lambda: tts_generator.merge_wav_files(files, merged), repeat)
+            yield row("merge_wav_files", seconds, peak, files=len(files), child_peak_rss=child_peak_rss())
+        else:
+            tts_generator.merge_wav_files(files, merged)
+        if "convert" in only:
+            for fmt in ("mp3", "flac"):
+                out = str(Path(tmp) / f"out.{fmt}")
+                seconds, peak, _ = measure(lambda: tts_generator.convert_audio(merged, out, fmt), repeat)
+                yield row(f"convert_audio[{fmt}]", seconds, peak, child_peak_rss=child_peak_rss())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the text and audio hot paths.")
+    parser.add_argument('--only', default='split,join,base64,merge,convert', help='Comma list of groups (default: all)')
+    parser.add_argument('--text-mb', type=float, default=4, help='Size of each text fixture (default: 4)')
+    parser.add_argument('--audio-minutes', type=float, default=60, help='Length of the audio fixture (default: 60)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, best counts (default: 3)')
+    parser.add_argument('--quick', action='store_true', help='Small fixtures (0.5 MB, 5 min), one run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.text_mb, args.audio_minutes, args.repeat = 0.5, 5, 1
+    only = [o.strip() for o in args.only.split(',') if o.strip()]
+
+    results = []
+    if "split" in only:
+        print(f"Generating {args.text_mb:g} MB text per language...")
+        texts = {lang: make_text(lang, int(args.text_mb * 1e6), args.seed) for lang in WORDS}
+        results.extend(text_benchmarks(texts, args.repeat))
+        del texts
+    if {"join", "base64", "merge", "convert"} & set(only):
+        print(f"Generating {args.audio_minutes:g} min audio...")
+        chunks = make_chunks(args.audio_minutes, args.seed)
+        results.extend(audio_benchmarks(chunks, args.repeat, only))
+
+    print()
+    print(f"{'benchmark':<36} {'time':>9} {'throughput':>20} {'peak mem':>10}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['name']:<36} skipped ({r['skipped']})")
+            continue
+        print(f"{r['name']:<36} {r['seconds']:>8.3f}s {r['throughput']:>9.1f} {r['unit']:<10} "
+              f"{r['peak_bytes'] / 1e6:>8.1f}MB")
+
+    if args.json:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "text_mb": args.text_mb,
+            "audio_minutes": args.audio_minutes,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
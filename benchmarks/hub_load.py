@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Hub-Lasttest: /api/tts, /api/compare und /talk bei fester Parallelitaet
+
+Jeder Worker schickt Requests nacheinander, N Worker gleichzeitig, fuer
+--duration Sekunden pro Stufe. Gemessen werden p50/p95/p99-Latenz,
+Requests pro Sekunde und Fehler. Gedacht gegen benchmarks/stub_engines.py,
+damit nur der Hub selbst gemessen wird; --spawn startet Stubs und Hub
+gleich mit. Ergebnisse landen als JSON in benchmarks/results/, --compare
+zeigt die Abweichung zu einem frueheren Lauf.
+
+Usage:
+    python benchmarks/hub_load.py --spawn
+    python benchmarks/hub_load.py --spawn --stub-args "--latency-ms 50 --slots 0" --concurrency 1,16,64
+    python benchmarks/hub_load.py --hub http://localhost:5050 --scenarios api_tts --duration 60
+    python benchmarks/hub_load.py --spawn --label after-pool --compare benchmarks/results/before-pool.json
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from itertools import count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_engines import ENGINES, stub_urls
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+TEXTS = {
+    "short": "Hello, this is a short test.",
+    "medium": "Good morning and welcome to the weekly update. Today we are looking at the numbers "
+              "from the last quarter, and revenue grew a little faster than we expected.",
+    "long": " ".join(["The new office opens at the beginning of next month, so please remember to book "
+                      "your meeting rooms in advance and tell your team about the move."] * 8),
+}
+
+VOICES = {"xtts": "sven", "chatterbox": "sven", "kokoro": "af_heart", "openaudio": "sven"}
+
+
+def build_request(scenario: str, engine: str, text: str, hub: str) -> urllib.request.Request:
+    if scenario == "api_tts":
+        body = json.dumps({"text": text, "engine": engine, "voice": VOICES[engine], "language": "en"}).encode()
+        return urllib.request.Request(f"{hub}/api/tts", body, {"Content-Type": "application/json"})
+    if scenario == "api_compare":
+        body = json.dumps({"text": text, "language": "en"}).encode()
+        return urllib.request.Request(f"{hub}/api/compare", body, {"Content-Type": "application/json"})
+    if scenario == "talk":
+        body = urllib.parse.urlencode({"text": text, "engine": engine, "voice": VOICES[engine],
+                                       "language": "en", "preset": "best_clone"}).encode()
+        return urllib.request.Request(f"{hub}/talk", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    raise ValueError(f"Unknown scenario '{scenario}'")
+
+
+def succeeded(scenario: str, status: int, body: bytes) -> bool:
+    """/talk antwortet auch bei Engine-Fehlern mit 200, /api/compare pro Engine.
+
+    Bei /talk zaehlt nur der {% if audio %}-Block; der Streaming-Player
+    (id="streamResult") steht in jeder Antwort, auch auf der Fehlerseite.
+    """
+    if status != 200:
+        return False
+    if scenario == "talk":
+        return b'id="generatedResult"' in body
+    if scenario == "api_compare":
+        return all(r.get("error") is None for r in json.loads(body)["results"])
+    return True
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_step(scenario: str, concurrency: int, args) -> dict:
+    """concurrency Worker fuer args.duration Sekunden -> Kennzahlen"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    sequence = count()
+    deadline = time.perf_counter() + args.duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            n = next(sequence)
+            engine = args.engines[n % len(args.engines)]
+            text = TEXTS[args.texts[n % len(args.texts)]]
+            req = build_request(scenario, engine, text, args.hub)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=args.timeout) as r:
+                    ok = succeeded(scenario, r.status, r.read())
+                    error = None if ok else "engine error"
+            except urllib.error.HTTPError as e:
+                e.read()
+                error = f"HTTP {e.code}"
+            except Exception as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if error:
+                    errors.append(error)
+                else:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "error_kinds": {k: errors.count(k) for k in set(errors)},
+        "rps": round(len(latencies) / wall, 2),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def wait_for(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout:.0f}s")
+
+
+def spawn(args) -> list:
+    """Stub-Engines und Hub als eigene Prozesse, Hub zeigt per *_URL auf die Stubs"""
+    stub_opts = shlex.split(args.stub_args)
+    offset = 10000
+    if "--port-offset" in stub_opts:
+        offset = int(stub_opts[stub_opts.index("--port-offset") + 1])
+    stubs = subprocess.Popen([sys.executable, str(ROOT / "benchmarks" / "stub_engines.py"), *stub_opts],
+                             stdout=subprocess.DEVNULL)
+    env = {**os.environ, **stub_urls(ENGINES, offset), "TRACE": os.environ.get("TRACE", "0")}
+    port = urllib.parse.urlparse(args.hub).port or 5050
+    hub = subprocess.Popen([sys.executable, "-c",
+                            f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+                           cwd=str(ROOT), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for engine, url in zip(ENGINES, stub_urls(ENGINES, offset).values()):
+        wait_for(url + ENGINES[engine][1][0])
+    wait_for(f"{args.hub}/api/languages")
+    return [hub, stubs]
+
+
+def print_results(results, baseline=None):
+    previous = {(r["scenario"], r["concurrency"]): r for r in (baseline or {}).get("results", [])}
+    print(f"{'scenario':<12} {'conc':>5} {'req':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for r in results:
+        cells = " ".join(f"{r[k]:>7.3f}s" if r[k] is not None else f"{'-':>8}" for k in ("p50", "p95", "p99"))
+        line = f"{r['scenario']:<12} {r['concurrency']:>5} {r['requests']:>6} {r['errors']:>5} {r['rps']:>8.2f} {cells}"
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if old and old["p95"] and r["p95"] and old["rps"]:
+            line += f"   p95 {100 * (r['p95'] / old['p95'] - 1):+.0f}%  req/s {100 * (r['rps'] / old['rps'] - 1):+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure hub throughput and latency at fixed concurrency.")
+    parser.add_argument('--hub', default='http://127.0.0.1:5050', help='Hub URL (default: http://127.0.0.1:5050)')
+    parser.add_argument('--scenarios', default='api_tts,api_compare,talk', help='Comma list (default: all)')
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma list of worker counts (default: 1,8,32)')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per step (default: 20)')
+    parser.add_argument('--engines', default=",".join(ENGINES), help='Engines for api_tts and talk (round robin)')
+    parser.add_argument('--texts', default='short,medium,long', help=f'Text sizes (round robin): {", ".join(TEXTS)}')
+    parser.add_argument('--timeout', type=float, default=300, help='Per-request timeout (default: 300)')
+    parser.add_argument('--spawn', action='store_true', help='Start stub engines and the hub for the run')
+    parser.add_argument('--stub-args', default='', help='Options for stub_engines.py when using --spawn')
+    parser.add_argument('--label', default='', help='Name for the stored result file')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    args.hub = args.hub.rstrip('/')
+    args.engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    args.texts = [t.strip() for t in args.texts.split(',') if t.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    processes = spawn(args) if args.spawn else []
+    try:
+        results = []
+        for scenario in scenarios:
+            for concurrency in levels:
+                print(f"  {scenario} x{concurrency} for {args.duration:.0f}s...", flush=True)
+                results.append(run_step(scenario, concurrency, args))
+    finally:
+        for p in processes:
+            p.terminate()
+            p.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_results(results, baseline)
+
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "hub": args.hub,
+        "spawned": args.spawn,
+        "stub_args": args.stub_args if args.spawn else None,
+        "duration": args.duration,
+        "engines": args.engines,
+        "texts": args.texts,
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}{'-' + args.label if args.label else ''}.json"
+    for path in filter(None, [RESULTS_DIR / name, args.json]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"\nSaved {RESULTS_DIR / name}")
+
+
+if __name__ == "__main__":
+    main()
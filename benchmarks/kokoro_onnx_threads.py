@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Kokoro ONNX Benchmark: Real-Time-Factor je Anzahl Intra-Op-Threads
+
+Laedt Kokoro-82M pro Thread-Zahl als eigene InferenceSession (wie
+mlx_server.py mit MLX_BACKEND=onnx) und misst Rechenzeit / Audiodauer.
+Der beste Wert gehoert nach MLX_ONNX_THREADS.
+
+Usage:
+    python benchmarks/kokoro_onnx_threads.py
+    python benchmarks/kokoro_onnx_threads.py --threads 1,2,4,8,16 --runs 5
+    python benchmarks/kokoro_onnx_threads.py --model kokoro-v1.0.onnx --voices voices-v1.0.bin --json onnx.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mlx_server
+
+DEFAULT_TEXT = ("Good morning and welcome. Today we are talking about the future of speech synthesis, "
+                "and why small models are often good enough.")
+
+
+def run_threads(threads, args):
+    start = time.perf_counter()
+    kokoro = mlx_server.load_onnx_kokoro(args.model, args.voices, threads)
+    load_seconds = time.perf_counter() - start
+
+    # Ein Durchlauf zum Aufwaermen, zaehlt nicht
+    kokoro.create(args.text, voice=args.voice, speed=1.0, lang=args.lang)
+
+    total_time = 0.0
+    total_audio = 0.0
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        samples, sample_rate = kokoro.create(args.text, voice=args.voice, speed=1.0, lang=args.lang)
+        total_time += time.perf_counter() - start
+        total_audio += len(samples) / sample_rate
+
+    return {
+        "threads": threads,
+        "load_seconds": load_seconds,
+        "seconds": total_time,
+        "audio_seconds": total_audio,
+        "rtf": total_time / total_audio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Kokoro ONNX real-time factor across thread counts.")
+    parser.add_argument('--model', default=mlx_server.ONNX_MODEL, help='Path to kokoro-v1.0.onnx')
+    parser.add_argument('--voices', default=mlx_server.ONNX_VOICES, help='Path to voices-v1.0.bin')
+    parser.add_argument('--threads', default=None, help='Comma list (default: 1,2,4,... up to CPU count)')
+    parser.add_argument('--voice', default='af_heart', help='Voice (default: af_heart)')
+    parser.add_argument('--lang', default='en-us', help='Language (default: en-us)')
+    parser.add_argument('--text', default=DEFAULT_TEXT, help='Text to synthesize')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs per thread count (default: 3)')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.threads:
+        thread_counts = [int(t) for t in args.threads.split(',') if t.strip()]
+    else:
+        cpus = os.cpu_count() or 1
+        thread_counts = [t for t in (1, 2, 4, 8, 16, 32) if t <= cpus]
+
+    print(f"Text: {len(args.text)} chars, {args.runs} runs per thread count")
+    results = []
+    for threads in thread_counts:
+        r = run_threads(threads, args)
+        results.append(r)
+        print(f"  {threads} threads: RTF {r['rtf']:.3f}")
+
+    print()
+    print(f"{'threads':>8} {'load':>8} {'RTF':>8} {'x realtime':>11}")
+    for r in results:
+        print(f"{r['threads']:>8} {r['load_seconds']:>7.1f}s {r['rtf']:>8.3f} {1 / r['rtf']:>10.1f}x")
+    best = min(results, key=lambda r: r["rtf"])
+    print(f"\nBest: MLX_ONNX_THREADS={best['threads']}")
+
+    if args.json:
+        report = {"text_chars": len(args.text), "runs": args.runs, "cpu_count": os.cpu_count(),
+                  "results": results}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
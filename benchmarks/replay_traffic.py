@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Replay aufgezeichneten Hub-Traffics (CAPTURE_FILE) gegen einen Hub
+
+Jeder Request geht zum selben Zeitpunkt relativ zum Start raus wie im
+Original, geteilt durch --speed (2 = doppelt so schnell, 0 = so schnell wie
+moeglich mit --workers parallel). Ohne aufgezeichneten Text (CAPTURE_TEXT=0)
+wird Fuelltext gleicher Laenge erzeugt. Mit --spawn laeuft ein eigener Hub
+gegen benchmarks/stub_engines.py. Ausgabe wie hub_load.py: p50/p95/p99 pro
+Endpunkt neben den Originalzeiten, gespeichert in benchmarks/results/.
+
+Usage:
+    python benchmarks/replay_traffic.py capture.jsonl --spawn
+    python benchmarks/replay_traffic.py capture.jsonl --spawn --speed 4 --stub-args "--latency-ms 800 --slots 1"
+    python benchmarks/replay_traffic.py capture.jsonl --hub http://localhost:5050 --speed 0 --workers 32
+    python benchmarks/replay_traffic.py week.jsonl --engines xtts --since 2026-10-12 --limit 5000
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from hub_load import RESULTS_DIR, percentile, spawn, succeeded
+
+# Endpoints whose text field is not "text" (as in app.TEXT_FIELDS)
+TEXT_FIELDS = {"openai_speech": "input"}
+
+FILLER = {
+    "de": "das ist ein kurzer Satz mit einigen Woertern und noch mehr Text fuer die Stimme".split(),
+    "en": "this is a short sentence with a few words and some more text for the voice".split(),
+}
+
+
+def filler_text(chars: int, language: str, seed: int) -> str:
+    """Deterministischer Text der Laenge chars, Saetze von 8-16 Woertern"""
+    rng = random.Random(seed)
+    words = FILLER.get(language or "en", FILLER["en"])
+    out, size, until_stop = [], 0, rng.randint(8, 16)
+    while size < chars:
+        until_stop -= 1
+        word = rng.choice(words)
+        if until_stop == 0:
+            word, until_stop = word + ".", rng.randint(8, 16)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)[:chars].rstrip() or "Hello."
+
+
+def load_capture(paths, args) -> list:
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    until = datetime.fromisoformat(args.until).timestamp() if args.until else None
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if args.engines and r.get("engine") not in args.engines:
+                    continue
+                if (since and r["ts"] < since) or (until and r["ts"] >= until):
+                    continue
+                records.append(r)
+    records.sort(key=lambda r: r["ts"])
+    return records[:args.limit] if args.limit else records
+
+
+def build_request(record: dict, hub: str, seed: int) -> urllib.request.Request:
+    text = record.get("text")
+    if text is None:
+        text = filler_text(record["chars"], record.get("language"), seed)
+    fields = {**record["params"], TEXT_FIELDS.get(record["endpoint"], "text"): text}
+    url = f"{hub}{record['path']}"
+    if record["body"] == "json":
+        return urllib.request.Request(url, json.dumps(fields).encode(), {"Content-Type": "application/json"},
+                                      method=record["method"])
+    encoded = urllib.parse.urlencode(fields)
+    if record["body"] == "query":
+        return urllib.request.Request(f"{url}?{encoded}", method=record["method"])
+    return urllib.request.Request(url, encoded.encode(), {"Content-Type": "application/x-www-form-urlencoded"},
+                                  method=record["method"])
+
+
+def replay(records, args) -> tuple:
+    """Alle Records abspielen -> ([(record, Sekunden, Fehler, Startverspaetung)], Wanduhr-Sekunden)"""
+    results = []
+    lock = threading.Lock()
+    t0 = records[0]["ts"]
+
+    def send(i, record, scheduled):
+        lag = time.perf_counter() - scheduled
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(build_request(record, args.hub, i), timeout=args.timeout) as r:
+                error = None if succeeded(record["endpoint"], r.status, r.read()) else "engine error"
+        except urllib.error.HTTPError as e:
+            e.read()
+            error = f"HTTP {e.code}"
+        except Exception as e:
+            error = type(e).__name__
+        with lock:
+            results.append((record, time.perf_counter() - start, error, lag))
+
+    workers = args.workers if args.speed == 0 else max(args.workers, 256)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, record in enumerate(records):
+            scheduled = started + ((record["ts"] - t0) / args.speed if args.speed else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, record, max(scheduled, started))
+            if (i + 1) % 500 == 0:
+                print(f"  {i + 1}/{len(records)} sent", flush=True)
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall) -> list:
+    groups = {}
+    for record, seconds, error, lag in results:
+        groups.setdefault(record["endpoint"], []).append((record, seconds, error, lag))
+
+    rows = []
+    for endpoint, items in sorted(groups.items()):
+        ok = [s for _, s, e, _ in items if not e]
+        original = [r["seconds"] for r, _, _, _ in items if r.get("status") == 200]
+        rows.append({
+            "endpoint": endpoint,
+            "requests": len(items),
+            "errors": sum(1 for _, _, e, _ in items if e),
+            "rps": round(len(ok) / wall, 2),
+            "p50": percentile(ok, 50),
+            "p95": percentile(ok, 95),
+            "p99": percentile(ok, 99),
+            "original_p50": percentile(original, 50),
+            "original_p95": percentile(original, 95),
+            "max_start_lag": round(max(lag for _, _, _, lag in items), 3),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured hub traffic with its original timing.")
+    parser.add_argument('captures', nargs='+', help='CAPTURE_FILE JSONL files')
+    parser.add_argument('--hub', default='http://127.0.0.1:5050', help='Hub URL (default: http://127.0.0.1:5050)')
+    parser.add_argument('--speed', type=float, default=1, help='Time compression, 0 = as fast as possible (default: 1)')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='Parallel requests with --speed 0, otherwise at least 256 (default: 16)')
+    parser.add_argument('--engines', help='Only replay these engines (comma list)')
+    parser.add_argument('--since', help='Only records from this ISO time on')
+    parser.add_argument('--until', help='Only records before this ISO time')
+    parser.add_argument('--limit', type=int, default=0, help='Replay at most N records')
+    parser.add_argument('--timeout', type=float, default=300, help='Per-request timeout (default: 300)')
+    parser.add_argument('--spawn', action='store_true', help='Start stub engines and a hub for the run')
+    parser.add_argument('--stub-args', default='', help='Options for stub_engines.py when using --spawn')
+    parser.add_argument('--label', default='replay', help='Name for the stored result file (default: replay)')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    args.hub = args.hub.rstrip('/')
+    args.engines = [e.strip() for e in args.engines.split(',')] if args.engines else None
+    records = load_capture(args.captures, args)
+    if not records:
+        raise SystemExit("No matching records")
+    span = records[-1]["ts"] - records[0]["ts"]
+    eta = f"~{span / args.speed:.0f}s" if args.speed else "as fast as possible"
+    print(f"Replaying {len(records)} requests from {span:.0f}s of traffic at {args.speed:g}x ({eta})")
+
+    processes = spawn(args) if args.spawn else []
+    try:
+        results, wall = replay(records, args)
+    finally:
+        for p in processes:
+            p.terminate()
+            p.wait()
+
+    rows = summarize(results, wall)
+    print()
+    print(f"{'endpoint':<15} {'req':>6} {'err':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'orig p50':>9} {'orig p95':>9} {'lag':>7}")
+    for r in rows:
+        cells = " ".join(f"{r[k]:>7.3f}s" if r[k] is not None else f"{'-':>8}"
+                         for k in ("p50", "p95", "p99", "original_p50", "original_p95"))
+        print(f"{r['endpoint']:<15} {r['requests']:>6} {r['errors']:>5} {r['rps']:>7.2f} {cells} "
+              f"{r['max_start_lag']:>6.2f}s")
+
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "captures": args.captures,
+        "hub": args.hub,
+        "speed": args.speed,
+        "spawned": args.spawn,
+        "stub_args": args.stub_args if args.spawn else None,
+        "records": len(records),
+        "results": rows,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{args.label}.json"
+    for path in filter(None, [RESULTS_DIR / name, args.json]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"\nSaved {RESULTS_DIR / name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Stub-Engines fuer Lasttests des Hubs: XTTS, Chatterbox, Kokoro, OpenAudio
+
+Sprechen dieselben Endpunkte wie die echten Server (soweit app.py und
+tts_generator.py sie aufrufen), liefern aber einen Sinuston statt Sprache.
+Latenz, Audiolaenge und Fehlerrate sind einstellbar; mit --slots 1 rechnet
+wie beim echten Server immer nur ein Request gleichzeitig. Zufall kommt aus
+--seed plus laufender Request-Nummer, gleiche Reihenfolge = gleiche Antworten.
+Fragt der Hub per Accept nach rohem PCM (pcm_wire), kommt das statt WAV.
+Nur Standardbibliothek.
+
+Usage:
+    python benchmarks/stub_engines.py
+    python benchmarks/stub_engines.py --latency-ms 300 --ms-per-char 4 --slots 1 --failure-rate 0.02
+    python benchmarks/stub_engines.py --engines xtts,kokoro --port-offset 20000
+
+Hub gegen die Stubs starten (Ports = echte Ports + --port-offset):
+    XTTS_URL=http://127.0.0.1:18766 CHATTERBOX_URL=http://127.0.0.1:18767 \\
+    KOKORO_URL=http://127.0.0.1:18769 OPENAUDIO_URL=http://127.0.0.1:18770 python app.py
+"""
+
+import argparse
+import io
+import itertools
+import json
+import math
+import random
+import struct
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pcm_wire
+
+# Engine -> (echter Port, GET-Pfade, POST-Pfade der Synthese)
+ENGINES = {
+    "xtts": (8766, ("/voices", "/live", "/ready", "/health"), ("/tts",)),
+    "chatterbox": (8767, ("/voices", "/live", "/ready", "/health"), ("/tts", "/tts/stream")),
+    "kokoro": (8769, ("/", "/voices"), ("/tts",)),
+    "openaudio": (8770, ("/v1/health",), ("/v1/tts",)),
+}
+
+VOICES = ["sven", "anna", "narrator"]
+
+
+def stub_urls(engines, port_offset: int, host: str = "127.0.0.1") -> dict:
+    """Umgebungsvariablen fuer Hub und CLI: {"XTTS_URL": "http://..."}"""
+    return {f"{e.upper()}_URL": f"http://{host}:{ENGINES[e][0] + port_offset}" for e in engines}
+
+
+class ToneCache:
+    """WAV-Bytes pro Laenge, einmal erzeugt (16-bit Mono, leiser 220-Hz-Ton)"""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        period = [int(3000 * math.sin(2 * math.pi * 220 * i / sample_rate)) for i in range(sample_rate)]
+        self.second = struct.pack(f"<{sample_rate}h", *period)
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def pcm(self, samples: int) -> bytes:
+        full, rest = divmod(samples, self.sample_rate)
+        return self.second * full + self.second[:rest * 2]
+
+    def wav(self, seconds: float) -> bytes:
+        samples = max(1, int(seconds * self.sample_rate))
+        with self.lock:
+            if samples not in self.cache:
+                buffer = io.BytesIO()
+                with wave.open(buffer, "wb") as w:
+                    w.setnchannels(1)
+                    w.setsampwidth(2)
+                    w.setframerate(self.sample_rate)
+                    w.writeframes(self.pcm(samples))
+                self.cache[samples] = buffer.getvalue()
+            return self.cache[samples]
+
+    def pcm_wire(self, seconds: float) -> bytes:
+        return pcm_wire.header(self.sample_rate) + self.pcm(max(1, int(seconds * self.sample_rate)))
+
+
+class StubEngine(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, engine: str, port: int, args, tones: ToneCache):
+        super().__init__((args.host, port), StubHandler)
+        self.engine = engine
+        self.args = args
+        self.tones = tones
+        self.counter = itertools.count()
+        self.slots = threading.Semaphore(args.slots) if args.slots > 0 else None
+
+    def outcome(self, text: str):
+        """-> (Sekunden Latenz, Audiosekunden, Fehler?) fuer den naechsten Request"""
+        rng = random.Random(f"{self.args.seed}:{self.engine}:{next(self.counter)}")
+        latency = (self.args.latency_ms + self.args.ms_per_char * len(text)
+                   + rng.uniform(-self.args.jitter_ms, self.args.jitter_ms)) / 1000
+        audio_seconds = self.args.audio_seconds or max(0.2, len(text) / self.args.chars_per_second)
+        return max(0.0, latency), audio_seconds, rng.random() < self.args.failure_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubEngine
+
+    def log_message(self, format, *args):
+        if self.server.args.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path not in ENGINES[self.server.engine][1]:
+            return self.send_json({"detail": "Not Found"}, 404)
+        if path == "/voices":
+            return self.send_json({"voices": VOICES})
+        self.send_json({"status": "ready", "ready": True, "engine": self.server.engine, "stub": True})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        if path == "/clone":
+            return self.send_json({"status": "ok", "voice": "stub"})
+        if path.endswith("/warm") and self.server.engine in ("xtts", "chatterbox"):
+            return self.send_json({"status": "warm", "voice": path.split("/")[2], "cached": True, "seconds": 0})
+        if path not in ENGINES[self.server.engine][2]:
+            return self.send_json({"detail": "Not Found"}, 404)
+        try:
+            text = json.loads(body)["text"]
+        except (ValueError, KeyError, TypeError):
+            return self.send_json({"detail": "Field 'text' required"}, 422)
+
+        latency, audio_seconds, failed = self.server.outcome(text)
+        raw = pcm_wire.MEDIA_TYPE in self.headers.get("Accept", "")
+        slots = self.server.slots
+        if slots:
+            slots.acquire()
+        try:
+            if path.endswith("/stream"):
+                return self.stream(latency, audio_seconds, failed, raw)
+            time.sleep(latency)
+        finally:
+            if slots:
+                slots.release()
+
+        if failed:
+            return self.send_json({"detail": "Stub failure"}, 500)
+        tones = self.server.tones
+        audio = tones.pcm_wire(audio_seconds) if raw else tones.wav(audio_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", pcm_wire.content_type() if raw else "audio/wav")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def stream(self, latency: float, audio_seconds: float, failed: bool, raw: bool = False):
+        """Chunked WAV (oder PCM) wie chatterbox /tts/stream: Latenz verteilt auf ~2s-Chunks"""
+        if failed:
+            time.sleep(latency)
+            return self.send_json({"detail": "Stub failure"}, 500)
+        tones = self.server.tones
+        chunks = max(1, math.ceil(audio_seconds / 2))
+        samples = int(audio_seconds * tones.sample_rate) // chunks
+
+        self.send_response(200)
+        self.send_header("Content-Type", pcm_wire.content_type() if raw else "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        header = pcm_wire.header(tones.sample_rate) if raw else pcm_wire.wav_header(tones.sample_rate)
+        parts = [header] + [tones.pcm(samples)] * chunks
+        for i, part in enumerate(parts):
+            if i:
+                time.sleep(latency / chunks)
+            self.wfile.write(f"{len(part):X}\r\n".encode() + part + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_stubs(args) -> list:
+    tones = ToneCache(args.sample_rate)
+    servers = []
+    for engine in args.engines:
+        server = StubEngine(engine, ENGINES[engine][0] + args.port_offset, args, tones)
+        threading.Thread(target=server.serve_forever, name=f"stub-{engine}", daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Deterministic stub TTS engines for hub load tests.")
+    parser.add_argument('--engines', default=",".join(ENGINES),
+                        help=f'Comma list (default: all of {", ".join(ENGINES)})')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port-offset', type=int, default=10000, help='Added to the real ports (default: 10000)')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Base latency per request (default: 200)')
+    parser.add_argument('--ms-per-char', type=float, default=2, help='Extra latency per character (default: 2)')
+    parser.add_argument('--jitter-ms', type=float, default=50, help='Uniform +/- jitter (default: 50)')
+    parser.add_argument('--slots', type=int, default=1,
+                        help='Concurrent syntheses per engine, 0 = unlimited (default: 1)')
+    parser.add_argument('--audio-seconds', type=float, default=0,
+                        help='Fixed audio length (default: from text length)')
+    parser.add_argument('--chars-per-second', type=float, default=15,
+                        help='Speech rate for the audio length (default: 15)')
+    parser.add_argument('--sample-rate', type=int, default=24000)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of 500 responses (default: 0)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    args.engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    unknown = set(args.engines) - set(ENGINES)
+    if unknown:
+        raise SystemExit(f"Unknown engines: {', '.join(sorted(unknown))}")
+
+    start_stubs(args)
+    for name, url in stub_urls(args.engines, args.port_offset, args.host).items():
+        print(f"export {name}={url}")
+    print("Stub engines running, Ctrl+C to stop", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Transport-Benchmark: Unix-Domain-Socket gegen Loopback-TCP
+
+Startet einen uvicorn/FastAPI-Server in einem eigenen Prozess, der ueber
+engine_utils.serve() auf beiden Transporten lauscht, und holt WAV-grosse
+Antworten einmal ueber http://127.0.0.1 und einmal ueber unix:// - beide Male
+mit derselben Keep-Alive-Session aus unix_http, wie Hub und CLI sie nutzen.
+Gemessen wird die reine Transferzeit pro Request (Median, p95, MB/s).
+
+Usage:
+    python benchmarks/uds_transfer.py
+    python benchmarks/uds_transfer.py --sizes 0.5,5,50 --runs 50 --json uds.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import unix_http
+
+
+def run_server(port: int, uds: str):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import Response
+
+    from engine_utils import serve
+
+    app = FastAPI()
+    payloads = {}
+
+    @app.post("/tts")
+    async def tts(request: Request):
+        size = (await request.json())["bytes"]
+        if size not in payloads:
+            payloads[size] = os.urandom(size)
+        return Response(content=payloads[size], media_type="audio/wav")
+
+    @app.get("/live")
+    async def live():
+        return {"status": "alive"}
+
+    serve(app, port, uds)
+
+
+def measure(http, url: str, size: int, runs: int) -> list:
+    payload = {"text": "Hello, this is a transfer test.", "bytes": size}
+    http.post(f"{url}/tts", json=payload, timeout=60).content  # Verbindung aufbauen, Payload erzeugen
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        r = http.post(f"{url}/tts", json=payload, timeout=60)
+        assert len(r.content) == size
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare payload transfer over a Unix socket and loopback TCP.")
+    parser.add_argument('--sizes', default='0.1,1,5,20', help='Response sizes in MB (default: 0.1,1,5,20)')
+    parser.add_argument('--runs', type=int, default=20, help='Requests per size and transport (default: 20)')
+    parser.add_argument('--port', type=int, default=18799, help='TCP port for the test server (default: 18799)')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    parser.add_argument('--serve', help=argparse.SUPPRESS)  # intern: Server-Prozess mit diesem Socket-Pfad
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.port, args.serve)
+        return
+
+    sizes = [int(float(s) * 1e6) for s in args.sizes.split(',') if s.strip()]
+    uds = str(Path(tempfile.gettempdir()) / f"uds-bench-{os.getpid()}.sock")
+    server = subprocess.Popen([sys.executable, __file__, "--serve", uds, "--port", str(args.port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    transports = {"tcp": f"http://127.0.0.1:{args.port}", "uds": f"unix://{uds}"}
+    http = unix_http.session()
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                if all(http.get(f"{url}/live", timeout=1).ok for url in transports.values()):
+                    break
+            except Exception:
+                if time.time() > deadline or server.poll() is not None:
+                    raise SystemExit("Test server did not start (needs fastapi and uvicorn)")
+                time.sleep(0.2)
+
+        results = []
+        for size in sizes:
+            row = {"bytes": size}
+            for name, url in transports.items():
+                times = measure(http, url, size, args.runs)
+                median = times[len(times) // 2]
+                row[name] = {"median_ms": median * 1000, "p95_ms": times[int(0.95 * (len(times) - 1))] * 1000,
+                             "mb_per_second": size / 1e6 / median}
+            row["speedup"] = row["tcp"]["median_ms"] / row["uds"]["median_ms"]
+            results.append(row)
+            print(f"  {size / 1e6:g} MB done")
+    finally:
+        server.terminate()
+        server.wait()
+        Path(uds).unlink(missing_ok=True)
+
+    print()
+    print(f"{'size':>8} {'tcp median':>11} {'uds median':>11} {'tcp MB/s':>9} {'uds MB/s':>9} {'speedup':>8}")
+    for r in results:
+        print(f"{r['bytes'] / 1e6:>6.1f}MB {r['tcp']['median_ms']:>9.2f}ms {r['uds']['median_ms']:>9.2f}ms "
+              f"{r['tcp']['mb_per_second']:>9.0f} {r['uds']['mb_per_second']:>9.0f} {r['speedup']:>7.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
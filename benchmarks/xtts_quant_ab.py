@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+XTTS A/B Benchmark: fp32 vs. dynamisch int8-quantisiert
+
+Misst den Real-Time-Factor (Rechenzeit / Audiodauer) beider Varianten und
+vergleicht die Ausgaben ueber die Kosinus-Aehnlichkeit der XTTS-Sprecher-
+Einbettung. Werte nahe 1.0 heissen: gleiche Stimme, die Quantisierung hat
+die Klangfarbe nicht merklich veraendert.
+
+Usage:
+    python benchmarks/xtts_quant_ab.py --voice ~/xtts-server/voices/sven.wav
+    python benchmarks/xtts_quant_ab.py --voice sven.wav --lang en --runs 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import soundfile as sf
+import torch
+
+import xtts_server
+
+SAMPLE_RATE = 24000
+
+DEFAULT_TEXTS = {
+    "de": "Guten Tag und herzlich willkommen. Heute sprechen wir ueber die Zukunft der Sprachsynthese.",
+    "en": "Good morning and welcome. Today we are talking about the future of speech synthesis.",
+}
+
+
+def synthesize(model, text, language, gpt_cond, spk_emb, seed):
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    out = model.inference(
+        text=text,
+        language=language,
+        gpt_cond_latent=gpt_cond,
+        speaker_embedding=spk_emb,
+    )
+    elapsed = time.perf_counter() - start
+    return np.asarray(out["wav"], dtype=np.float32), elapsed
+
+
+def speaker_embedding(model, audio):
+    """Sprecher-Einbettung einer erzeugten Aufnahme (immer ueber das fp32-Modell)"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        sf.write(tmp_path, audio, SAMPLE_RATE)
+        _, emb = model.get_conditioning_latents(audio_path=[tmp_path])
+        return emb.flatten().float()
+    finally:
+        os.unlink(tmp_path)
+
+
+def run_variant(name, model, args, gpt_cond, spk_emb):
+    # Ein Durchlauf zum Aufwaermen, zaehlt nicht
+    synthesize(model, args.text, args.lang, gpt_cond, spk_emb, seed=0)
+
+    outputs = []
+    total_time = 0.0
+    total_audio = 0.0
+    for i in range(args.runs):
+        audio, elapsed = synthesize(model, args.text, args.lang, gpt_cond, spk_emb, seed=i + 1)
+        outputs.append(audio)
+        total_time += elapsed
+        total_audio += len(audio) / SAMPLE_RATE
+        print(f"  {name} run {i+1}/{args.runs}: {elapsed:.2f}s for {len(audio) / SAMPLE_RATE:.2f}s audio")
+
+    return {
+        "rtf": total_time / total_audio,
+        "seconds": total_time,
+        "audio_seconds": total_audio,
+        "outputs": outputs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 XTTS inference.")
+    parser.add_argument('--voice', required=True, help='Reference WAV for conditioning')
+    parser.add_argument('--lang', default='de', help='Language code (default: de)')
+    parser.add_argument('--text', help='Text to synthesize (default: built-in sentence)')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs per variant (default: 3)')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    args.text = args.text or DEFAULT_TEXTS.get(args.lang, DEFAULT_TEXTS["en"])
+
+    print("Loading fp32 model...")
+    start = time.perf_counter()
+    fp32 = xtts_server.build_model(quantize="")
+    fp32_load = time.perf_counter() - start
+
+    print("Loading int8 model...")
+    start = time.perf_counter()
+    int8 = xtts_server.build_model(quantize="int8")
+    int8_load = time.perf_counter() - start
+
+    gpt_cond, spk_emb = fp32.get_conditioning_latents(audio_path=[args.voice])
+
+    print(f"\nText: {len(args.text)} chars, language {args.lang}")
+    results = {
+        "fp32": run_variant("fp32", fp32, args, gpt_cond, spk_emb),
+        "int8": run_variant("int8", int8, args, gpt_cond, spk_emb),
+    }
+
+    # Aehnlichkeit: Sprecher-Einbettung jeder int8-Ausgabe gegen die fp32-Ausgabe mit gleichem Seed
+    similarities = []
+    for a, b in zip(results["fp32"]["outputs"], results["int8"]["outputs"]):
+        emb_a = speaker_embedding(fp32, a)
+        emb_b = speaker_embedding(fp32, b)
+        similarities.append(torch.nn.functional.cosine_similarity(emb_a, emb_b, dim=0).item())
+    similarity = float(np.mean(similarities))
+    speedup = results["fp32"]["rtf"] / results["int8"]["rtf"]
+
+    print()
+    print(f"{'':8} {'load':>8} {'RTF':>8}")
+    print(f"{'fp32':8} {fp32_load:>7.1f}s {results['fp32']['rtf']:>8.3f}")
+    print(f"{'int8':8} {int8_load:>7.1f}s {results['int8']['rtf']:>8.3f}")
+    print(f"\nSpeedup: {speedup:.2f}x")
+    print(f"Speaker similarity (cosine): {similarity:.4f}")
+
+    if args.json:
+        report = {
+            "text_chars": len(args.text),
+            "language": args.lang,
+            "runs": args.runs,
+            "speedup": speedup,
+            "speaker_similarity": similarity,
+        }
+        for name, load in (("fp32", fp32_load), ("int8", int8_load)):
+            r = results[name]
+            report[name] = {"load_seconds": load, "rtf": r["rtf"], "seconds": r["seconds"],
+                            "audio_seconds": r["audio_seconds"]}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,18 +9,29 @@ os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"
 
 import io
 import re
+import copy
+import time
+import asyncio
 import tempfile
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
 
 import torch
+import torch.nn.functional as F
 import torchaudio as ta
 import numpy as np
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
+from engine_utils import (TRACE_HEADER, PhraseCache, Readiness, RequestMetrics, encode_audio_async, env_list, file_sha256,
+                          join_chunks, media_type, metrics_response, negotiate_format, pcm_frame, profile_response,
+                          register_cache, serve, stream_format, stream_header, torch_ops, track_request)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -33,10 +44,47 @@ else:
 app = FastAPI(title="Chatterbox TTS Server", version="1.0.0")
 
 model = None
+default_conds = None  # eingebaute Stimme aus from_pretrained
+generate_lock = threading.Lock()  # model.conds ist globaler Zustand
 VOICES_DIR = Path.home() / "chatterbox-server" / "voices"
 VOICES_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_CHARS = 250
+PAUSE_SECONDS = 0.2  # Pause zwischen Chunks
+
+# Cache fuer wiederkehrende Chunks (Begruessungen, Disclaimer, ...) - 0 = aus
+PHRASE_CACHE_MB = int(os.environ.get("CHATTERBOX_PHRASE_CACHE_MB", "512"))
+phrase_cache = PhraseCache(Path.home() / "chatterbox-server" / "cache" / "phrases",
+                           PHRASE_CACHE_MB * 1024 * 1024)
+register_cache("phrase", phrase_cache.stats)
+
+# Warmup-Synthese beim Start (leer = eingebaute Stimme)
+WARMUP = os.environ.get("CHATTERBOX_WARMUP", "1") == "1"
+WARMUP_VOICE = os.environ.get("CHATTERBOX_WARMUP_VOICE", "")
+
+WARMUP_TEXT = "Hello, this is a short warmup."
+readiness = Readiness()
+
+# /debug/profile nur mit Token (Authorization: Bearer ...), ohne Token deaktiviert
+PROFILE_TOKEN = os.environ.get("CHATTERBOX_PROFILE_TOKEN", "")
+
+# Zusaetzlich auf einem Unix-Socket lauschen (z.B. /tmp/tts-chatterbox.sock), Hub-URL dann unix://...
+UDS = os.environ.get("CHATTERBOX_UDS", "")
+
+# Voice-Conditionals: LRU im Speicher plus .pt-Dateien auf Disk
+CONDS_CACHE_SIZE = int(os.environ.get("CHATTERBOX_CONDS_CACHE_SIZE", "16"))
+CONDS_DIR = Path.home() / "chatterbox-server" / "cache" / "conds"
+CONDS_DISK_MAX = int(os.environ.get("CHATTERBOX_CONDS_DISK_MAX", "256"))  # .pt-Dateien auf Disk
+PRELOAD_VOICES = env_list("CHATTERBOX_PRELOAD_VOICES", "*")
+
+# Chunks pro gemeinsamem T3-Durchlauf (1 = einzeln wie bisher)
+BATCH_SIZE = max(1, int(os.environ.get("CHATTERBOX_BATCH_SIZE", "4")))
+
+# Ersatz fuer den AlignmentStreamAnalyzer im Batch-Pfad: Zeile stoppt nach so
+# vielen gleichen Tokens in Folge bzw. nach Speech-Tokens pro Text-Token + Rest
+BATCH_REPEAT_STOP = 3
+BATCH_TOKENS_PER_TEXT_TOKEN = 4
+BATCH_TOKEN_MARGIN = 50
 
 
 class TTSRequest(BaseModel):
@@ -46,6 +94,7 @@ class TTSRequest(BaseModel):
     exaggeration: float = 0.5
     cfg_weight: float = 0.5
     temperature: float = 0.8
+    format: Optional[str] = None  # wav, flac, opus, mp3, pcm16, pcmf16 - sonst Accept-Header
     
     def validate_params(self):
         """Validiere Parameter um NaN/Inf Fehler zu vermeiden"""
@@ -93,9 +142,342 @@ def split_text(text: str, max_chars: int = MAX_CHARS) -> list[str]:
     return [c for c in chunks if c]
 
 
-@app.on_event("startup")
-async def load_model():
-    global model
+class ConditionalsCache:
+    """Vorberechnete Conditionals pro Stimme statt prepare_conditionals pro Chunk.
+
+    Im Speicher: LRU nach Voice-Pfad, mit Inhalts-Hash zur Erkennung geaenderter
+    Dateien. Auf Disk: Conditionals.save() unter dem SHA-256 der WAV, atomar per
+    Temp-Datei + os.replace. Nach jedem Schreiben fliegen Dateien ohne passende
+    Stimme in voices_dir raus, danach die aeltesten ueber max_files.
+    """
+    
+    def __init__(self, cache_dir: Path, max_entries: int, voices_dir: Path, max_files: int):
+        self.dir = cache_dir
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.voices_dir = voices_dir
+        self.max_files = max(1, max_files)
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()  # voice path -> (hash, conds)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    def get(self, voice_path: Path):
+        """Muss unter generate_lock laufen - prepare_conditionals setzt model.conds"""
+        from chatterbox.tts import Conditionals
+        
+        key = str(voice_path)
+        digest = file_sha256(voice_path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == digest:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        
+        disk_path = self.dir / f"{digest}.pt"
+        conds = None
+        if disk_path.exists():
+            try:
+                conds = Conditionals.load(disk_path, map_location="cpu").to(DEVICE)
+                self.disk_hits += 1
+            except Exception as e:
+                # Abgebrochener Schreibvorgang aelterer Versionen o.ae. - neu berechnen
+                logger.warning(f"Discarding unreadable conditionals {disk_path.name}: {e}")
+                disk_path.unlink(missing_ok=True)
+        if conds is None:
+            start = time.time()
+            model.prepare_conditionals(key, exaggeration=0.5)
+            conds = model.conds
+            self._save(conds, disk_path)
+            self.misses += 1
+            logger.info(f"Conditionals for {voice_path.stem} computed in {time.time() - start:.1f}s")
+            self.prune()
+        
+        with self.lock:
+            self.entries[key] = (digest, conds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return conds
+    
+    def _save(self, conds, disk_path: Path):
+        with tempfile.NamedTemporaryFile(dir=self.dir, prefix=f"{disk_path.stem}.", suffix=".tmp",
+                                         delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            conds.save(tmp_path)
+            os.replace(tmp_path, disk_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+    
+    def prune(self):
+        """Dateien zu geaenderten/geloeschten Stimmen entfernen, dann auf max_files kuerzen"""
+        current = {file_sha256(path) for path in self.voices_dir.glob("*.wav")}
+        files = []
+        for path in self.dir.glob("*.pt"):
+            if path.stem in current:
+                files.append(path)
+            else:
+                path.unlink(missing_ok=True)
+        files.sort(key=lambda path: path.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            path.unlink(missing_ok=True)
+    
+    def invalidate(self, voice_path: Path):
+        """Bei /clone und DELETE - vor dem Ueberschreiben bzw. Loeschen aufrufen"""
+        with self.lock:
+            entry = self.entries.pop(str(voice_path), None)
+        digests = {entry[0]} if entry else set()
+        if voice_path.exists():
+            digests.add(file_sha256(voice_path))
+        for digest in digests:
+            (self.dir / f"{digest}.pt").unlink(missing_ok=True)
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+        }
+
+
+conds_cache = ConditionalsCache(CONDS_DIR, CONDS_CACHE_SIZE, VOICES_DIR, CONDS_DISK_MAX)
+register_cache("conds", conds_cache.stats)
+
+
+@torch_ops
+def get_conditionals(voice_path: Optional[Path]):
+    if voice_path is None:
+        return default_conds
+    with generate_lock:
+        return conds_cache.get(voice_path)
+
+
+@torch_ops
+def generate_chunk(text: str, conds, exaggeration: float, cfg_weight: float, temperature: float,
+                   metrics: Optional[RequestMetrics] = None):
+    """generate() ohne audio_prompt_path - die Conditionals kommen aus dem Cache.
+
+    Flache Kopie, weil generate() bei anderer exaggeration conds.t3 ersetzt.
+    """
+    with (metrics or RequestMetrics()).locked(generate_lock):
+        model.conds = copy.copy(conds)
+        return model.generate(
+            text,
+            exaggeration=exaggeration,
+            cfg_weight=cfg_weight,
+            temperature=temperature
+        )
+
+
+def chunk_key(chunk: str, request: TTSRequest, voice_hash: str) -> str:
+    params = {
+        "exaggeration": request.exaggeration,
+        "cfg_weight": request.cfg_weight,
+        "temperature": request.temperature,
+    }
+    return phrase_cache.key(voice_hash, request.language, params, chunk)
+
+
+def render_chunk(chunk: str, conds, request: TTSRequest, voice_hash: str,
+                 metrics: Optional[RequestMetrics] = None):
+    """Ein Chunk aus dem Phrase-Cache oder frisch generiert -> (audio, cached)"""
+    metrics = metrics or RequestMetrics()
+    key = chunk_key(chunk, request, voice_hash)
+    cached = phrase_cache.get(key)
+    if cached is not None:
+        return cached, True
+    
+    with metrics.span("chunk", chars=len(chunk)):
+        wav = generate_chunk(
+            chunk,
+            conds,
+            exaggeration=request.exaggeration,
+            cfg_weight=request.cfg_weight,
+            temperature=request.temperature,
+            metrics=metrics
+        )
+    audio = wav.squeeze().numpy()
+    phrase_cache.put(key, audio, model.sr)
+    return audio, False
+
+
+@torch_ops
+@torch.inference_mode()
+def generate_batch(tts, texts: list[str], conds, exaggeration: float, cfg_weight: float, temperature: float,
+                   repetition_penalty: float = 1.2, min_p: float = 0.05, top_p: float = 1.0,
+                   max_new_tokens: int = 1000) -> list[np.ndarray]:
+    """Mehrere Chunks in einem T3-Durchlauf, danach S3Gen pro Chunk.
+    
+    Nachbau von ChatterboxTTS.generate() / T3.inference() fuer Batch > 1.
+    Die Sequenzen werden links aufgefuellt und per attention_mask und
+    position_ids ausgeblendet, so sieht jede Zeile dieselben Positionen wie
+    ein Einzelaufruf. Mit CFG gehoeren zwei Zeilen zu einem Chunk (cond,
+    uncond). S3Gen (Flow-Matching + HiFT) nimmt nur Batch 1 an.
+    
+    Der AlignmentStreamAnalyzer von T3.inference() haengt an Attention-Hooks
+    fuer Batch 1. Stattdessen bekommt jede Zeile eigene Abbrueche: EOS nach
+    BATCH_REPEAT_STOP gleichen Tokens in Folge (Analyzer: Token-Wiederholung)
+    und ein Token-Budget nach Textlaenge (Analyzer: langer Schwanz nach dem
+    Textende). Sonst haengen Wiederholungen bis max_new_tokens weiter.
+    """
+    from chatterbox.tts import punc_norm
+    from chatterbox.models.t3.modules.cond_enc import T3Cond
+    from chatterbox.models.s3tokenizer import drop_invalid_tokens
+    from transformers.generation.logits_process import (MinPLogitsWarper, RepetitionPenaltyLogitsProcessor,
+                                                        TopPLogitsWarper)
+    
+    t3 = tts.t3
+    hp = t3.hp
+    device = tts.device
+    rows = 2 if cfg_weight > 0.0 else 1
+    n = len(texts)
+    
+    t3_cond = T3Cond(
+        speaker_emb=conds.t3.speaker_emb,
+        cond_prompt_speech_tokens=conds.t3.cond_prompt_speech_tokens,
+        emotion_adv=exaggeration * torch.ones(1, 1, 1),
+    ).to(device=device)
+    
+    bos = torch.tensor([[hp.start_speech_token]], dtype=torch.long, device=device)
+    bos_embed = t3.speech_emb(bos) + t3.speech_pos_emb.get_fixed_embedding(0)
+    
+    sequences = []
+    text_lens = []
+    for text in texts:
+        tokens = tts.tokenizer.text_to_tokens(punc_norm(text)).to(device)
+        text_lens.append(tokens.size(1))
+        tokens = torch.cat([tokens] * rows, dim=0)
+        tokens = F.pad(tokens, (1, 0), value=hp.start_text_token)
+        tokens = F.pad(tokens, (0, 1), value=hp.stop_text_token)
+        embeds, _ = t3.prepare_input_embeds(
+            t3_cond=t3_cond,
+            text_tokens=tokens,
+            speech_tokens=hp.start_speech_token * torch.ones_like(tokens[:, :1]),
+            cfg_weight=cfg_weight,
+        )
+        sequences.append(torch.cat([embeds, bos_embed.expand(rows, -1, -1)], dim=1))
+    
+    # Links auffuellen
+    max_len = max(seq.size(1) for seq in sequences)
+    inputs_embeds = sequences[0].new_zeros(n * rows, max_len, sequences[0].size(2))
+    attention_mask = torch.zeros(n * rows, max_len, dtype=torch.long, device=device)
+    for j, seq in enumerate(sequences):
+        inputs_embeds[j * rows:(j + 1) * rows, max_len - seq.size(1):] = seq
+        attention_mask[j * rows:(j + 1) * rows, max_len - seq.size(1):] = 1
+    position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+    
+    repetition = RepetitionPenaltyLogitsProcessor(penalty=float(repetition_penalty))
+    min_p_warper = MinPLogitsWarper(min_p=min_p)
+    top_p_warper = TopPLogitsWarper(top_p=top_p)
+    
+    out = t3.tfmr(inputs_embeds=inputs_embeds, attention_mask=attention_mask, position_ids=position_ids,
+                  use_cache=True, return_dict=True)
+    generated = bos.expand(n, 1)
+    finished = torch.zeros(n, dtype=torch.bool, device=device)
+    limits = torch.tensor([min(max_new_tokens, BATCH_TOKENS_PER_TEXT_TOKEN * length + BATCH_TOKEN_MARGIN)
+                           for length in text_lens], device=device)
+    
+    for i in range(max_new_tokens):
+        logits = t3.speech_head(out.last_hidden_state[:, -1, :])
+        if rows == 2:
+            cond, uncond = logits[0::2], logits[1::2]
+            logits = cond + cfg_weight * (cond - uncond)
+        if temperature != 1.0:
+            logits = logits / temperature
+        logits = repetition(generated, logits)
+        logits = min_p_warper(None, logits)
+        logits = top_p_warper(None, logits)
+        
+        next_token = torch.multinomial(torch.softmax(logits, dim=-1), num_samples=1)
+        
+        # Pro Zeile: Wiederholungsschleife oder Budget erschoepft -> EOS erzwingen
+        repeated = torch.zeros_like(finished)
+        if generated.size(1) > BATCH_REPEAT_STOP - 1:
+            tail = generated[:, -(BATCH_REPEAT_STOP - 1):]
+            repeated = (tail == next_token).all(dim=1)
+        stop = repeated | (limits <= i + 1)
+        if (stop & ~finished).any():
+            logger.warning(f"Batch: forcing EOS for rows {(stop & ~finished).nonzero().view(-1).tolist()} "
+                           f"at token {i + 1}")
+        next_token[stop | finished] = hp.stop_speech_token  # fertige Zeilen laufen nur mit
+        generated = torch.cat([generated, next_token], dim=1)
+        finished |= next_token.view(-1) == hp.stop_speech_token
+        if finished.all():
+            break
+        
+        embed = t3.speech_emb(next_token) + t3.speech_pos_emb.get_fixed_embedding(i + 1)
+        embed = embed.repeat_interleave(rows, dim=0)
+        attention_mask = F.pad(attention_mask, (0, 1), value=1)
+        position_ids = position_ids[:, -1:] + 1
+        out = t3.tfmr(inputs_embeds=embed, attention_mask=attention_mask, position_ids=position_ids,
+                      past_key_values=out.past_key_values, use_cache=True, return_dict=True)
+    
+    wavs = []
+    for speech in generated[:, 1:]:
+        stops = (speech == hp.stop_speech_token).nonzero()
+        if len(stops):
+            speech = speech[:stops[0].item()]
+        speech = drop_invalid_tokens(speech)
+        speech = speech[speech < 6561].to(device)
+        wav, _ = tts.s3gen.inference(speech_tokens=speech, ref_dict=conds.gen)
+        wav = wav.squeeze(0).detach().cpu().numpy()
+        wavs.append(tts.watermarker.apply_watermark(wav, sample_rate=tts.sr))
+    return wavs
+
+
+def render_chunks(chunks: list[str], conds, request: TTSRequest, voice_hash: str,
+                  metrics: Optional[RequestMetrics] = None):
+    """Alle Chunks eines Requests: Cache-Treffer direkt, der Rest in Batches.
+    
+    Gibt (audios, cached_flags) in Chunk-Reihenfolge zurueck.
+    """
+    metrics = metrics or RequestMetrics()
+    keys = [chunk_key(chunk, request, voice_hash) for chunk in chunks]
+    audios = [phrase_cache.get(key) for key in keys]
+    cached = [audio is not None for audio in audios]
+    missing = [i for i, audio in enumerate(audios) if audio is None]
+    
+    if BATCH_SIZE == 1 or len(missing) <= 1:
+        for i in missing:
+            audios[i], _ = render_chunk(chunks[i], conds, request, voice_hash, metrics)
+        return audios, cached
+    
+    for start in range(0, len(missing), BATCH_SIZE):
+        group = missing[start:start + BATCH_SIZE]
+        t0 = time.time()
+        with metrics.span("batch", chunks=len(group)), metrics.locked(generate_lock):
+            wavs = generate_batch(
+                model,
+                [chunks[i] for i in group],
+                conds,
+                exaggeration=request.exaggeration,
+                cfg_weight=request.cfg_weight,
+                temperature=request.temperature
+            )
+        logger.info(f"  Batch of {len(group)} chunks in {time.time() - t0:.1f}s")
+        for i, audio in zip(group, wavs):
+            audios[i] = audio
+            phrase_cache.put(keys[i], audio, model.sr)
+    return audios, cached
+
+
+def preload_voice_paths() -> list[Path]:
+    if "*" in PRELOAD_VOICES:
+        return sorted(VOICES_DIR.glob("*.wav"))
+    paths = [VOICES_DIR / f"{name}.wav" for name in PRELOAD_VOICES]
+    return [p for p in paths if p.exists()]
+
+
+def load_model():
+    global model, default_conds
     
     logger.info(f"Loading Chatterbox on {DEVICE}...")
     logger.info(f"PyTorch: {torch.__version__}")
@@ -104,22 +486,81 @@ async def load_model():
     try:
         from chatterbox.tts import ChatterboxTTS
         model = ChatterboxTTS.from_pretrained(device=DEVICE)
+        default_conds = model.conds
         logger.info("Chatterbox loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load Chatterbox: {e}")
         raise
 
 
+def warmup():
+    """Eine kurze Synthese, damit Kernel und Caches initialisiert sind"""
+    voice_path = VOICES_DIR / f"{WARMUP_VOICE}.wav" if WARMUP_VOICE else None
+    if voice_path and not voice_path.exists():
+        voice_path = None
+    generate_chunk(WARMUP_TEXT, get_conditionals(voice_path), 0.5, 0.5, 0.8)
+
+
+def preload_voices():
+    for path in preload_voice_paths():
+        get_conditionals(path)
+
+
+async def prepare():
+    """Modell und Warmup im Hintergrund - /live antwortet sofort, /ready danach"""
+    loop = asyncio.get_running_loop()
+    try:
+        readiness.set_stage("loading_model")
+        start = time.time()
+        await loop.run_in_executor(None, load_model)
+        readiness.record("load_model", time.time() - start)
+        
+        readiness.set_stage("preloading_voices")
+        start = time.time()
+        await loop.run_in_executor(None, preload_voices)
+        readiness.record("preload_voices", time.time() - start)
+        
+        if WARMUP:
+            readiness.set_stage("warmup")
+            start = time.time()
+            await loop.run_in_executor(None, warmup)
+            readiness.record("warmup", time.time() - start)
+        
+        readiness.mark_ready()
+    except Exception as e:
+        readiness.mark_failed(e)
+
+
+@app.on_event("startup")
+async def startup():
+    # Referenz halten, sonst kann der Garbage Collector den Task mittendrin einsammeln
+    app.state.prepare_task = asyncio.create_task(prepare())
+
+
+@app.get("/live")
+async def live():
+    return readiness.live()
+
+
+@app.get("/ready")
+async def ready():
+    return readiness.ready_response()
+
+
 @app.get("/health")
 async def health():
     return {
         "status": "healthy",
+        "ready": readiness.ready,
         "model": "chatterbox",
         "device": DEVICE,
         "mps_available": torch.backends.mps.is_available(),
         "loaded": model is not None,
         "voices": [f.stem for f in VOICES_DIR.glob("*.wav")],
-        "sample_rate": model.sr if model else None
+        "sample_rate": model.sr if model else None,
+        "batch_size": BATCH_SIZE,
+        "phrase_cache": phrase_cache.stats(),
+        "conds_cache": conds_cache.stats()
     }
 
 
@@ -148,6 +589,7 @@ async def clone_voice(audio: UploadFile = File(...), name: str = Form(...)):
         import librosa
         y, sr = librosa.load(tmp_path, sr=22050)
         import soundfile as sf
+        conds_cache.invalidate(voice_path)
         sf.write(str(voice_path), y, sr)
         
         return {"status": "success", "voice": name}
@@ -156,10 +598,15 @@ async def clone_voice(audio: UploadFile = File(...), name: str = Form(...)):
 
 
 @app.post("/tts")
-async def text_to_speech(request: TTSRequest):
+async def text_to_speech(request: TTSRequest, http_request: Request):
     if model is None:
         raise HTTPException(503, "Model not loaded")
     
+    try:
+        fmt = negotiate_format(request.format, http_request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
     # Parameter validieren
     request.validate_params()
     
@@ -168,53 +615,38 @@ async def text_to_speech(request: TTSRequest):
         # Ohne Voice Cloning - Default Stimme
         voice_path = None
     
+    text = request.text.strip().replace("\n", " ").replace("\r", "")
     try:
-        text = request.text.strip().replace("\n", " ").replace("\r", "")
-        chunks = split_text(text)
-        
-        logger.info(f"TTS: {len(text)} chars -> {len(chunks)} chunks")
-        
-        all_audio = []
-        for i, chunk in enumerate(chunks):
-            logger.info(f"  Chunk {i+1}/{len(chunks)}: {len(chunk)} chars")
+        trace_id = http_request.headers.get(TRACE_HEADER)
+        with track_request(len(text), "chatterbox", trace_id) as metrics:
+            with metrics.span("split_text"):
+                chunks = split_text(text)
             
-            if voice_path:
-                wav = model.generate(
-                    chunk,
-                    audio_prompt_path=str(voice_path),
-                    exaggeration=request.exaggeration,
-                    cfg_weight=request.cfg_weight,
-                    temperature=request.temperature
-                )
-            else:
-                wav = model.generate(
-                    chunk,
-                    exaggeration=request.exaggeration,
-                    cfg_weight=request.cfg_weight,
-                    temperature=request.temperature
-                )
+            logger.info(f"TTS: {len(text)} chars -> {len(chunks)} chunks")
             
-            all_audio.append(wav.squeeze().numpy())
-        
-        # Zusammenfuegen
-        if len(all_audio) > 1:
-            pause = np.zeros(int(model.sr * 0.2))  # 200ms Pause
-            combined = []
-            for i, audio in enumerate(all_audio):
-                combined.append(audio)
-                if i < len(all_audio) - 1:
-                    combined.append(pause)
-            final_audio = np.concatenate(combined)
-        else:
-            final_audio = all_audio[0]
-        
-        # Als WAV speichern
-        buffer = io.BytesIO()
-        import soundfile as sf
-        sf.write(buffer, final_audio, model.sr, format='WAV')
-        buffer.seek(0)
-        
-        return StreamingResponse(buffer, media_type="audio/wav")
+            # Einmal pro Request statt pro Chunk; Modell und Cache-IO laufen im
+            # Executor, damit /health, /ready und andere Streams weiter antworten
+            loop = asyncio.get_running_loop()
+            with metrics.phase("conditioning"):
+                conds = await loop.run_in_executor(None, get_conditionals, voice_path)
+            
+            # Bereits synthetisierte Chunks kommen aus dem Phrase-Cache
+            voice_hash = await loop.run_in_executor(None, phrase_cache.voice_hash, voice_path)
+            
+            # Fehlende Chunks gehen in Gruppen von BATCH_SIZE durch T3
+            all_audio, cached = await loop.run_in_executor(
+                None, render_chunks, chunks, conds, request, voice_hash, metrics
+            )
+            for i, chunk in enumerate(chunks):
+                logger.info(f"  Chunk {i+1}/{len(chunks)}: {len(chunk)} chars{' (cached)' if cached[i] else ''}")
+            
+            # Zusammenfuegen
+            final_audio = join_chunks(all_audio, model.sr, PAUSE_SECONDS)
+            metrics.audio_seconds = len(final_audio) / model.sr
+            
+            with metrics.phase("encoding"):
+                data = await encode_audio_async(final_audio, model.sr, fmt)
+            return Response(content=data, media_type=media_type(fmt))
     
     except Exception as e:
         logger.error(f"TTS error: {e}")
@@ -223,16 +655,95 @@ async def text_to_speech(request: TTSRequest):
         raise HTTPException(500, str(e))
 
 
+@app.post("/tts/stream")
+async def text_to_speech_stream(request: TTSRequest, http_request: Request):
+    """Wie /tts, aber jeder Chunk geht als PCM raus, sobald er fertig ist.
+    
+    Antwort ist ein WAV-Stream (16 bit, unbekannte Laenge): Header sofort,
+    danach Chunk + Pause. Mit format pcm16/pcmf16 (Hub) stattdessen
+    pcm_wire-Header + rohe Samples. Fehler mitten im Stream brechen ihn nur ab.
+    """
+    if model is None:
+        raise HTTPException(503, "Model not loaded")
+    
+    request.validate_params()
+    
+    voice_path = VOICES_DIR / f"{request.voice}.wav"
+    if not voice_path.exists():
+        voice_path = None
+    
+    text = request.text.strip().replace("\n", " ").replace("\r", "")
+    chunks = split_text(text)
+    logger.info(f"TTS stream: {len(text)} chars -> {len(chunks)} chunks")
+    
+    fmt = stream_format(request.format, http_request.headers.get("accept"))
+    
+    async def stream():
+        loop = asyncio.get_running_loop()
+        yield stream_header(model.sr, fmt)
+        try:
+            trace_id = http_request.headers.get(TRACE_HEADER)
+            with track_request(len(text), "chatterbox", trace_id) as metrics:
+                with metrics.phase("conditioning"):
+                    conds = await loop.run_in_executor(None, get_conditionals, voice_path)
+                    voice_hash = await loop.run_in_executor(None, phrase_cache.voice_hash, voice_path)
+                pause = pcm_frame(np.zeros(int(model.sr * PAUSE_SECONDS)), fmt)
+                
+                for i, chunk in enumerate(chunks):
+                    audio, cached = await loop.run_in_executor(
+                        None, render_chunk, chunk, conds, request, voice_hash, metrics
+                    )
+                    logger.info(f"  Chunk {i+1}/{len(chunks)}: {len(chunk)} chars{' (cached)' if cached else ''}")
+                    metrics.audio_seconds += len(audio) / model.sr
+                    yield pcm_frame(audio, fmt)
+                    if i < len(chunks) - 1:
+                        yield pause
+        except Exception as e:
+            logger.error(f"TTS stream error: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    return StreamingResponse(stream(), media_type=media_type(fmt))
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return metrics_response()
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10):
+    """Python-Stacks aller Threads plus torch-Operatoren der Inferenz fuer seconds abtasten, Collapsed-Stack-Format"""
+    return await profile_response(request, seconds, PROFILE_TOKEN, "chatterbox")
+
+
+@app.post("/voices/{name}/warm")
+async def warm_voice(name: str):
+    """Conditionals einer Stimme vorab in den Cache laden (Hub-Sessions zu Beginn)"""
+    if model is None:
+        raise HTTPException(503, "Model not loaded")
+    
+    voice_path = VOICES_DIR / f"{name}.wav"
+    if not voice_path.exists():
+        raise HTTPException(404, f"Stimme '{name}' nicht gefunden")
+    
+    cached = str(voice_path) in conds_cache.entries
+    start = time.time()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_conditionals, voice_path)
+    return {"status": "warm", "voice": name, "cached": cached, "seconds": round(time.time() - start, 3)}
+
+
 @app.delete("/voices/{name}")
 async def delete_voice(name: str):
     voice_path = VOICES_DIR / f"{name}.wav"
     if not voice_path.exists():
         raise HTTPException(404, f"Stimme '{name}' nicht gefunden")
     
+    conds_cache.invalidate(voice_path)
     voice_path.unlink()
     return {"status": "deleted", "voice": name}
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8767)
+    serve(app, 8767, UDS)
@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+"""
+Gemeinsame Hilfen fuer die Engine-Server (XTTS, Chatterbox, MLX, Fish)
+Muss neben den Server-Skripten liegen
+"""
+
+import asyncio
+import functools
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter as StackCounter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+import pcm_wire
+from tracing import TRACE_HEADER, Trace
+
+logger = logging.getLogger(__name__)
+
+_file_hashes = {}
+
+
+def file_sha256(path) -> str:
+    """Inhalts-Hash einer Datei, gemerkt bis sich mtime oder Groesse aendern"""
+    stat = Path(path).stat()
+    memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if memo_key not in _file_hashes:
+        _file_hashes[memo_key] = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    return _file_hashes[memo_key]
+
+
+class PhraseCache:
+    """LRU-Cache fuer synthetisierte Chunks auf Disk (FLAC, 16 bit).
+
+    Schluessel ist ein Hash aus Stimmen-Datei, Sprache, Sampling-Parametern
+    und exaktem Chunk-Text. Die LRU-Reihenfolge lebt im Speicher und wird
+    beim Start aus den mtimes der Dateien rekonstruiert.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> Dateigroesse
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if self.enabled:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            files = sorted(self.dir.glob("*.flac"), key=lambda f: f.stat().st_mtime)
+            for f in files:
+                size = f.stat().st_size
+                self.entries[f.stem] = size
+                self.total += size
+            self._evict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def voice_hash(self, voice_path) -> str:
+        """Inhalts-Hash der Referenz-WAV, gemerkt bis sich Datei aendert"""
+        if voice_path is None:
+            return "default"
+        return file_sha256(voice_path)
+
+    def key(self, voice_hash: str, language: str, params: dict, text: str) -> str:
+        raw = json.dumps([voice_hash, language, params, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.flac"
+
+    def get(self, key: str):
+        """Audio als float32-Array oder None"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        path = self._path(key)
+        try:
+            audio, _ = sf.read(str(path), dtype="float32")
+            os.utime(path)
+            return audio
+        except Exception as e:
+            logger.warning(f"Phrase cache read failed ({key[:12]}): {e}")
+            with self.lock:
+                self.total -= self.entries.pop(key, 0)
+            return None
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int):
+        if not self.enabled:
+            return
+        path = self._path(key)
+        audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+        # Eigene Temp-Datei pro Schreibvorgang: zwei Requests mit gleichem Chunk schreiben parallel
+        with tempfile.NamedTemporaryFile(dir=self.dir, prefix=f"{key}.", suffix=".tmp", delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            sf.write(tmp_path, audio, sample_rate, format="FLAC", subtype="PCM_16")
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        size = path.stat().st_size
+        with self.lock:
+            self.total += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self._evict()
+
+    def get_many(self, keys: list) -> list:
+        return [self.get(key) for key in keys]
+
+    def put_many(self, items: list, sample_rate: int):
+        """[(key, audio), ...] schreiben"""
+        for key, audio in items:
+            self.put(key, audio, sample_rate)
+
+    def _evict(self):
+        while self.total > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total -= size
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "bytes": self.total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class Readiness:
+    """Startzustand eines Servers fuer /live und /ready.
+
+    /live antwortet, sobald der Prozess laeuft, und faellt auf 503, wenn
+    Laden oder Warmup gescheitert sind - dann soll der Supervisor neu starten.
+    /ready erst, wenn Modell geladen, Stimmen vorbereitet und die
+    Warmup-Synthese durch ist - vorher 503, damit Orchestrierung und Hub noch
+    keinen Traffic schicken.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stage = "starting"
+        self.ready = False
+        self.error = None
+        self.timings = {}
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+        logger.info(f"Startup: {stage}")
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = round(seconds, 2)
+
+    def mark_ready(self):
+        self.ready = True
+        self.stage = "ready"
+        logger.info(f"Ready after {time.time() - self.started:.1f}s")
+
+    def mark_failed(self, error: Exception):
+        self.error = str(error)
+        self.stage = "failed"
+        logger.error(f"Startup failed: {error}")
+
+    def live(self) -> JSONResponse:
+        uptime = round(time.time() - self.started, 1)
+        if self.stage == "failed":
+            return JSONResponse({"status": "failed", "error": self.error, "uptime": uptime}, status_code=503)
+        return JSONResponse({"status": "alive", "uptime": uptime})
+
+    def ready_response(self) -> JSONResponse:
+        payload = {"status": self.stage, "ready": self.ready, "timings": self.timings}
+        if self.error:
+            payload["error"] = self.error
+        return JSONResponse(payload, status_code=200 if self.ready else 503)
+
+
+def env_list(name: str, default: str = "") -> list[str]:
+    """Kommagetrennte Umgebungsvariable als Liste"""
+    return [v.strip() for v in os.environ.get(name, default).split(",") if v.strip()]
+
+
+# Ausgabeformate: Name -> (libsndfile-Format, Subtype, MIME-Type)
+AUDIO_FORMATS = {
+    "wav": ("WAV", None, "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "opus": ("OGG", "OPUS", "audio/ogg"),
+    "mp3": ("MP3", "MPEG_LAYER_III", "audio/mpeg"),
+}
+
+# Internes Rohformat fuer den Hub (pcm_wire): Name -> Sample-Encoding
+PCM_FORMATS = {"pcm16": "int16", "pcmf16": "float16"}
+
+FORMAT_ALIASES = {"ogg": "opus"}
+
+MIME_FORMATS = {
+    "audio/wav": "wav",
+    "audio/x-wav": "wav",
+    "audio/wave": "wav",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+}
+
+# Opus kennt nur diese Raten
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Encoding laeuft hier, nicht im Inferenz-Thread (libsndfile gibt das GIL frei)
+ENCODE_WORKERS = int(os.environ.get("ENCODE_WORKERS", "2"))
+encode_pool = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="encode")
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """Formatwahl: explizites format-Feld vor Accept-Header, sonst WAV.
+
+    Wirft ValueError bei unbekanntem format-Feld; ein Accept-Header ohne
+    passenden Typ faellt still auf WAV zurueck.
+    """
+    if requested:
+        fmt = requested.lower().strip()
+        fmt = FORMAT_ALIASES.get(fmt, fmt)
+        if fmt not in AUDIO_FORMATS and fmt not in PCM_FORMATS:
+            allowed = ", ".join([*AUDIO_FORMATS, *PCM_FORMATS])
+            raise ValueError(f"Unbekanntes Format '{requested}' (erlaubt: {allowed})")
+        return fmt
+
+    best, best_q = "wav", 0.0
+    for part in (accept or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        mime = fields[0].lower()
+        q = 1.0
+        encoding = "int16"
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    q = float(field[2:])
+                except ValueError:
+                    q = 0.0
+            elif field.startswith("encoding="):
+                encoding = field[9:].lower()
+        if mime == pcm_wire.MEDIA_TYPE:
+            fmt = next((f for f, e in PCM_FORMATS.items() if e == encoding), None)
+        else:
+            fmt = MIME_FORMATS.get(mime)
+        if fmt and q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def _resample_linear(audio: np.ndarray, sr: int, target_sr: int) -> np.ndarray:
+    n = int(round(len(audio) * target_sr / sr))
+    x = np.linspace(0, len(audio) - 1, n)
+    return np.interp(x, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def encode_audio(audio: np.ndarray, sample_rate: int, fmt: str = "wav") -> bytes:
+    """Audio-Array -> Bytes im gewuenschten Container"""
+    audio = np.asarray(audio)
+    if fmt in PCM_FORMATS:
+        channels = audio.shape[1] if audio.ndim == 2 else 1
+        return pcm_wire.header(sample_rate, channels, PCM_FORMATS[fmt]) + pcm_frame(audio, fmt)
+    container, subtype, _ = AUDIO_FORMATS[fmt]
+    if fmt != "wav":
+        audio = np.clip(audio.astype(np.float32), -1.0, 1.0)
+    if fmt == "opus" and sample_rate not in OPUS_RATES:
+        target = next((r for r in OPUS_RATES if r >= sample_rate), OPUS_RATES[-1])
+        audio = _resample_linear(audio, sample_rate, target)
+        sample_rate = target
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format=container, subtype=subtype)
+    return buffer.getvalue()
+
+
+async def encode_audio_async(audio: np.ndarray, sample_rate: int, fmt: str = "wav") -> bytes:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(encode_pool, encode_audio, audio, sample_rate, fmt)
+
+
+def media_type(fmt: str) -> str:
+    if fmt in PCM_FORMATS:
+        return pcm_wire.content_type(PCM_FORMATS[fmt])
+    return AUDIO_FORMATS[fmt][2]
+
+
+def stream_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """Formatwahl fuer /tts/stream: internes PCM, sonst wie bisher WAV
+    (komprimierte Formate werden im Stream ignoriert)"""
+    try:
+        fmt = negotiate_format(requested, accept)
+    except ValueError:
+        return "wav"
+    return fmt if fmt in PCM_FORMATS else "wav"
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1) -> bytes:
+    """WAV-Header fuer 16-bit PCM unbekannter Laenge (Groessen = 0xFFFFFFFF).
+
+    Browser und ffmpeg spielen so einen Stream ab, waehrend er noch waechst.
+    """
+    return pcm_wire.wav_header(sample_rate, channels)
+
+
+def stream_header(sample_rate: int, fmt: str = "wav") -> bytes:
+    """Erster Frame eines Streams: WAV-Header oder pcm_wire-Header"""
+    if fmt in PCM_FORMATS:
+        return pcm_wire.header(sample_rate, 1, PCM_FORMATS[fmt])
+    return wav_stream_header(sample_rate)
+
+
+def pcm16(audio: np.ndarray) -> bytes:
+    """Float-Audio -> 16-bit PCM little endian"""
+    audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+    return (audio * 32767).astype("<i2").tobytes()
+
+
+def pcm_frame(audio: np.ndarray, fmt: str = "wav") -> bytes:
+    """Samples fuer WAV-Streams und pcm16 als int16, fuer pcmf16 als float16 (ungeclippt)"""
+    if fmt == "pcmf16":
+        return np.asarray(audio, dtype="<f2").tobytes()
+    return pcm16(audio)
+
+
+def join_chunks(chunks: list, sample_rate: int, pause_seconds: float) -> np.ndarray:
+    """Chunk-Audio mit Stille dazwischen aneinanderhaengen (Stille im dtype der Chunks)"""
+    if len(chunks) == 1:
+        return chunks[0]
+    pause = np.zeros(int(sample_rate * pause_seconds), dtype=np.asarray(chunks[0]).dtype)
+    combined = []
+    for i, audio in enumerate(chunks):
+        combined.append(audio)
+        if i < len(chunks) - 1:
+            combined.append(pause)
+    return np.concatenate(combined)
+
+
+# Prometheus-Metriken - jeder Server ist ein eigenes Scrape-Target
+PHASES = ("queue", "conditioning", "inference", "encoding")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 90, 180)
+
+REQUEST_SECONDS = Histogram("tts_request_seconds", "End-to-end time of a synthesis request",
+                            buckets=LATENCY_BUCKETS)
+PHASE_SECONDS = Histogram("tts_phase_seconds", "Time per request phase", ["phase"], buckets=LATENCY_BUCKETS)
+REQUEST_ERRORS = Counter("tts_request_errors_total", "Synthesis requests that failed")
+CHARS = Counter("tts_chars_total", "Characters synthesized")
+AUDIO_SECONDS = Counter("tts_audio_seconds_total", "Seconds of audio produced")
+CHARS_PER_SECOND = Histogram("tts_chars_per_second", "Characters per second of request time",
+                             buckets=(5, 10, 25, 50, 100, 200, 400, 800, 1600))
+REAL_TIME_FACTOR = Histogram("tts_real_time_factor", "Request time / audio duration",
+                             buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 4, 8))
+IN_FLIGHT = Gauge("tts_requests_in_flight", "Synthesis requests being processed")
+CACHE_HIT_RATIO = Gauge("tts_cache_hit_ratio", "Hit ratio since start", ["cache"])
+PROCESS_RSS = Gauge("tts_process_rss_bytes", "Resident set size (peak on macOS)")
+
+
+def process_rss() -> float:
+    """Aktuelles RSS aus /proc (Linux), sonst Spitzenwert aus getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+PROCESS_RSS.set_function(process_rss)
+
+
+def register_cache(name: str, stats_fn):
+    """Hit-Ratio eines Caches zur Scrape-Zeit aus seinem stats()-Dict"""
+    def ratio():
+        value = stats_fn().get("hit_ratio")
+        return float("nan") if value is None else value
+    CACHE_HIT_RATIO.labels(cache=name).set_function(ratio)
+
+
+class RequestMetrics:
+    """Phasen und Ergebnis eines Requests; erst observe() schreibt nach Prometheus.
+    
+    Jede Phase ist zugleich ein Span im Trace. Phasen, die ein Server nicht
+    misst, tauchen fuer ihn nicht auf.
+    """
+    
+    def __init__(self, chars: int = 0, trace: Optional[Trace] = None):
+        self.chars = chars
+        self.audio_seconds = 0.0
+        self.phases = {}
+        self.start = time.perf_counter()
+        self.trace = trace or Trace(None)
+    
+    def add(self, phase: str, seconds: float, start: Optional[float] = None):
+        """start als perf_counter-Zeitpunkt; ohne Angabe endet der Span jetzt"""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        start = time.perf_counter() - seconds if start is None else start
+        self.trace.add(phase, Trace.wall(start), seconds)
+    
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, start)
+    
+    def span(self, name: str, **attrs):
+        """Nur Trace, keine Prometheus-Phase (z.B. einzelne Chunks)"""
+        return self.trace.span(name, **attrs)
+    
+    @contextmanager
+    def locked(self, lock, phase: str = "inference"):
+        """lock halten: Wartezeit zaehlt als queue, gehaltene Zeit als phase"""
+        start = time.perf_counter()
+        with lock:
+            acquired = time.perf_counter()
+            self.add("queue", acquired - start, start)
+            try:
+                yield
+            finally:
+                self.add(phase, time.perf_counter() - acquired, acquired)
+    
+    def observe(self):
+        total = time.perf_counter() - self.start
+        REQUEST_SECONDS.observe(total)
+        for phase, seconds in self.phases.items():
+            PHASE_SECONDS.labels(phase=phase).observe(seconds)
+        CHARS.inc(self.chars)
+        AUDIO_SECONDS.inc(self.audio_seconds)
+        if total > 0:
+            CHARS_PER_SECOND.observe(self.chars / total)
+        if self.audio_seconds > 0:
+            REAL_TIME_FACTOR.observe(total / self.audio_seconds)
+
+
+@contextmanager
+def track_request(chars: int, service: Optional[str] = None, trace_id: Optional[str] = None):
+    """Umschliesst einen Synthese-Request: in-flight, Fehler, Phasen, Trace.
+    
+    trace_id kommt vom Hub (Header X-Trace-Id), sonst wird eine vergeben.
+    """
+    metrics = RequestMetrics(chars, Trace(service, trace_id))
+    status = "ok"
+    IN_FLIGHT.inc()
+    try:
+        yield metrics
+    except BaseException:
+        status = "error"
+        REQUEST_ERRORS.inc()
+        raise
+    else:
+        metrics.observe()
+    finally:
+        IN_FLIGHT.dec()
+        metrics.trace.add("request", Trace.wall(metrics.start), time.perf_counter() - metrics.start,
+                          status=status, chars=chars, audio_seconds=round(metrics.audio_seconds, 3))
+        metrics.trace.write()
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+UDS_SEND_BUFFER = 4 << 20
+
+
+def _unix_buffered_protocol():
+    """uvicorn-HTTP-Protokoll mit grossem Sendepuffer fuer Unix-Socket-Verbindungen.
+
+    Akzeptierte Unix-Sockets erben SO_SNDBUF nicht vom lauschenden Socket und
+    bleiben beim Default (~200 KB); mehrere MB WAV brauchen dann viele
+    Event-Loop-Runden und sind langsamer als Loopback-TCP.
+    """
+    import socket
+    from uvicorn.protocols.http.auto import AutoHTTPProtocol
+
+    class UnixBufferedProtocol(AutoHTTPProtocol):
+        def connection_made(self, transport):
+            sock = transport.get_extra_info("socket")
+            if sock is not None and sock.family == socket.AF_UNIX:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UDS_SEND_BUFFER)
+            super().connection_made(transport)
+
+    return UnixBufferedProtocol
+
+
+def serve(app, port: int, uds: str = ""):
+    """uvicorn auf 0.0.0.0:port; mit uds zusaetzlich auf einem Unix-Socket.
+
+    Hub und CLI auf demselben Host erreichen den Server dann ueber
+    unix://<uds> ohne TCP-Stack, alle anderen weiter ueber den Port.
+    """
+    import socket
+    import uvicorn
+
+    if not uds:
+        uvicorn.run(app, host="0.0.0.0", port=port)
+        return
+
+    tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    tcp.bind(("0.0.0.0", port))
+
+    Path(uds).unlink(missing_ok=True)  # Reste eines frueheren Laufs
+    unix = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    unix.bind(uds)
+    os.chmod(uds, 0o660)
+    logger.info(f"Listening on 0.0.0.0:{port} and unix://{uds}")
+    uvicorn.Server(uvicorn.Config(app, http=_unix_buffered_protocol())).run(sockets=[tcp, unix])
+
+
+# On-Demand-Profiling: Sampler-Thread existiert nur waehrend einer Messung
+PROFILE_MAX_SECONDS = 120
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "10")) / 1000
+PROFILE_TORCH_OPS = 30  # so viele torch-Operatoren (nach Self-CPU-Zeit) kommen in den Report
+_profile_lock = threading.Lock()
+
+# torch-Profiler zeichnen nur den Thread auf, in dem sie laufen. Deshalb startet
+# torch_ops() einen pro Inferenzaufruf im Executor-Thread, solange eine Messung
+# laeuft, und sammelt die Self-CPU-Zeit pro Operator hier (Mikrosekunden).
+_torch_profiling = threading.Event()
+_torch_op_times = StackCounter()
+_torch_op_lock = threading.Lock()
+_torch_thread = threading.local()
+
+
+@contextmanager
+def _torch_op_profile():
+    torch = sys.modules.get("torch")
+    if torch is None or not _torch_profiling.is_set() or getattr(_torch_thread, "active", False):
+        yield
+        return
+    try:
+        profiler = torch.autograd.profiler.profile(record_shapes=False)
+        profiler.__enter__()
+    except Exception as e:
+        logger.warning(f"torch profiler unavailable: {e}")
+        yield
+        return
+    _torch_thread.active = True
+    try:
+        yield
+    finally:
+        _torch_thread.active = False
+        profiler.__exit__(None, None, None)
+        if _torch_profiling.is_set():
+            times = {event.key: event.self_cpu_time_total for event in profiler.key_averages()}
+            with _torch_op_lock:
+                _torch_op_times.update(times)
+
+
+def torch_ops(fn):
+    """Decorator fuer Inferenzfunktionen (laufen im Executor): waehrend /debug/profile
+    landen ihre torch-Operatoren im Report, sonst nur ein Event-Check"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _torch_op_profile():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ":")
+
+
+def sample_stacks(seconds: float, interval: float = PROFILE_INTERVAL) -> str:
+    """Python-Stacks aller Threads fuer seconds abtasten -> Collapsed-Stack-Text.
+
+    Eine Zeile pro Stack ("thread;aeusserer;...;innerer anzahl"), direkt
+    lesbar fuer flamegraph.pl und speedscope. Hat der Server torch geladen,
+    haengen die PROFILE_TORCH_OPS teuersten Operatoren aus den mit torch_ops
+    markierten Inferenzaufrufen (Self-CPU-Zeit, umgerechnet in Samples) unter
+    dem Wurzelknoten "torch-ops".
+    """
+    samples = StackCounter()
+    own = threading.get_ident()
+    names = {}
+    with _torch_op_lock:
+        _torch_op_times.clear()
+    _torch_profiling.set()
+    try:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                samples[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _torch_profiling.clear()
+
+    with _torch_op_lock:
+        ops = _torch_op_times.most_common(PROFILE_TORCH_OPS)
+        _torch_op_times.clear()
+    for key, micros in ops:
+        weight = round(micros / 1e6 / interval)
+        if weight > 0:
+            samples[f"torch-ops;{key.replace(';', ':')}"] += weight
+
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+async def profile_response(request: Request, seconds: float, token: str, service: str) -> PlainTextResponse:
+    """GET /debug/profile: nur mit gesetztem Token (Authorization: Bearer ...)"""
+    if not token:
+        raise HTTPException(404, "Profiling disabled")
+    auth = request.headers.get("authorization", "")
+    if not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(401, "Invalid profiling token")
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(400, f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(409, "Profiling already running")
+
+    try:
+        logger.info(f"Profiling for {seconds}s")
+        loop = asyncio.get_running_loop()
+        collapsed = await loop.run_in_executor(None, sample_stacks, seconds)
+    finally:
+        _profile_lock.release()
+
+    filename = f"{service}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
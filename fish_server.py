@@ -4,24 +4,69 @@ Fish Speech TTS Server
 API Server fuer Fish Speech / OpenAudio auf Apple Silicon
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import soundfile as sf
 import numpy as np
 import io
 import os
+import sys
+import time
+import queue
+import asyncio
+import logging
+import threading
 from pathlib import Path
 from typing import Optional
 import torch
 
+# Fish-Speech-Repo einmal in den Pfad, nicht pro Request
+FISH_REPO = Path.home() / "fish-speech-repo"
+if str(FISH_REPO) not in sys.path:
+    sys.path.insert(0, str(FISH_REPO))
+
+from tools.llama.generate import generate_long, load_model as load_llama
+from tools.vqgan.inference import decode, load_model as load_vqgan
+
+from engine_utils import (TRACE_HEADER, Readiness, encode_audio_async, media_type, metrics_response, negotiate_format,
+                          pcm_frame, profile_response, serve, stream_format, stream_header, torch_ops, track_request)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Fish Speech TTS Server")
 
 # Globale Variablen
 model = None
+generate_lock = threading.Lock()  # LLaMA-KV-Cache ist globaler Zustand, eine Generierung gleichzeitig
 VOICES_DIR = Path.home() / "voices" / "fish"
 VOICES_DIR.mkdir(parents=True, exist_ok=True)
-CHECKPOINT_PATH = Path.home() / "fish-speech-repo" / "checkpoints" / "fish-speech-1.5"
+CHECKPOINT_PATH = FISH_REPO / "checkpoints" / "fish-speech-1.5"
+
+# Modell beim Start laden und einmal synthetisieren statt beim ersten Request
+PRELOAD = os.environ.get("FISH_PRELOAD", "1") == "1"
+WARMUP = os.environ.get("FISH_WARMUP", "1") == "1"
+
+WARMUP_TEXT = "Hallo, das ist ein kurzer Test."
+readiness = Readiness()
+
+# /debug/profile nur mit Token (Authorization: Bearer ...), ohne Token deaktiviert
+PROFILE_TOKEN = os.environ.get("FISH_PROFILE_TOKEN", "")
+
+# Zusaetzlich auf einem Unix-Socket lauschen (z.B. /tmp/tts-fish.sock), Hub-URL dann unix://...
+UDS = os.environ.get("FISH_UDS", "")
+
+SAMPLE_RATE = 21000  # Fish Speech uses 21kHz
+
+# VQGAN dekodiert ein Segment, waehrend LLaMA das naechste erzeugt
+PIPELINE = os.environ.get("FISH_PIPELINE", "1") == "1"
+CHUNK_LENGTH = int(os.environ.get("FISH_CHUNK_LENGTH", "200"))  # Zeichen pro Textsegment
+_done = object()
+next_segment = torch_ops(next)  # ein LLaMA-Segment, fuer /debug/profile einzeln aufgezeichnet
+
+# VQGAN-Codes der Referenzstimmen: <voice>.npy neben der WAV, plus im Speicher
+prompt_cache = {}  # voice path -> (wav mtime_ns, tokens)
 
 
 class TTSRequest(BaseModel):
@@ -30,6 +75,7 @@ class TTSRequest(BaseModel):
     language: str = "de"
     temperature: float = 0.7
     top_p: float = 0.8
+    format: Optional[str] = None  # wav, flac, opus, mp3, pcm16, pcmf16 - sonst Accept-Header
 
 
 def load_fish_model():
@@ -38,14 +84,8 @@ def load_fish_model():
     if model is not None:
         return model
     
-    import sys
-    sys.path.insert(0, str(Path.home() / "fish-speech-repo"))
-    
-    from tools.llama.generate import load_model
-    from tools.vqgan.inference import load_model as load_vqgan
-    
     # Lade Modelle
-    llama_model = load_model(
+    llama_model = load_llama(
         checkpoint_path=str(CHECKPOINT_PATH),
         device="mps",
         precision=torch.float16
@@ -63,51 +103,156 @@ def load_fish_model():
     return model
 
 
+@torch_ops
+@torch.no_grad()
+def encode_reference(voice_path: Path) -> torch.Tensor:
+    """Referenz-WAV einmal durch den VQGAN-Encoder -> Codes (codebooks x frames)"""
+    import torchaudio
+    
+    m = load_fish_model()
+    vqgan = m["vqgan"]
+    data, sr = sf.read(str(voice_path), dtype="float32")
+    if len(data.shape) > 1:
+        data = data.mean(axis=1)
+    audio = torch.from_numpy(data)[None, None].to(m["device"])
+    audio = torchaudio.functional.resample(audio, sr, vqgan.spec_transform.sample_rate)
+    lengths = torch.tensor([audio.shape[-1]], device=m["device"], dtype=torch.long)
+    return vqgan.encode(audio, lengths)[0][0].cpu()
+
+
+def get_prompt_tokens(voice_path: Path) -> torch.Tensor:
+    """Codes einer Stimme aus Speicher, <voice>.npy oder frisch kodiert.
+    
+    Die .npy gilt nur, solange sie juenger als die WAV ist.
+    """
+    mtime = voice_path.stat().st_mtime_ns
+    entry = prompt_cache.get(str(voice_path))
+    if entry and entry[0] == mtime:
+        return entry[1]
+    
+    npy_path = voice_path.with_suffix(".npy")
+    if npy_path.exists() and npy_path.stat().st_mtime_ns >= mtime:
+        tokens = torch.from_numpy(np.load(npy_path))
+    else:
+        start = time.time()
+        tokens = encode_reference(voice_path)
+        np.save(npy_path, tokens.numpy())
+        logger.info(f"Prompt tokens for {voice_path.stem} encoded in {time.time() - start:.1f}s")
+    
+    prompt_cache[str(voice_path)] = (mtime, tokens)
+    return tokens
+
+
+def generate_codes(req: TTSRequest, m: dict):
+    """LLaMA-Codes Segment fuer Segment - generate_long liefert pro Textsegment"""
+    # Check for reference voice - Codes statt Audio, der VQGAN-Encoder laeuft nur einmal
+    voice_path = VOICES_DIR / f"{req.voice}.wav"
+    prompt_tokens = None
+    prompt_text = None
+    if voice_path.exists():
+        prompt_tokens = get_prompt_tokens(voice_path)
+        text_path = voice_path.with_suffix(".txt")
+        prompt_text = text_path.read_text().strip() if text_path.exists() else ""
+    
+    for response in generate_long(
+        model=m["llama"],
+        text=req.text,
+        prompt_tokens=prompt_tokens,
+        prompt_text=prompt_text,
+        temperature=req.temperature,
+        top_p=req.top_p,
+        device=m["device"],
+        iterative_prompt=True,
+        chunk_length=CHUNK_LENGTH
+    ):
+        if response.action == "sample":
+            yield response.codes
+
+
+@torch_ops
+def decode_audio(m: dict, codes) -> np.ndarray:
+    audio = decode(m["vqgan"], codes, device=m["device"])
+    
+    # Convert to numpy
+    if isinstance(audio, torch.Tensor):
+        audio = audio.float().cpu().numpy()
+    
+    # Ensure correct shape
+    if len(audio.shape) > 1:
+        audio = audio.squeeze()
+    
+    return audio
+
+
+def pipelined_audio(req: TTSRequest):
+    """Audio pro Segment, waehrend LLaMA schon das naechste Segment erzeugt.
+    
+    Generierung laeuft in einem eigenen Thread, dekodiert wird im aufrufenden.
+    Die Queue haelt hoechstens zwei fertige Segmente vor. Bricht der Aufrufer
+    ab, hoert der Generator-Thread nach dem laufenden Segment auf. Der Thread
+    haelt generate_lock ueber alle Segmente eines Requests; Dekodieren laeuft
+    ausserhalb und ueberlappt so mit der Generierung des naechsten Requests.
+    """
+    m = load_fish_model()
+    segments = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    
+    def produce():
+        try:
+            with generate_lock:
+                codes_iter = generate_codes(req, m)
+                while (codes := next_segment(codes_iter, _done)) is not _done:
+                    if stop.is_set():
+                        return
+                    segments.put(codes)
+            segments.put(_done)
+        except Exception as e:
+            segments.put(e)
+    
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = segments.get()
+            if item is _done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield decode_audio(m, item)
+    finally:
+        stop.set()
+        while not segments.empty():
+            segments.get_nowait()
+
+
+def synthesize(req: TTSRequest) -> np.ndarray:
+    """Synthese ohne HTTP-Bezug - genutzt von /tts und vom Warmup"""
+    if PIPELINE:
+        return np.concatenate(list(pipelined_audio(req)))
+    
+    # Erst alle Codes, dann ein Decode
+    m = load_fish_model()
+    with generate_lock:
+        codes = torch.cat(list(generate_codes(req, m)), dim=1)
+    return decode_audio(m, codes)
+
+
 @app.post("/tts")
-async def text_to_speech(req: TTSRequest):
+async def text_to_speech(req: TTSRequest, http_request: Request):
     """Generiere Audio aus Text mit Fish Speech"""
     try:
-        import sys
-        sys.path.insert(0, str(Path.home() / "fish-speech-repo"))
-        
-        from tools.llama.generate import generate_long
-        from tools.vqgan.inference import decode
-        
-        m = load_fish_model()
-        
-        # Check for reference voice
-        voice_path = VOICES_DIR / f"{req.voice}.wav"
-        prompt_audio = None
-        if voice_path.exists():
-            prompt_audio = str(voice_path)
-        
-        # Generate codes
-        codes = generate_long(
-            model=m["llama"],
-            text=req.text,
-            prompt_audio=prompt_audio,
-            temperature=req.temperature,
-            top_p=req.top_p,
-            device=m["device"]
-        )
-        
-        # Decode to audio
-        audio = decode(m["vqgan"], codes, device=m["device"])
-        
-        # Convert to numpy
-        if isinstance(audio, torch.Tensor):
-            audio = audio.cpu().numpy()
-        
-        # Ensure correct shape
-        if len(audio.shape) > 1:
-            audio = audio.squeeze()
-        
-        # Convert to WAV bytes
-        buffer = io.BytesIO()
-        sf.write(buffer, audio, 21000, format='WAV')  # Fish Speech uses 21kHz
-        buffer.seek(0)
-        
-        return Response(content=buffer.read(), media_type="audio/wav")
+        fmt = negotiate_format(req.format, http_request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    try:
+        with track_request(len(req.text), "fish", http_request.headers.get(TRACE_HEADER)) as metrics:
+            with metrics.phase("inference"):
+                audio = await asyncio.get_running_loop().run_in_executor(None, synthesize, req)
+            metrics.audio_seconds = len(audio) / SAMPLE_RATE
+            
+            with metrics.phase("encoding"):
+                data = await encode_audio_async(audio, SAMPLE_RATE, fmt)
+            return Response(content=data, media_type=media_type(fmt))
         
     except Exception as e:
         import traceback
@@ -115,10 +260,73 @@ async def text_to_speech(req: TTSRequest):
         raise HTTPException(500, str(e))
 
 
+@app.post("/tts/stream")
+async def text_to_speech_stream(req: TTSRequest, http_request: Request):
+    """WAV-Stream (16 bit, unbekannte Laenge): jedes Segment geht raus,
+    sobald der VQGAN es dekodiert hat - LLaMA rechnet derweil weiter.
+    Mit format pcm16/pcmf16 als pcm_wire-Frames statt WAV.
+    """
+    fmt = stream_format(req.format, http_request.headers.get("accept"))
+    
+    async def stream():
+        loop = asyncio.get_running_loop()
+        yield stream_header(SAMPLE_RATE, fmt)
+        try:
+            with track_request(len(req.text), "fish", http_request.headers.get(TRACE_HEADER)) as metrics:
+                segments = pipelined_audio(req)
+                try:
+                    while True:
+                        with metrics.phase("inference"):
+                            audio = await loop.run_in_executor(None, next, segments, None)
+                        if audio is None:
+                            break
+                        metrics.audio_seconds += len(audio) / SAMPLE_RATE
+                        yield pcm_frame(audio, fmt)
+                finally:
+                    # Client weg -> Generator-Thread stoppen, Lock freigeben. Laeuft next()
+                    # noch im Executor, raeumt der Generator beim Aufraeumen selbst auf
+                    try:
+                        segments.close()
+                    except ValueError:
+                        pass
+        except Exception as e:
+            logger.error(f"TTS stream error: {e}")
+    
+    return StreamingResponse(stream(), media_type=media_type(fmt))
+
+
+async def prepare():
+    """Modell vorladen und aufwaermen - /live antwortet sofort, /ready danach"""
+    loop = asyncio.get_running_loop()
+    try:
+        if PRELOAD:
+            readiness.set_stage("loading_model")
+            start = time.time()
+            await loop.run_in_executor(None, load_fish_model)
+            readiness.record("load_model", time.time() - start)
+            
+            if WARMUP:
+                readiness.set_stage("warmup")
+                start = time.time()
+                await loop.run_in_executor(None, synthesize, TTSRequest(text=WARMUP_TEXT))
+                readiness.record("warmup", time.time() - start)
+        
+        readiness.mark_ready()
+    except Exception as e:
+        readiness.mark_failed(e)
+
+
+@app.on_event("startup")
+async def startup():
+    # Referenz halten, sonst kann der Garbage Collector den Task mittendrin einsammeln
+    app.state.prepare_task = asyncio.create_task(prepare())
+
+
 @app.post("/clone")
 async def clone_voice(
     name: str = Form(...),
-    audio: UploadFile = File(...)
+    audio: UploadFile = File(...),
+    text: str = Form("")
 ):
     """Speichere Reference Audio fuer Voice Cloning"""
     try:
@@ -135,9 +343,20 @@ async def clone_voice(
         if len(data.shape) > 1:
             data = data.mean(axis=1)
         
-        # Speichere
+        # Speichere - Transkript optional, verbessert das Cloning
         voice_path = VOICES_DIR / f"{name}.wav"
         sf.write(voice_path, data, 21000)
+        text_path = voice_path.with_suffix(".txt")
+        if text.strip():
+            text_path.write_text(text.strip())
+        else:
+            text_path.unlink(missing_ok=True)
+        
+        # Prompt-Codes gleich jetzt, wenn das Modell schon geladen ist
+        prompt_cache.pop(str(voice_path), None)
+        voice_path.with_suffix(".npy").unlink(missing_ok=True)
+        if model is not None:
+            await asyncio.get_running_loop().run_in_executor(None, get_prompt_tokens, voice_path)
         
         return {"status": "ok", "voice": name}
         
@@ -162,19 +381,41 @@ async def list_voices():
     }
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return metrics_response()
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10):
+    """Python-Stacks aller Threads plus torch-Operatoren der Inferenz fuer seconds abtasten, Collapsed-Stack-Format"""
+    return await profile_response(request, seconds, PROFILE_TOKEN, "fish")
+
+
+@app.get("/live")
+async def live():
+    return readiness.live()
+
+
+@app.get("/ready")
+async def ready():
+    return readiness.ready_response()
+
+
 @app.get("/health")
 async def health():
     """Health Check"""
     model_loaded = model is not None
     return {
         "status": "ok",
+        "ready": readiness.ready,
         "engine": "fish-speech-1.5",
         "device": "Apple Silicon (MPS)",
         "model_loaded": model_loaded,
+        "prompt_tokens_cached": sorted(Path(p).stem for p in prompt_cache),
         "checkpoint": str(CHECKPOINT_PATH)
     }
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8769)
+    serve(app, 8769, UDS)
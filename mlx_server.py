@@ -2,22 +2,45 @@
 """
 MLX-Audio TTS Server
 API Server fuer Kokoro und Marvis TTS auf Apple Silicon
+Mit MLX_BACKEND=onnx: Kokoro via ONNX Runtime auf CPU (Linux)
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import soundfile as sf
 import numpy as np
 import io
+import gc
 import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional
 
+from engine_utils import (TRACE_HEADER, Readiness, encode_audio_async, env_list, file_sha256, media_type, metrics_response,
+                          negotiate_format, pcm_frame, profile_response, serve, stream_format, stream_header,
+                          track_request)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="MLX-Audio TTS Server")
 
+# Backend: "mlx" (Apple Silicon, Kokoro + Marvis) oder "onnx" (nur Kokoro, CPU)
+BACKEND = os.environ.get("MLX_BACKEND", "mlx")
+ONNX_DIR = Path.home() / "models" / "kokoro-onnx"
+ONNX_MODEL = os.environ.get("MLX_ONNX_MODEL", str(ONNX_DIR / "kokoro-v1.0.onnx"))
+ONNX_VOICES = os.environ.get("MLX_ONNX_VOICES", str(ONNX_DIR / "voices-v1.0.bin"))
+ONNX_THREADS = int(os.environ.get("MLX_ONNX_THREADS", "0"))  # 0 = ORT-Default (alle Kerne)
+ONNX_LANGS = {"a": "en-us", "b": "en-gb"}
+
 # Globale Variablen
-models = {}
 VOICES_DIR = Path.home() / "voices" / "mlx"
 VOICES_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -36,6 +59,39 @@ KOKORO_VOICES = [
 ]
 
 
+# Beim Start laden und einmal synthetisieren (leer = lazy wie bisher)
+PRELOAD_MODELS = env_list("MLX_PRELOAD_MODELS", "kokoro")
+WARMUP = os.environ.get("MLX_WARMUP", "1") == "1"
+
+WARMUP_TEXT = "Hello, this is a short warmup."
+readiness = Readiness()
+
+# /debug/profile nur mit Token (Authorization: Bearer ...), ohne Token deaktiviert
+PROFILE_TOKEN = os.environ.get("MLX_PROFILE_TOKEN", "")
+
+# Zusaetzlich auf einem Unix-Socket lauschen (z.B. /tmp/tts-mlx.sock), Hub-URL dann unix://...
+UDS = os.environ.get("MLX_UDS", "")
+
+# KokoroPipeline pro lang_code (G2P + geladene Voice-Packs bleiben im Speicher)
+pipelines = {}
+pipeline_lock = threading.Lock()
+# Beim Start alle KOKORO_VOICES laden statt beim ersten Request
+KOKORO_WARM_VOICES = os.environ.get("MLX_KOKORO_WARM_VOICES", "0") == "1"
+
+# Marvis-Referenzen: geladenes Audio + Transkript pro Stimme
+ref_audio_cache = {}  # voice path -> (hash, audio, text)
+ref_audio_lock = threading.Lock()
+STT_MODEL = os.environ.get("MLX_STT_MODEL", "mlx-community/whisper-large-v3-turbo")
+
+# Speicherbudget fuer geladene Modelle (0 = unbegrenzt) und nie entladene Modelle
+MEMORY_BUDGET_MB = int(os.environ.get("MLX_MEMORY_BUDGET_MB", "0"))
+PINNED_MODELS = env_list("MLX_PINNED_MODELS", "kokoro")
+
+SAMPLE_RATE = 24000
+# /tts/stream: ein Segment pro Satz statt pro Absatz
+SENTENCE_SPLIT = r'(?<=[.!?])\s+|\n+'
+
+
 class TTSRequest(BaseModel):
     text: str
     voice: str = "af_heart"
@@ -44,108 +100,448 @@ class TTSRequest(BaseModel):
     language: str = "a"  # a=American English, b=British English
     temperature: float = 0.7
     top_p: float = 0.9
+    format: Optional[str] = None  # wav, flac, opus, mp3, pcm16, pcmf16 - sonst Accept-Header
 
 
 class CloneRequest(BaseModel):
     name: str
 
 
+class ModelRegistry:
+    """Geladene Modelle mit Speicherbudget und LRU-Verdraengung.
+    
+    Groesse eines Modells = Bytes seiner Parameter nach dem Laden. Wird das
+    Budget ueberschritten, werden unbenutzte, nicht gepinnte Modelle in
+    LRU-Reihenfolge entladen. Ist die Groesse von einem frueheren Laden
+    bekannt, wird schon vorher Platz geschaffen. Modelle in Benutzung
+    (registry.use) werden nie entladen.
+    
+    Geladen wird unter einem Lock pro Modell, ohne das Registry-Lock: ein
+    langsamer Load blockiert weder Requests auf bereits geladene Modelle noch
+    /health. Das Registry-Lock schuetzt nur Buchhaltung und Verdraengung.
+    """
+    
+    def __init__(self, budget_bytes: int, pinned: list[str]):
+        self.budget = budget_bytes
+        self.pinned = set(pinned)
+        self.entries = OrderedDict()  # name -> model data, LRU zuerst
+        self.in_use = {}
+        self.stats = {}
+        self.lock = threading.RLock()
+        self.load_locks = {}  # name -> Lock, nur ein Load pro Modell gleichzeitig
+    
+    @property
+    def used(self) -> int:
+        return sum(self.stats[name]["bytes"] for name in self.entries)
+    
+    def get(self, name: str) -> dict:
+        """Modell laden falls noetig und als zuletzt benutzt markieren"""
+        return self._acquire(name, hold=False)
+    
+    @contextmanager
+    def use(self, name: str):
+        data = self._acquire(name, hold=True)
+        try:
+            yield data
+        finally:
+            with self.lock:
+                self.in_use[name] -= 1
+    
+    def _acquire(self, name: str, hold: bool) -> dict:
+        with self.lock:
+            if name in self.entries:
+                return self._touch(name, hold)
+            load_lock = self.load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            with self.lock:
+                if name in self.entries:  # anderer Thread war schneller
+                    return self._touch(name, hold)
+                stats = self.stats.setdefault(name, {
+                    "bytes": 0, "loads": 0, "unloads": 0,
+                    "load_seconds": None, "unload_seconds": None, "last_used": None,
+                })
+                self._evict(extra=stats["bytes"], keep=name)
+            
+            start = time.time()
+            entry, nbytes = self._load(name)
+            
+            with self.lock:
+                self.entries[name] = entry
+                stats["bytes"] = nbytes
+                stats["loads"] += 1
+                stats["load_seconds"] = round(time.time() - start, 2)
+                logger.info(f"Loaded {name} ({nbytes / 1e6:.0f} MB) in {stats['load_seconds']:.1f}s")
+                data = self._touch(name, hold)
+                self._evict(keep=name)
+                return data
+    
+    def _touch(self, name: str, hold: bool) -> dict:
+        """Unter self.lock: als zuletzt benutzt markieren, bei hold gegen Entladen sperren"""
+        self.entries.move_to_end(name)
+        self.stats[name]["last_used"] = time.time()
+        if hold:
+            self.in_use[name] = self.in_use.get(name, 0) + 1
+        return self.entries[name]
+    
+    def _load(self, name: str) -> tuple[dict, int]:
+        """Das eigentliche Laden, ohne Registry-Lock -> (Eintrag, Bytes)"""
+        if BACKEND == "onnx":
+            model_id = ONNX_MODEL
+            model = load_onnx_kokoro(ONNX_MODEL, ONNX_VOICES, ONNX_THREADS)
+            nbytes = os.path.getsize(ONNX_MODEL)
+        else:
+            from mlx.utils import tree_flatten
+            from mlx_audio.tts.utils import load_model as mlx_load
+            
+            model_id = AVAILABLE_MODELS[name]
+            model = mlx_load(model_id)
+            nbytes = sum(v.nbytes for _, v in tree_flatten(model.parameters()))
+        return {"model": model, "model_id": model_id, "type": name}, nbytes
+    
+    def _evict(self, extra: int = 0, keep: Optional[str] = None):
+        if not self.budget:
+            return
+        while self.used + extra > self.budget:
+            idle = [name for name in self.entries
+                    if name != keep and name not in self.pinned and not self.in_use.get(name)]
+            if not idle:
+                logger.warning(f"Memory budget exceeded ({(self.used + extra) / 1e6:.0f} MB), nothing to evict")
+                return
+            self._unload(idle[0])
+    
+    def _unload(self, name: str):
+        start = time.time()
+        del self.entries[name]
+        if name == "kokoro":
+            pipelines.clear()  # halten eine Referenz aufs Modell
+        gc.collect()
+        if BACKEND == "mlx":
+            import mlx.core as mx
+            mx.clear_cache()
+        stats = self.stats[name]
+        stats["unloads"] += 1
+        stats["unload_seconds"] = round(time.time() - start, 2)
+        logger.info(f"Unloaded {name} in {stats['unload_seconds']:.2f}s")
+    
+    def health(self) -> dict:
+        with self.lock:
+            return {
+                "budget_bytes": self.budget,
+                "used_bytes": self.used,
+                "pinned": sorted(self.pinned),
+                "models": {name: dict(stats, loaded=name in self.entries, in_use=self.in_use.get(name, 0))
+                           for name, stats in self.stats.items()},
+            }
+
+
+registry = ModelRegistry(MEMORY_BUDGET_MB * 1024 * 1024, PINNED_MODELS)
+
+
+def available_models() -> list[str]:
+    return ["kokoro"] if BACKEND == "onnx" else list(AVAILABLE_MODELS)
+
+
 def load_model(model_name: str):
     """Lade ein Modell (lazy loading)"""
-    if model_name in models:
-        return models[model_name]
-    
-    if model_name not in AVAILABLE_MODELS:
+    if model_name not in available_models():
         raise HTTPException(400, f"Unbekanntes Modell: {model_name}")
+    return registry.get(model_name)
+
+
+def load_onnx_kokoro(model_path: str, voices_path: str, threads: int = 0):
+    """Kokoro-82M als eine InferenceSession, die alle Requests teilen"""
+    import onnxruntime as ort
+    from kokoro_onnx import Kokoro
     
-    model_id = AVAILABLE_MODELS[model_name]
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    return Kokoro.from_session(session, voices_path)
+
+
+def get_pipeline(lang_code: str):
+    """Gecachte KokoroPipeline - load_voice() merkt sich die Voice-Packs darin.
     
-    if model_name == "kokoro":
+    pipelines wird nur unter registry.lock gelesen und geschrieben, weil
+    _unload es dort leert. Gebaut wird unter pipeline_lock; war Kokoro
+    inzwischen entladen, wird die Pipeline benutzt, aber nicht gemerkt.
+    """
+    with registry.lock:
+        pipeline = pipelines.get(lang_code)
+    if pipeline is not None:
+        return pipeline
+    
+    with pipeline_lock:
+        model_data = load_model("kokoro")
+        with registry.lock:
+            pipeline = pipelines.get(lang_code)
+        if pipeline is not None:
+            return pipeline
+        
         from mlx_audio.tts.models.kokoro import KokoroPipeline
-        from mlx_audio.tts.utils import load_model as mlx_load
         
-        model = mlx_load(model_id)
-        models[model_name] = {"model": model, "model_id": model_id, "type": "kokoro"}
+        start = time.time()
+        pipeline = KokoroPipeline(
+            lang_code=lang_code,
+            model=model_data["model"],
+            repo_id=model_data["model_id"]
+        )
+        logger.info(f"Kokoro pipeline '{lang_code}' ready in {time.time() - start:.1f}s")
+        with registry.lock:
+            if registry.entries.get("kokoro") is model_data:
+                pipelines[lang_code] = pipeline
+        return pipeline
+
+
+def warm_kokoro_voices():
+    """Alle eingebauten Stimmen in die Pipeline ihrer Sprache laden (af_* -> a)"""
+    if BACKEND == "onnx":
+        return  # voices-v1.0.bin wird beim Laden komplett gelesen
+    for voice in KOKORO_VOICES:
+        get_pipeline(voice[0]).load_voice(voice)
+
+
+def get_reference(voice_path: Path, model):
+    """Referenz-Audio (auf Modell-Rate) und Transkript, gemerkt pro Datei-Hash.
+    
+    Transkript aus <voice>.txt, sonst einmal per Whisper erzeugt und dort
+    abgelegt - wie generate_audio(), aber nicht bei jedem Request.
+    """
+    from mlx_audio.tts.generate import load_audio
+    
+    key = str(voice_path)
+    digest = file_sha256(voice_path)
+    with ref_audio_lock:
+        entry = ref_audio_cache.get(key)
+        if entry and entry[0] == digest:
+            return entry[1], entry[2]
         
-    elif model_name == "marvis":
-        from mlx_audio.tts.utils import load_model as mlx_load
+        start = time.time()
+        ref_audio = load_audio(key, sample_rate=model.sample_rate)
+        text_path = voice_path.with_suffix(".txt")
+        if text_path.exists():
+            ref_text = text_path.read_text().strip()
+        else:
+            import mlx.core as mx
+            from mlx_audio.stt.models.whisper import Model as Whisper
+            
+            stt_model = Whisper.from_pretrained(path_or_hf_repo=STT_MODEL)
+            ref_text = stt_model.generate(ref_audio).text.strip()
+            del stt_model
+            mx.clear_cache()
+            text_path.write_text(ref_text)
         
-        model = mlx_load(model_id)
-        models[model_name] = {"model": model, "model_id": model_id, "type": "marvis"}
+        ref_audio_cache[key] = (digest, ref_audio, ref_text)
+        logger.info(f"Reference {voice_path.stem} prepared in {time.time() - start:.1f}s")
+        return ref_audio, ref_text
+
+
+def cache_reference_codes(model):
+    """Mimi-Codes der Referenzstimmen am Modell merken.
+    
+    Sesame/Marvis generate() kodiert ref_audio bei jedem Aufruf neu
+    (_tokenize_audio, Mimi-Encoder) und nimmt keine fertigen Codes an. Der
+    Wrapper liefert fuer Arrays aus ref_audio_cache die Codes vom ersten
+    Aufruf; alles andere wird normal kodiert. get_reference gibt pro Datei-Hash
+    immer dasselbe Array zurueck, daher reicht der Vergleich per Identitaet.
+    """
+    if hasattr(model, "_reference_codes") or not hasattr(model, "_tokenize_audio"):
+        return
+    encode = model._tokenize_audio
+    codes = {}  # (id(audio), add_eos) -> (audio, tokens)
+    
+    def tokenize_audio(audio, add_eos=True):
+        key = (id(audio), add_eos)
+        entry = codes.get(key)
+        if entry is not None and entry[0] is audio:
+            return entry[1]
+        tokens = encode(audio, add_eos=add_eos)
+        with ref_audio_lock:
+            current = [entry[1] for entry in ref_audio_cache.values()]
+        if any(audio is ref for ref in current):
+            # Codes ersetzter oder geloeschter Stimmen fallen dabei raus
+            for stale in [k for k, (a, _) in codes.items() if not any(a is ref for ref in current)]:
+                del codes[stale]
+            codes[key] = (audio, tokens)
+        return tokens
     
-    return models[model_name]
+    model._tokenize_audio = tokenize_audio
+    model._reference_codes = codes
 
 
-@app.post("/tts")
-async def text_to_speech(req: TTSRequest):
-    """Generiere Audio aus Text"""
+def marvis_sampler(req: TTSRequest):
+    """generate() ignoriert temperature/top_p als kwargs - es nimmt nur einen Sampler"""
     try:
-        model_data = load_model(req.model)
-        
+        from mlx_audio.lm.sample_utils import make_sampler
+    except ImportError:
+        from mlx_lm.sample_utils import make_sampler
+    # top_k=50 wie der Default-Sampler von generate()
+    return make_sampler(temp=req.temperature, top_p=req.top_p, top_k=50)
+
+
+def kokoro_segments(req: TTSRequest, split_pattern: str):
+    """Kokoro-Audio Segment fuer Segment, so wie die Pipeline es liefert"""
+    # Kokoro klont nicht: eigene Referenz-WAV -> eingebaute Default-Stimme (MLX und ONNX gleich)
+    voice = req.voice
+    if (VOICES_DIR / f"{req.voice}.wav").exists() and req.voice not in KOKORO_VOICES:
+        voice = KOKORO_VOICES[0]
+        logger.warning(f"Kokoro cannot use custom voice '{req.voice}', falling back to {voice}")
+    
+    # Modell bleibt geladen, bis der letzte Abschnitt erzeugt ist
+    if BACKEND == "onnx":
+        with registry.use("kokoro") as model_data:
+            for segment in re.split(split_pattern, req.text):
+                if not segment.strip():
+                    continue
+                samples, _ = model_data["model"].create(
+                    segment,
+                    voice=voice,
+                    speed=req.speed,
+                    lang=ONNX_LANGS.get(req.language, "en-us")
+                )
+                yield np.asarray(samples, dtype=np.float32)
+        return
+    
+    with registry.use("kokoro"):
+        pipeline = get_pipeline(req.language)
+        for _, _, audio in pipeline(
+            req.text,
+            voice=voice,
+            speed=req.speed,
+            split_pattern=split_pattern
+        ):
+            audio = np.asarray(audio, dtype=np.float32)
+            yield audio[0] if len(audio.shape) > 1 else audio
+
+
+def synthesize(req: TTSRequest) -> np.ndarray:
+    """Synthese ohne HTTP-Bezug - genutzt von /tts und vom Warmup"""
+    load_model(req.model)
+    with registry.use(req.model) as model_data:
         if model_data["type"] == "kokoro":
-            from mlx_audio.tts.models.kokoro import KokoroPipeline
-            
-            pipeline = KokoroPipeline(
-                lang_code=req.language,
-                model=model_data["model"],
-                repo_id=model_data["model_id"]
-            )
-            
-            # Check for custom voice (ref audio)
-            custom_voice_path = VOICES_DIR / f"{req.voice}.wav"
-            ref_audio = str(custom_voice_path) if custom_voice_path.exists() else None
-            
-            audio_chunks = []
-            for _, _, audio in pipeline(
-                req.text,
-                voice=req.voice if not ref_audio else None,
-                speed=req.speed,
-                split_pattern=r'\n+'
-            ):
-                audio_chunks.append(audio)
-            
+            audio_chunks = list(kokoro_segments(req, split_pattern=r'\n+'))
             if not audio_chunks:
-                raise HTTPException(500, "Keine Audio-Daten generiert")
-            
+                raise RuntimeError("Keine Audio-Daten generiert")
+        
             # Combine chunks
-            full_audio = np.concatenate([chunk[0] if len(chunk.shape) > 1 else chunk for chunk in audio_chunks])
-            
+            full_audio = np.concatenate(audio_chunks)
+        
         elif model_data["type"] == "marvis":
-            from mlx_audio.tts.generate import generate_audio
-            
-            # Marvis mit Reference Audio
+            # Geladenes Modell direkt nutzen - kein generate_audio(), kein Temp-File
             custom_voice_path = VOICES_DIR / f"{req.voice}.wav"
-            
-            # Generate to temp file
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                tmp_path = tmp.name
-            
-            generate_audio(
+            ref_audio, ref_text = None, None
+            if custom_voice_path.exists():
+                cache_reference_codes(model_data["model"])
+                ref_audio, ref_text = get_reference(custom_voice_path, model_data["model"])
+        
+            results = model_data["model"].generate(
                 text=req.text,
-                model_path=model_data["model_id"],
-                ref_audio=str(custom_voice_path) if custom_voice_path.exists() else None,
-                temperature=req.temperature,
-                top_p=req.top_p,
-                file_prefix=tmp_path.replace(".wav", ""),
+                ref_audio=ref_audio,
+                ref_text=ref_text,
+                sampler=marvis_sampler(req),
                 verbose=False
             )
+            audio_chunks = [np.asarray(result.audio, dtype=np.float32) for result in results]
+            if not audio_chunks:
+                raise RuntimeError("Keine Audio-Daten generiert")
+            full_audio = np.concatenate(audio_chunks)
+    
+    return full_audio
+
+
+@app.post("/tts")
+async def text_to_speech(req: TTSRequest, http_request: Request):
+    """Generiere Audio aus Text"""
+    try:
+        fmt = negotiate_format(req.format, http_request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    try:
+        with track_request(len(req.text), "mlx", http_request.headers.get(TRACE_HEADER)) as metrics:
+            # Lazy Load (Marvis: Minuten) und Synthese im Executor - /live, /ready und /health antworten weiter
+            with metrics.phase("inference"):
+                full_audio = await asyncio.get_running_loop().run_in_executor(None, synthesize, req)
+            metrics.audio_seconds = len(full_audio) / SAMPLE_RATE
             
-            # Read generated audio
-            full_audio, sr = sf.read(tmp_path)
-            os.unlink(tmp_path)
-        
-        # Convert to WAV bytes
-        buffer = io.BytesIO()
-        sf.write(buffer, full_audio, 24000, format='WAV')
-        buffer.seek(0)
-        
-        return Response(content=buffer.read(), media_type="audio/wav")
+            with metrics.phase("encoding"):
+                data = await encode_audio_async(full_audio, SAMPLE_RATE, fmt)
+            return Response(content=data, media_type=media_type(fmt))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, str(e))
 
 
+@app.post("/tts/stream")
+async def text_to_speech_stream(req: TTSRequest, http_request: Request):
+    """Kokoro als WAV-Stream (16 bit, unbekannte Laenge): jeder Satz geht
+    als PCM raus, sobald die Pipeline ihn liefert. Mit format pcm16/pcmf16
+    als pcm_wire-Frames statt WAV.
+    """
+    if req.model != "kokoro":
+        raise HTTPException(400, "Streaming nur mit Kokoro")
+    
+    fmt = stream_format(req.format, http_request.headers.get("accept"))
+    
+    async def stream():
+        loop = asyncio.get_running_loop()
+        yield stream_header(SAMPLE_RATE, fmt)
+        try:
+            with track_request(len(req.text), "mlx", http_request.headers.get(TRACE_HEADER)) as metrics:
+                segments = kokoro_segments(req, split_pattern=SENTENCE_SPLIT)
+                while True:
+                    with metrics.phase("inference"):
+                        audio = await loop.run_in_executor(None, next, segments, None)
+                    if audio is None:
+                        break
+                    metrics.audio_seconds += len(audio) / SAMPLE_RATE
+                    yield pcm_frame(audio, fmt)
+        except Exception as e:
+            logger.error(f"TTS stream error: {e}")
+    
+    return StreamingResponse(stream(), media_type=media_type(fmt))
+
+
+async def prepare():
+    """Modelle vorladen und aufwaermen - /live antwortet sofort, /ready danach"""
+    loop = asyncio.get_running_loop()
+    try:
+        for name in PRELOAD_MODELS:
+            if name not in available_models():
+                logger.warning(f"Preload skipped: {name} not available with backend {BACKEND}")
+                continue
+            readiness.set_stage(f"loading_{name}")
+            start = time.time()
+            await loop.run_in_executor(None, load_model, name)
+            readiness.record(f"load_{name}", time.time() - start)
+            
+            if WARMUP:
+                readiness.set_stage(f"warmup_{name}")
+                start = time.time()
+                await loop.run_in_executor(None, synthesize, TTSRequest(text=WARMUP_TEXT, model=name))
+                readiness.record(f"warmup_{name}", time.time() - start)
+            
+            if name == "kokoro" and KOKORO_WARM_VOICES:
+                readiness.set_stage("loading_kokoro_voices")
+                start = time.time()
+                await loop.run_in_executor(None, warm_kokoro_voices)
+                readiness.record("kokoro_voices", time.time() - start)
+        
+        readiness.mark_ready()
+    except Exception as e:
+        readiness.mark_failed(e)
+
+
+@app.on_event("startup")
+async def startup():
+    # Referenz halten, sonst kann der Garbage Collector den Task mittendrin einsammeln
+    app.state.prepare_task = asyncio.create_task(prepare())
+
+
 @app.post("/clone")
 async def clone_voice(name: str, audio: bytes):
     """Speichere Reference Audio fuer Voice Cloning"""
@@ -166,7 +562,10 @@ async def clone_voice(name: str, audio: bytes):
         if len(data.shape) > 1:
             data = data.mean(axis=1)
         
-        # Speichere
+        # Speichere - altes Transkript gehoert zur alten Aufnahme
+        voice_path.with_suffix(".txt").unlink(missing_ok=True)
+        with ref_audio_lock:
+            ref_audio_cache.pop(str(voice_path), None)
         sf.write(voice_path, data, 24000)
         
         return {"status": "ok", "voice": name}
@@ -189,24 +588,49 @@ async def list_voices():
     
     return {
         "voices": voices,
-        "models": list(AVAILABLE_MODELS.keys()),
+        "models": available_models(),
         "languages": {"a": "American English", "b": "British English"}
     }
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return metrics_response()
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10):
+    """Python-Stacks aller Threads fuer seconds abtasten, Collapsed-Stack-Format"""
+    return await profile_response(request, seconds, PROFILE_TOKEN, "mlx")
+
+
+@app.get("/live")
+async def live():
+    return readiness.live()
+
+
+@app.get("/ready")
+async def ready():
+    return readiness.ready_response()
+
+
 @app.get("/health")
 async def health():
     """Health Check"""
-    loaded = list(models.keys())
+    with registry.lock:
+        loaded = list(registry.entries)
+        kokoro_pipelines = sorted(pipelines)
     return {
         "status": "ok",
-        "engine": "mlx-audio",
-        "device": "Apple Silicon (MPS)",
+        "ready": readiness.ready,
+        "engine": "onnxruntime" if BACKEND == "onnx" else "mlx-audio",
+        "device": f"CPU ({ONNX_THREADS or 'default'} threads)" if BACKEND == "onnx" else "Apple Silicon (MPS)",
         "models_loaded": loaded,
-        "available_models": list(AVAILABLE_MODELS.keys())
+        "kokoro_pipelines": kokoro_pipelines,
+        "available_models": available_models(),
+        "memory": registry.health()
     }
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8768)
+    serve(app, 8768, UDS)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Internes Audioformat zwischen Engine-Servern und Hub: rohes PCM mit Mini-Header
+
+    application/x-tts-pcm; encoding=int16     (oder encoding=float16)
+
+12 Byte Header (Magic "TPCM", Version, Encoding, Kanaele, Samplerate), danach
+nur noch Samples, little endian, Kanaele verschraenkt. Im Stream kommen die
+Samples in beliebig grossen Frames hinterher - keine Laengenangabe noetig.
+Container (WAV fuer Browser, MP3/Opus fuer Clients) baut erst der Hub am Rand.
+WAV von fremden Engines (Kokoro, OpenAudio) liest der Hub ebenfalls hier ein,
+egal ob 8/16/24/32 bit oder float - heraus kommt immer int16.
+Nur Standardbibliothek: der Hub hat kein NumPy.
+"""
+
+import itertools
+import struct
+from typing import Optional
+
+MEDIA_TYPE = "application/x-tts-pcm"
+MAGIC = b"TPCM"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHI")  # Magic, Version, Encoding, Kanaele, Samplerate
+HEADER_SIZE = HEADER.size
+
+# Encoding -> (Code im Header, Bytes pro Sample)
+ENCODINGS = {"int16": (1, 2), "float16": (2, 2)}
+ENCODING_NAMES = {code: name for name, (code, _) in ENCODINGS.items()}
+
+# Was der Hub von den Engines haben will; alte Server ignorieren das und liefern WAV
+ACCEPT = f"{MEDIA_TYPE}; encoding=int16, audio/wav;q=0.5"
+
+WAV_MEDIA_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+# (Format-Tag, Bits) im fmt-Chunk -> Encoding; 1 = PCM, 3 = IEEE float
+WAV_ENCODINGS = {(1, 8): "uint8", (1, 16): "int16", (1, 24): "int24", (1, 32): "int32",
+                 (3, 32): "float32", (3, 64): "float64"}
+SAMPLE_WIDTHS = {"uint8": 1, "int16": 2, "float16": 2, "int24": 3, "int32": 4, "float32": 4, "float64": 8}
+WAV_HEADER_LIMIT = 64 * 1024  # so viel Header (LIST, bext, ...) vor dem data-Chunk, dann Abbruch
+_UINT8_HIGH_BYTE = bytes(b ^ 0x80 for b in range(256))
+
+
+def content_type(encoding: str = "int16") -> str:
+    return f"{MEDIA_TYPE}; encoding={encoding}"
+
+
+def is_pcm(content_type_header: str) -> bool:
+    return (content_type_header or "").split(";")[0].strip().lower() == MEDIA_TYPE
+
+
+def is_wav(content_type_header: str) -> bool:
+    return (content_type_header or "").split(";")[0].strip().lower() in WAV_MEDIA_TYPES
+
+
+def header(sample_rate: int, channels: int = 1, encoding: str = "int16") -> bytes:
+    return HEADER.pack(MAGIC, VERSION, ENCODINGS[encoding][0], channels, sample_rate)
+
+
+def parse_header(data: bytes) -> tuple[int, int, str]:
+    """Header -> (Samplerate, Kanaele, Encoding); ValueError bei kaputtem Header"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("PCM header truncated")
+    magic, version, code, channels, sample_rate = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or code not in ENCODING_NAMES:
+        raise ValueError("Not a TPCM v1 stream")
+    return sample_rate, channels, ENCODING_NAMES[code]
+
+
+def wav_header(sample_rate: int, channels: int = 1, data_bytes: int = 0xFFFFFFFF) -> bytes:
+    """WAV-Header fuer 16-bit PCM; ohne data_bytes fuer Streams unbekannter Laenge
+    (Groessen = 0xFFFFFFFF - Browser und ffmpeg spielen so einen Stream ab, waehrend er waechst)"""
+    block_align = channels * 2
+    riff_size = 0xFFFFFFFF if data_bytes == 0xFFFFFFFF else 36 + data_bytes
+    return b"".join([
+        b"RIFF", riff_size.to_bytes(4, "little"), b"WAVE",
+        b"fmt ", (16).to_bytes(4, "little"),
+        (1).to_bytes(2, "little"),  # PCM
+        channels.to_bytes(2, "little"),
+        sample_rate.to_bytes(4, "little"),
+        (sample_rate * block_align).to_bytes(4, "little"),
+        block_align.to_bytes(2, "little"),
+        (16).to_bytes(2, "little"),
+        b"data", data_bytes.to_bytes(4, "little"),
+    ])
+
+
+def float16_to_int16(samples: bytes) -> bytes:
+    """float16-Samples -> int16 (geclippt), ohne NumPy"""
+    return to_int16(samples, "float16")
+
+
+def to_int16(samples: bytes, encoding: str) -> bytes:
+    """Samples in encoding -> int16; Floats werden geclippt, Ganzzahlen auf die oberen 16 bit gekuerzt"""
+    if encoding == "int16":
+        return bytes(samples)
+    width = SAMPLE_WIDTHS[encoding]
+    n = len(samples) // width
+    data = bytes(samples[:n * width])
+    if encoding in ("float16", "float32", "float64"):
+        code = {"float16": "e", "float32": "f", "float64": "d"}[encoding]
+        values = struct.unpack(f"<{n}{code}", data)
+        return struct.pack(f"<{n}h", *(int(max(-1.0, min(1.0, v)) * 32767) for v in values))
+    out = bytearray(n * 2)
+    if encoding == "uint8":
+        out[1::2] = data.translate(_UINT8_HIGH_BYTE)  # unsigned mit Offset 128 -> high byte
+    else:
+        out[0::2] = data[width - 2::width]
+        out[1::2] = data[width - 1::width]
+    return bytes(out)
+
+
+def samples(data: bytes) -> bytes:
+    """Komplette PCM-Antwort -> nur die Samples als int16"""
+    encoding = parse_header(data)[2]
+    body = memoryview(data)[HEADER_SIZE:]
+    return float16_to_int16(body) if encoding == "float16" else body.tobytes()
+
+
+def to_wav(data: bytes) -> bytes:
+    """Komplette PCM-Antwort -> WAV-Datei (16 bit)"""
+    sample_rate, channels, _ = parse_header(data)
+    body = samples(data)
+    return wav_header(sample_rate, channels, len(body)) + body
+
+
+def parse_wav_header(data: bytes) -> Optional[tuple[int, int, str, int, int]]:
+    """WAV-Anfang -> (Samplerate, Kanaele, Encoding, Offset der Samples, Datenbytes).
+
+    None, solange der data-Chunk noch nicht angekommen ist; ValueError bei
+    kaputtem oder nicht unterstuetztem Format. WAVE_FORMAT_EXTENSIBLE wird
+    ueber die SubFormat-GUID aufgeloest.
+    """
+    if len(data) < 12:
+        return None
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+    pos, fmt = 12, None
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], int.from_bytes(data[pos + 4:pos + 8], "little")
+        if chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            return (*fmt, pos + 8, size)
+        if pos + 8 + size > len(data):
+            return None
+        if chunk_id == b"fmt ":
+            tag, channels, sample_rate = struct.unpack_from("<HHI", data, pos + 8)
+            bits = struct.unpack_from("<H", data, pos + 22)[0]
+            if tag == 0xFFFE and size >= 40:
+                tag = struct.unpack_from("<H", data, pos + 32)[0]  # GUID beginnt mit dem Format-Tag
+            if (tag, bits) not in WAV_ENCODINGS:
+                raise ValueError(f"Unsupported WAV format (tag {tag}, {bits} bit)")
+            fmt = (sample_rate, channels, WAV_ENCODINGS[tag, bits])
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def wav_samples(data: bytes) -> tuple[int, int, bytes]:
+    """Komplette WAV-Datei -> (Samplerate, Kanaele, int16-Samples)"""
+    header = parse_wav_header(data)
+    if header is None:
+        raise ValueError("WAV header truncated")
+    sample_rate, channels, encoding, offset, size = header
+    return sample_rate, channels, to_int16(memoryview(data)[offset:offset + size], encoding)
+
+
+def _int16_frames(first: bytes, frames, encoding: str):
+    """Frames duerfen Samples zerschneiden; angebrochene Samples warten auf den naechsten Frame"""
+    width = SAMPLE_WIDTHS[encoding]
+    rest = b""
+    for frame in itertools.chain([first], frames):
+        rest += frame
+        whole = len(rest) - len(rest) % width
+        if whole:
+            yield to_int16(rest[:whole], encoding)
+        rest = rest[whole:]
+
+
+def read_stream(frames) -> tuple:
+    """PCM-Frames (z.B. r.iter_content()) -> (Samplerate, Kanaele, Generator mit int16-Samples).
+
+    Liest nur den Header sofort, der Rest kommt beim Iterieren.
+    """
+    frames = iter(frames)
+    buffer = b""
+    while len(buffer) < HEADER_SIZE:
+        frame = next(frames, None)
+        if frame is None:
+            raise ValueError("PCM header truncated")
+        buffer += frame
+    sample_rate, channels, encoding = parse_header(buffer)
+    return sample_rate, channels, _int16_frames(buffer[HEADER_SIZE:], frames, encoding)
+
+
+def read_wav_stream(frames) -> tuple:
+    """Wie read_stream, fuer WAV-Streams beliebiger Samplebreite (Laengenangaben werden ignoriert)"""
+    frames = iter(frames)
+    buffer = b""
+    while (header := parse_wav_header(buffer)) is None:
+        frame = next(frames, None)
+        if frame is None or len(buffer) > WAV_HEADER_LIMIT:
+            raise ValueError("WAV header truncated")
+        buffer += frame
+    sample_rate, channels, encoding, offset, _ = header
+    return sample_rate, channels, _int16_frames(buffer[offset:], frames, encoding)
+
+
+def wav_stream(frames):
+    """PCM-Frames -> WAV-Stream unbekannter Laenge"""
+    sample_rate, channels, body = read_stream(frames)
+    yield wav_header(sample_rate, channels)
+    yield from body
@@ -0,0 +1,56 @@
+"""succeeded() gegen echte /talk-Seiten: Fehlerseite darf nicht als Erfolg zaehlen"""
+
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import stub_engines
+from hub_load import succeeded
+
+PORT_OFFSET = 23000
+
+
+@pytest.fixture(scope="module")
+def hub():
+    """Hub-Testclient gegen Stub-Engines (nur xtts), Fehlerquote je nach Stub"""
+    args = stub_engines.build_parser().parse_args(["--latency-ms", "0", "--jitter-ms", "0",
+                                                   "--port-offset", str(PORT_OFFSET)])
+    args.engines = ["xtts"]
+    os.environ.update(stub_engines.stub_urls(args.engines, PORT_OFFSET))
+    servers = stub_engines.start_stubs(args)
+    import app
+    app.SERVERS["xtts"]["url"] = os.environ["XTTS_URL"]
+    yield SimpleNamespace(client=app.app.test_client(), stub=servers[0])
+    for server in servers:
+        server.shutdown()
+
+
+def talk(hub, failure_rate):
+    hub.stub.args.failure_rate = failure_rate
+    r = hub.client.post("/talk", data={"text": "Hallo Welt.", "engine": "xtts", "voice": "sven",
+                                       "language": "de"})
+    return r.status_code, r.data
+
+
+def test_talk_error_page_is_not_success(hub):
+    status, body = talk(hub, 1.0)
+    assert status == 200
+    assert b'id="streamResult"' in body  # Streaming-Player steht auch auf der Fehlerseite
+    assert not succeeded("talk", status, body)
+
+
+def test_talk_audio_page_is_success(hub):
+    status, body = talk(hub, 0.0)
+    assert succeeded("talk", status, body)
+
+
+def test_talk_missing_text_is_not_success(hub):
+    r = hub.client.post("/talk", data={"text": "", "engine": "xtts"})
+    assert not succeeded("talk", r.status_code, r.data)
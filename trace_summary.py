@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Trace Summary - slow requests broken down by stage
+
+Reads the JSON-lines trace logs written by the hub and the engine servers
+(TRACE_DIR, default ~/tts-traces) and joins them by trace ID. Copy the
+engine logs next to the hub log when they run on another machine.
+
+Usage:
+    python trace_summary.py                        # 10 slowest requests
+    python trace_summary.py --slowest 25
+    python trace_summary.py --trace 3f9a1c2b7d4e5f60
+    python trace_summary.py --stats
+    python trace_summary.py ~/tts-traces /tmp/engine-traces/xtts.jsonl
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from tracing import TRACE_DIR
+
+PHASES = ("queue", "conditioning", "inference", "encoding")
+
+
+def load_spans(paths):
+    """All spans from the given files/directories, grouped by trace ID"""
+    files = []
+    for path in paths:
+        path = Path(path).expanduser()
+        files.extend(sorted(path.glob("*.jsonl")) if path.is_dir() else [path])
+
+    traces = defaultdict(list)
+    for f in files:
+        with open(f) as fh:
+            for line in fh:
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def root_span(spans):
+    """The hub request if present, otherwise the first engine request"""
+    roots = [s for s in spans if s["span"] == "request"]
+    hub = [s for s in roots if s["service"] == "hub"]
+    return (hub or roots or [None])[0]
+
+
+def breakdown(spans):
+    """Seconds per stage: hub-only time, network, engine phases"""
+    root = root_span(spans)
+    result = {"total": root["duration"] if root else 0.0}
+    engine_requests = [s for s in spans if s["span"] == "request" and s["service"] != "hub"]
+    upstream = [s for s in spans if s["span"] == "upstream"]
+
+    for phase in PHASES:
+        seconds = sum(s["duration"] for s in spans if s["span"] == phase and s["service"] != "hub")
+        if seconds:
+            result[phase] = seconds
+
+    engine_total = sum(s["duration"] for s in engine_requests)
+    if upstream:
+        upstream_total = sum(s["duration"] for s in upstream)
+        if engine_requests:
+            result["network"] = max(0.0, upstream_total - engine_total)
+        if root and root["service"] == "hub":
+            result["hub"] = max(0.0, root["duration"] - upstream_total)
+    return result
+
+
+def format_attrs(span):
+    skip = {"trace_id", "service", "span", "start", "duration"}
+    return " ".join(f"{k}={v}" for k, v in span.items() if k not in skip)
+
+
+def show_trace(trace_id, spans):
+    spans = sorted(spans, key=lambda s: s["start"])
+    t0 = spans[0]["start"]
+    print(f"Trace {trace_id}")
+    print(f"{'offset':>9} {'duration':>9}  {'service':<11} {'span':<13} details")
+    for s in spans:
+        print(f"{s['start'] - t0:>8.3f}s {s['duration']:>8.3f}s  {s['service']:<11} {s['span']:<13} {format_attrs(s)}")
+
+    print()
+    for stage, seconds in breakdown(spans).items():
+        print(f"  {stage:<13} {seconds:>8.3f}s")
+
+
+def show_slowest(traces, count):
+    rows = []
+    for trace_id, spans in traces.items():
+        root = root_span(spans)
+        if root:
+            rows.append((root["duration"], trace_id, root, breakdown(spans)))
+    rows.sort(key=lambda r: r[0], reverse=True)
+
+    stages = ("hub", "network") + PHASES
+    print(f"{'trace':<17} {'where':<22} {'total':>8} " + " ".join(f"{s:>12}" for s in stages))
+    for _, trace_id, root, parts in rows[:count]:
+        where = f"{root['service']}:{root.get('endpoint', root['span'])}"
+        cells = " ".join(f"{parts[s]:>11.2f}s" if s in parts else f"{'-':>12}" for s in stages)
+        print(f"{trace_id:<17} {where[:22]:<22} {parts['total']:>7.2f}s {cells}")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def show_stats(traces):
+    durations = defaultdict(list)
+    for spans in traces.values():
+        for s in spans:
+            durations[(s["service"], s["span"])].append(s["duration"])
+
+    print(f"{'service':<11} {'span':<13} {'count':>6} {'p50':>8} {'p95':>8} {'max':>8}")
+    for (service, span), values in sorted(durations.items()):
+        print(f"{service:<11} {span:<13} {len(values):>6} {percentile(values, 50):>7.2f}s "
+              f"{percentile(values, 95):>7.2f}s {max(values):>7.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize TTS request traces.")
+    parser.add_argument('paths', nargs='*', help=f'Trace files or directories (default: {TRACE_DIR})')
+    parser.add_argument('--trace', help='Show all spans of one trace ID')
+    parser.add_argument('--slowest', type=int, default=10, help='Number of slowest requests (default: 10)')
+    parser.add_argument('--stats', action='store_true', help='Duration percentiles per span')
+    args = parser.parse_args()
+
+    traces = load_spans(args.paths or [TRACE_DIR])
+    if not traces:
+        print("No traces found")
+        sys.exit(1)
+
+    if args.trace:
+        matches = [t for t in traces if t.startswith(args.trace)]
+        if not matches:
+            print(f"Trace {args.trace} not found")
+            sys.exit(1)
+        show_trace(matches[0], traces[matches[0]])
+    elif args.stats:
+        show_stats(traces)
+    else:
+        show_slowest(traces, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Request-Tracing fuer Hub und Engine-Server
+Der Hub vergibt die Trace-ID und schickt sie im Header X-Trace-Id mit; jeder
+Prozess schreibt seine Spans als JSON-Lines nach TRACE_DIR/<service>.jsonl.
+Standardmaessig aus (TRACE=1 schaltet ein). Ab TRACE_MAX_MB wird die Datei
+nach <service>.1.jsonl verschoben - hoechstens zwei Dateien pro Prozess.
+Nur Standardbibliothek - wird von app.py und engine_utils.py importiert.
+Auswertung: python trace_summary.py
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+TRACE_HEADER = "X-Trace-Id"
+TRACE_ENABLED = os.environ.get("TRACE", "0") == "1"
+TRACE_DIR = Path(os.environ.get("TRACE_DIR", str(Path.home() / "tts-traces")))
+TRACE_MAX_BYTES = int(float(os.environ.get("TRACE_MAX_MB", "64")) * 1024 * 1024)  # 0 = ohne Rotation
+
+_write_lock = threading.Lock()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Trace:
+    """Spans eines Requests in einem Prozess; write() haengt sie ans Log an.
+
+    start ist Wanduhrzeit (time.time), damit sich Hub- und Engine-Spans
+    nebeneinanderlegen lassen; Dauern kommen aus perf_counter.
+    """
+
+    def __init__(self, service: Optional[str], trace_id: Optional[str] = None):
+        self.service = service
+        self.trace_id = trace_id or new_trace_id()
+        self.spans = []
+
+    @staticmethod
+    def wall(perf: float) -> float:
+        """perf_counter-Zeitpunkt -> Wanduhrzeit"""
+        return time.time() - (time.perf_counter() - perf)
+
+    def add(self, name: str, start: float, duration: float, **attrs):
+        self.spans.append({"span": name, "start": round(start, 6), "duration": round(duration, 6), **attrs})
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start_wall = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start_wall, time.perf_counter() - start, **attrs)
+
+    def write(self):
+        if not TRACE_ENABLED or not self.service or not self.spans:
+            return
+        lines = "".join(
+            json.dumps({"trace_id": self.trace_id, "service": self.service, **span}, ensure_ascii=False) + "\n"
+            for span in self.spans
+        )
+        path = TRACE_DIR / f"{self.service}.jsonl"
+        with _write_lock:
+            TRACE_DIR.mkdir(parents=True, exist_ok=True)
+            if TRACE_MAX_BYTES and path.exists() and path.stat().st_size >= TRACE_MAX_BYTES:
+                os.replace(path, path.with_name(f"{self.service}.1.jsonl"))
+            with open(path, "a") as f:
+                f.write(lines)
@@ -26,7 +26,6 @@ Languages:
 """
 
 import argparse
-import requests
 import sys
 import os
 import tempfile
@@ -35,14 +34,20 @@ from pathlib import Path
 import re
 import time
 
-# Server configuration
+import unix_http
+
+# Server configuration (override per engine with XTTS_URL, KOKORO_URL, ...;
+# unix:///tmp/tts-xtts.sock reaches an engine on the same host via its socket)
 SERVERS = {
-    "kokoro": "http://10.200.0.12:8769",
-    "openaudio": "http://10.200.0.12:8770",
-    "xtts": "http://10.200.0.12:8766",
-    "chatterbox": "http://10.200.0.12:8767",
+    "kokoro": os.environ.get("KOKORO_URL", "http://10.200.0.12:8769"),
+    "openaudio": os.environ.get("OPENAUDIO_URL", "http://10.200.0.12:8770"),
+    "xtts": os.environ.get("XTTS_URL", "http://10.200.0.12:8766"),
+    "chatterbox": os.environ.get("CHATTERBOX_URL", "http://10.200.0.12:8767"),
 }
 
+# Keep-alive session for all engine calls, http:// and unix://
+engine_http = unix_http.session()
+
 # Voice presets
 VOICE_PRESETS = {
     "female": "af_heart",
@@ -123,7 +128,7 @@ def generate_tts_kokoro(text, voice="af_heart", speed=1.0):
         "speed": speed
     }
     
-    response = requests.post(url, json=payload, timeout=60)
+    response = engine_http.post(url, json=payload, timeout=60)
     if response.status_code == 200 and len(response.content) > 100:
         return response.content
     else:
@@ -141,7 +146,7 @@ def generate_tts_openaudio(text, voice="sven", temperature=0.3, top_p=0.7):
         "reference_id": voice
     }
     
-    response = requests.post(url, json=payload, timeout=180)
+    response = engine_http.post(url, json=payload, timeout=180)
     if response.status_code == 200 and len(response.content) > 100:
         return response.content
     else:
@@ -157,7 +162,7 @@ def generate_tts_xtts(text, voice="sven", language="en"):
         "language": language
     }
     
-    response = requests.post(url, json=payload, timeout=120)
+    response = engine_http.post(url, json=payload, timeout=120)
     if response.status_code == 200 and len(response.content) > 100:
         return response.content
     else:
@@ -175,7 +180,7 @@ def generate_tts_chatterbox(text, voice="sven", exaggeration=0.15, cfg_weight=0.
         "temperature": temperature
     }
     
-    response = requests.post(url, json=payload, timeout=180)
+    response = engine_http.post(url, json=payload, timeout=180)
     if response.status_code == 200 and len(response.content) > 100:
         return response.content
     else:
@@ -266,11 +271,12 @@ def check_server(engine):
     
     try:
         if engine == "openaudio":
-            r = requests.get(f"{url}/v1/health", timeout=3)
+            r = engine_http.get(f"{url}/v1/health", timeout=3)
         elif engine == "kokoro":
-            r = requests.get(f"{url}/", timeout=3)
+            r = engine_http.get(f"{url}/", timeout=3)
         else:
-            r = requests.get(f"{url}/health", timeout=3)
+            # Not ready (503) while the server is still loading or warming up
+            r = engine_http.get(f"{url}/ready", timeout=3)
         return r.status_code == 200
     except:
         return False
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+HTTP ueber Unix-Domain-Sockets fuer requests (Hub und CLI)
+Engine-URLs der Form unix:///pfad/zum/server.sock zeigen auf einen Engine-Server,
+der mit <ENGINE>_UDS zusaetzlich auf diesem Socket lauscht. Der Socket-Pfad endet
+auf .sock, alles danach ist der HTTP-Pfad: unix:///tmp/tts-xtts.sock/tts
+"""
+
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+SCHEME = "unix://"
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """unix:///tmp/x.sock/tts?a=1 -> ("/tmp/x.sock", "/tts?a=1")"""
+    rest = url[len(SCHEME):]
+    end = rest.find(".sock")
+    if not url.startswith(SCHEME) or end < 0:
+        raise requests.exceptions.InvalidURL(f"Expected unix:///path/to/server.sock[/path], got {url}")
+    end += len(".sock")
+    return rest[:end], rest[end:] or "/"
+
+
+class UnixConnection(HTTPConnection):
+    def __init__(self, *args, socket_path: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class UnixConnectionPool(HTTPConnectionPool):
+    ConnectionCls = UnixConnection
+
+    def __init__(self, socket_path: str, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.conn_kw["socket_path"] = socket_path
+
+
+class UnixAdapter(HTTPAdapter):
+    """Ein Connection-Pool pro Socket-Pfad, Keep-Alive wie bei TCP"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.unix_pools = {}
+        self.unix_lock = threading.Lock()
+
+    def _unix_pool(self, url: str) -> UnixConnectionPool:
+        socket_path, _ = split_url(url)
+        with self.unix_lock:
+            if socket_path not in self.unix_pools:
+                self.unix_pools[socket_path] = UnixConnectionPool(socket_path, maxsize=self._pool_maxsize)
+            return self.unix_pools[socket_path]
+
+    def get_connection(self, url, proxies=None):
+        return self._unix_pool(url)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._unix_pool(request.url)
+
+    def request_url(self, request, proxies):
+        return split_url(request.url)[1]
+
+    def close(self):
+        super().close()
+        with self.unix_lock:
+            for pool in self.unix_pools.values():
+                pool.close()
+            self.unix_pools.clear()
+
+
+def session() -> requests.Session:
+    """requests.Session fuer http:// und unix:// Engine-URLs"""
+    s = requests.Session()
+    s.mount(SCHEME, UnixAdapter())
+    return s
@@ -10,20 +10,30 @@ os.environ["MKL_NUM_THREADS"] = "16"
 
 import io
 import re
+import time
+import asyncio
+import platform
 import tempfile
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import torch
 import numpy as np
 
 DEVICE = torch.device("cpu")
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import soundfile as sf
 
+from engine_utils import (TRACE_HEADER, PhraseCache, Readiness, Trace, encode_audio_async, env_list, join_chunks,
+                          media_type, metrics_response, negotiate_format, profile_response, register_cache, serve,
+                          torch_ops, track_request)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -37,11 +47,38 @@ VOICES_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_CHARS = 200  # Sicher unter 250 Limit
 
+# Micro-Batching: Chunks paralleler Requests kurz sammeln und gemeinsam rechnen
+BATCH_WAIT_MS = float(os.environ.get("XTTS_BATCH_WAIT_MS", "10"))
+MAX_BATCH_SIZE = int(os.environ.get("XTTS_MAX_BATCH_SIZE", "8"))
+
+# "int8" = dynamische int8-Quantisierung der GPT-Linear-Layer beim Start
+QUANTIZE = os.environ.get("XTTS_QUANTIZE", "").lower()
+active_quantize = ""  # was tatsaechlich geladen ist - der TTS.api-Fallback bleibt fp32
+CACHE_DIR = Path.home() / "xtts-server" / "cache"
+
+# Cache fuer wiederkehrende Chunks (Begruessungen, Disclaimer, ...) - 0 = aus
+PHRASE_CACHE_MB = int(os.environ.get("XTTS_PHRASE_CACHE_MB", "512"))
+phrase_cache = PhraseCache(CACHE_DIR / "phrases", PHRASE_CACHE_MB * 1024 * 1024)
+register_cache("phrase", phrase_cache.stats)
+
+# Beim Start vorbereiten: Stimmen ("*" = alle) und eine Warmup-Synthese
+PRELOAD_VOICES = env_list("XTTS_PRELOAD_VOICES", "*")
+WARMUP = os.environ.get("XTTS_WARMUP", "1") == "1"
+WARMUP_TEXTS = ["Hallo, das ist ein kurzer Test.", "Die Stimme wird vorbereitet."]
+readiness = Readiness()
+
+# /debug/profile nur mit Token (Authorization: Bearer ...), ohne Token deaktiviert
+PROFILE_TOKEN = os.environ.get("XTTS_PROFILE_TOKEN", "")
+
+# Zusaetzlich auf einem Unix-Socket lauschen (z.B. /tmp/tts-xtts.sock), Hub-URL dann unix://...
+UDS = os.environ.get("XTTS_UDS", "")
+
 
 class TTSRequest(BaseModel):
     text: str
     voice: str = "default"
     language: str = "de"
+    format: Optional[str] = None  # wav, flac, opus, mp3, pcm16, pcmf16 - sonst Accept-Header
 
 
 def get_model_path():
@@ -98,35 +135,152 @@ def split_text(text: str, max_chars: int = MAX_CHARS) -> list[str]:
     return [c for c in chunks if c]
 
 
-@app.on_event("startup")
-async def load_model():
-    global xtts_model
+def _linearize_conv1d(module: torch.nn.Module):
+    """HF-GPT2 nutzt Conv1D statt nn.Linear - fuer quantize_dynamic umbauen"""
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except ImportError:
+        from transformers.modeling_utils import Conv1D
+    
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            # Conv1D.weight ist (in, out), nn.Linear.weight ist (out, in)
+            linear = torch.nn.Linear(child.weight.shape[0], child.weight.shape[1])
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _linearize_conv1d(child)
+
+
+def quantized_cache_path(model_path: Path) -> Path:
+    """Cache-Datei haengt an Checkpoint und Torch-Version"""
+    stat = (model_path / "model.pth").stat()
+    key = f"{stat.st_size}-{int(stat.st_mtime)}-{torch.__version__}".replace("+", "_")
+    return CACHE_DIR / f"xtts_gpt_int8_{key}.pt"
+
+
+def quantize_model(model, model_path: Path):
+    """Ersetzt model.gpt durch eine dynamisch int8-quantisierte Kopie.
+    
+    Nur der GPT: der HiFiGAN-Decoder besteht aus Conv1d/ConvTranspose1d, die quantize_dynamic
+    nicht abdeckt, und die Linear-Layer von Speaker-Encoder und Conditioning laufen nur einmal
+    pro Stimme (gecacht) - int8 braechte dort keine Zeit, nur Qualitaetsverlust im Embedding.
+    """
+    if platform.machine() == "arm64" and "qnnpack" in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = "qnnpack"
+    
+    cache_path = quantized_cache_path(model_path)
+    if cache_path.exists():
+        model.gpt = torch.load(cache_path, weights_only=False)
+        logger.info(f"Quantized GPT loaded from {cache_path.name}")
+        return model
+    
+    start = time.time()
+    _linearize_conv1d(model.gpt)
+    model.gpt = torch.ao.quantization.quantize_dynamic(model.gpt, {torch.nn.Linear}, dtype=torch.qint8)
+    logger.info(f"GPT quantized to int8 in {time.time() - start:.1f}s")
+    
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    torch.save(model.gpt, cache_path)
+    return model
+
+
+def build_model(quantize: str = QUANTIZE):
+    """Laedt XTTS v2, optional mit int8-quantisiertem GPT"""
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+    
+    model_path = get_model_path()
+    if not model_path:
+        if quantize:
+            raise RuntimeError(f"XTTS_QUANTIZE={quantize} braucht den lokalen Checkpoint, "
+                               f"der TTS.api-Fallback laesst sich nicht quantisieren")
+        from TTS.api import TTS
+        return TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+    
+    config = XttsConfig()
+    config.load_json(str(model_path / "config.json"))
+    
+    model = Xtts.init_from_config(config)
+    model.load_checkpoint(config, checkpoint_dir=str(model_path), eval=True)
+    
+    if quantize == "int8":
+        quantize_model(model, model_path)
+    return model
+
+
+def load_model():
+    global xtts_model, active_quantize
     
-    logger.info("Loading XTTS v2 on CPU")
+    logger.info(f"Loading XTTS v2 on CPU ({QUANTIZE or 'fp32'})")
     
     try:
-        from TTS.tts.configs.xtts_config import XttsConfig
-        from TTS.tts.models.xtts import Xtts
-        
-        model_path = get_model_path()
-        if not model_path:
-            from TTS.api import TTS
-            xtts_model = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
-            return
-        
-        config = XttsConfig()
-        config.load_json(str(model_path / "config.json"))
-        
-        xtts_model = Xtts.init_from_config(config)
-        xtts_model.load_checkpoint(config, checkpoint_dir=str(model_path), eval=True)
+        xtts_model = build_model()
+        active_quantize = QUANTIZE
         logger.info("XTTS v2 loaded")
             
     except Exception as e:
         logger.error(f"Load error: {e}")
         from TTS.api import TTS
         xtts_model = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+        active_quantize = ""
+        if QUANTIZE:
+            logger.warning(f"XTTS_QUANTIZE={QUANTIZE} ignoriert: Fallback-Modell laeuft in fp32")
+
+
+def preload_voice_paths() -> list[Path]:
+    if "*" in PRELOAD_VOICES:
+        return sorted(VOICES_DIR.glob("*.wav"))
+    paths = [VOICES_DIR / f"{name}.wav" for name in PRELOAD_VOICES]
+    return [p for p in paths if p.exists()]
+
+
+async def prepare():
+    """Modell, Stimmen und Warmup im Hintergrund - /live antwortet sofort, /ready danach"""
+    loop = asyncio.get_running_loop()
+    executor = batch_scheduler.executor  # gleicher Thread wie spaeter die Inferenz
+    
+    try:
+        readiness.set_stage("loading_model")
+        start = time.time()
+        await loop.run_in_executor(executor, load_model)
+        readiness.record("load_model", time.time() - start)
+        
+        readiness.set_stage("preloading_voices")
+        start = time.time()
+        voices = preload_voice_paths()
+        for path in voices:
+            await loop.run_in_executor(executor, get_voice_conditioning, str(path))
+        readiness.record("preload_voices", time.time() - start)
+        logger.info(f"Preloaded {len(voices)} voices")
+        
+        if WARMUP and voices:
+            # Zwei Chunks gleichzeitig, damit auch der Batch-Pfad aufgewaermt ist
+            readiness.set_stage("warmup")
+            start = time.time()
+            gpt_cond, spk_emb = get_voice_conditioning(str(voices[0]))
+            await asyncio.gather(*[
+                batch_scheduler.submit(text, "de", gpt_cond, spk_emb) for text in WARMUP_TEXTS
+            ])
+            readiness.record("warmup", time.time() - start)
+        elif WARMUP:
+            logger.warning("Warmup skipped: no voice available")
+        
+        readiness.mark_ready()
+    except Exception as e:
+        readiness.mark_failed(e)
 
 
+@app.on_event("startup")
+async def startup():
+    batch_scheduler.start()
+    logger.info(f"Batching: max {MAX_BATCH_SIZE} chunks, wait {BATCH_WAIT_MS} ms")
+    # Referenz halten, sonst kann der Garbage Collector den Task mittendrin einsammeln
+    app.state.prepare_task = asyncio.create_task(prepare())
+
+
+@torch_ops
 def get_voice_conditioning(voice_path: str):
     """Cache voice conditioning fuer schnellere Generierung"""
     if voice_path in gpt_cond_latent_cache:
@@ -138,17 +292,239 @@ def get_voice_conditioning(voice_path: str):
     return gpt_cond, spk_emb
 
 
+@dataclass
+class ChunkJob:
+    text: str
+    language: str
+    gpt_cond: torch.Tensor
+    spk_emb: torch.Tensor
+    future: asyncio.Future
+    started: float = 0.0  # perf_counter beim Rechenstart/-ende, fuer /metrics und Trace
+    finished: float = 0.0
+    batch_size: int = 0
+
+
+@torch_ops
+def synthesize_single(job: ChunkJob) -> np.ndarray:
+    out = xtts_model.inference(
+        text=job.text,
+        language=job.language,
+        gpt_cond_latent=job.gpt_cond,
+        speaker_embedding=job.spk_emb,
+    )
+    return out["wav"]
+
+
+@torch_ops
+@torch.inference_mode()
+def synthesize_batch(jobs: list[ChunkJob]) -> list[np.ndarray]:
+    """Ein gemeinsamer GPT-Generate-Lauf fuer mehrere Chunks gleicher Sprache.
+
+    Nachbau von Xtts.inference mit Batch > 1: Text-Tokens werden rechts mit
+    Stop-Tokens aufgefuellt und per attention_mask ausgeblendet, damit jede
+    Zeile exakt das Prompt-Layout eines Einzelaufrufs sieht. Latents und
+    HiFi-GAN laufen danach pro Chunk mit der jeweiligen Sprecher-Einbettung.
+    """
+    if len(jobs) == 1 or not hasattr(xtts_model, "gpt"):
+        return [synthesize_single(job) for job in jobs]
+    
+    gpt = xtts_model.gpt
+    config = xtts_model.config
+    language = jobs[0].language.split("-")[0]
+    
+    tokens = [
+        torch.IntTensor(xtts_model.tokenizer.encode(job.text.strip().lower(), lang=language))
+        for job in jobs
+    ]
+    max_len = max(t.shape[0] for t in tokens)
+    text_inputs = torch.full((len(jobs), max_len), gpt.stop_text_token, dtype=torch.int32)
+    for i, t in enumerate(tokens):
+        text_inputs[i, :t.shape[0]] = t
+    
+    cond = torch.cat([job.gpt_cond for job in jobs], dim=0)
+    cond_len = cond.shape[1]
+    gpt_inputs = gpt.compute_embeddings(cond, text_inputs)
+    
+    # Layout: [cond][start][text][stop][pad...][stop][start_audio]
+    # Das erste Pad-Token ist der Stop an der richtigen Position, der Rest wird maskiert
+    attention_mask = torch.ones_like(gpt_inputs)
+    for i, t in enumerate(tokens):
+        attention_mask[i, cond_len + 2 + t.shape[0]:cond_len + 2 + max_len] = 0
+    
+    codes = gpt.gpt_inference.generate(
+        gpt_inputs,
+        attention_mask=attention_mask,
+        bos_token_id=gpt.start_audio_token,
+        pad_token_id=gpt.stop_audio_token,
+        eos_token_id=gpt.stop_audio_token,
+        max_length=gpt.max_gen_mel_tokens + gpt_inputs.shape[-1],
+        do_sample=True,
+        temperature=config.temperature,
+        top_k=config.top_k,
+        top_p=config.top_p,
+        length_penalty=config.length_penalty,
+        repetition_penalty=config.repetition_penalty,
+        num_beams=1,
+    )[:, gpt_inputs.shape[1]:]
+    
+    wavs = []
+    for i, job in enumerate(jobs):
+        seq = codes[i:i + 1]
+        stops = (seq[0] == gpt.stop_audio_token).nonzero()
+        if len(stops):
+            seq = seq[:, :stops[0].item() + 1]
+        
+        text_tokens = tokens[i].unsqueeze(0)
+        latents = gpt(
+            text_tokens,
+            torch.tensor([text_tokens.shape[-1]]),
+            seq,
+            torch.tensor([seq.shape[-1] * gpt.code_stride_len]),
+            cond_latents=job.gpt_cond,
+            return_attentions=False,
+            return_latent=True,
+        )
+        wav = xtts_model.hifigan_decoder(latents, g=job.spk_emb)
+        wavs.append(wav.cpu().squeeze().numpy())
+    
+    return wavs
+
+
+class BatchScheduler:
+    """Sammelt Chunks ueber Requests hinweg und rechnet sie gebuendelt.
+
+    Das Modell laeuft in genau einem Worker-Thread; waehrend ein Batch rechnet,
+    laufen neue Chunks in der Queue auf und bilden den naechsten Batch.
+    """
+    
+    def __init__(self, wait_ms: float, max_batch: int):
+        self.wait = wait_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="xtts")
+        self.queue = None
+        self.task = None
+    
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+    
+    def enqueue(self, text: str, language: str, gpt_cond, spk_emb) -> ChunkJob:
+        job = ChunkJob(text, language, gpt_cond, spk_emb, asyncio.get_running_loop().create_future())
+        self.queue.put_nowait(job)
+        return job
+    
+    async def submit(self, text: str, language: str, gpt_cond, spk_emb) -> np.ndarray:
+        return await self.enqueue(text, language, gpt_cond, spk_emb).future
+    
+    async def _collect(self, jobs: list[ChunkJob]) -> list[ChunkJob]:
+        """Fuellt jobs direkt, damit bei einem Fehler klar ist, welche Jobs schon entnommen waren"""
+        loop = asyncio.get_running_loop()
+        jobs.append(await self.queue.get())
+        deadline = loop.time() + self.wait
+        while len(jobs) < self.max_batch:
+            if not self.queue.empty():
+                jobs.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                jobs.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return jobs
+    
+    async def _run(self):
+        """Endlosschleife; ein Fehler kostet nur die Jobs der betroffenen Runde, nicht den Scheduler"""
+        while True:
+            jobs = []
+            try:
+                await self._collect(jobs)
+                await self._dispatch(jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Scheduler error: {e}")
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+    
+    async def _dispatch(self, jobs: list[ChunkJob]):
+        loop = asyncio.get_running_loop()
+        groups = {}
+        for job in jobs:
+            groups.setdefault(job.language, []).append(job)
+        
+        for language, group in groups.items():
+            start = loop.time()
+            for job in group:
+                job.started = time.perf_counter()
+            try:
+                if self.max_batch == 1:
+                    wavs = [await loop.run_in_executor(self.executor, synthesize_single, group[0])]
+                else:
+                    wavs = await loop.run_in_executor(self.executor, synthesize_batch, group)
+            except Exception as e:
+                logger.error(f"Batch error: {e}")
+                for job in group:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+            
+            finished = time.perf_counter()
+            for job in group:
+                job.finished = finished
+                job.batch_size = len(group)
+            
+            chars = sum(len(job.text) for job in group)
+            elapsed = loop.time() - start
+            logger.info(f"  Batch [{language}]: {len(group)} chunks, {chars} chars in {elapsed:.1f}s")
+            for job, wav in zip(group, wavs):
+                if not job.future.done():
+                    job.future.set_result(wav)
+
+
+batch_scheduler = BatchScheduler(BATCH_WAIT_MS, MAX_BATCH_SIZE)
+
+
+@app.get("/live")
+async def live():
+    return readiness.live()
+
+
+@app.get("/ready")
+async def ready():
+    return readiness.ready_response()
+
+
 @app.get("/health")
 async def health():
     return {
         "status": "healthy",
+        "ready": readiness.ready,
         "model": "xtts_v2",
         "device": "cpu",
+        "quantization": active_quantize or "fp32",
+        "quantized": bool(active_quantize),
         "max_chars_per_chunk": MAX_CHARS,
+        "max_batch_size": MAX_BATCH_SIZE,
+        "batch_wait_ms": BATCH_WAIT_MS,
+        "phrase_cache": phrase_cache.stats(),
         "voices": [f.stem for f in VOICES_DIR.glob("*.wav")]
     }
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return metrics_response()
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10):
+    """Python-Stacks aller Threads plus torch-Operatoren der Inferenz fuer seconds abtasten, Collapsed-Stack-Format"""
+    return await profile_response(request, seconds, PROFILE_TOKEN, "xtts")
+
+
 @app.get("/voices")
 async def get_voices():
     return {
@@ -185,7 +561,7 @@ async def clone_voice(audio: UploadFile = File(...), name: str = Form(...)):
 
 
 @app.post("/tts")
-async def text_to_speech(request: TTSRequest):
+async def text_to_speech(request: TTSRequest, http_request: Request):
     if xtts_model is None:
         raise HTTPException(503, "Model not loaded")
     
@@ -194,42 +570,62 @@ async def text_to_speech(request: TTSRequest):
         raise HTTPException(400, f"Stimme '{request.voice}' nicht gefunden")
     
     try:
-        text = request.text.strip().replace("\n", " ").replace("\r", "")
-        chunks = split_text(text)
-        
-        logger.info(f"TTS: {len(text)} chars -> {len(chunks)} chunks")
-        
-        gpt_cond, spk_emb = get_voice_conditioning(str(voice_path))
-        
-        all_audio = []
-        for i, chunk in enumerate(chunks):
-            logger.info(f"  Chunk {i+1}/{len(chunks)}: {len(chunk)} chars")
+        fmt = negotiate_format(request.format, http_request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    text = request.text.strip().replace("\n", " ").replace("\r", "")
+    try:
+        trace_id = http_request.headers.get(TRACE_HEADER)
+        with track_request(len(text), "xtts", trace_id) as metrics:
+            with metrics.span("split_text"):
+                chunks = split_text(text)
             
-            out = xtts_model.inference(
-                text=chunk,
-                language=request.language,
-                gpt_cond_latent=gpt_cond,
-                speaker_embedding=spk_emb,
-            )
-            all_audio.append(out["wav"])
-        
-        # Chunks zusammenfuegen mit kleiner Pause
-        if len(all_audio) > 1:
-            pause = np.zeros(int(24000 * 0.15))  # 150ms Pause
-            combined = []
-            for i, audio in enumerate(all_audio):
-                combined.append(audio)
-                if i < len(all_audio) - 1:
-                    combined.append(pause)
-            final_audio = np.concatenate(combined)
-        else:
-            final_audio = all_audio[0]
-        
-        buffer = io.BytesIO()
-        sf.write(buffer, final_audio, 24000, format='WAV')
-        buffer.seek(0)
-        
-        return StreamingResponse(buffer, media_type="audio/wav")
+            logger.info(f"TTS: {len(text)} chars -> {len(chunks)} chunks")
+            
+            # Conditioning nutzt das Modell -> im Scheduler-Thread, nie parallel zur Inferenz
+            # und nicht im Event-Loop (eine kalte Stimme wuerde sonst alle Requests anhalten)
+            loop = asyncio.get_running_loop()
+            with metrics.phase("conditioning"):
+                gpt_cond, spk_emb = await loop.run_in_executor(
+                    batch_scheduler.executor, get_voice_conditioning, str(voice_path)
+                )
+            
+            # Bereits synthetisierte Chunks aus dem Phrase-Cache holen
+            voice_hash = await loop.run_in_executor(None, phrase_cache.voice_hash, voice_path)
+            params = {"model": "xtts_v2", "quantize": active_quantize}
+            keys = [phrase_cache.key(voice_hash, request.language, params, chunk) for chunk in chunks]
+            # FLAC-Dekodierung und Disk-IO im Thread-Pool, nicht im Event-Loop (Scheduler, andere Requests)
+            all_audio = await loop.run_in_executor(None, phrase_cache.get_many, keys)
+            missing = [i for i, audio in enumerate(all_audio) if audio is None]
+            
+            for i, chunk in enumerate(chunks):
+                cached = "" if i in missing else " (cached)"
+                logger.info(f"  Chunk {i+1}/{len(chunks)}: {len(chunk)} chars{cached}")
+            
+            # Fehlende Chunks einreihen - der Scheduler buendelt sie mit anderen Requests
+            submitted = time.perf_counter()
+            jobs = [batch_scheduler.enqueue(chunks[i], request.language, gpt_cond, spk_emb) for i in missing]
+            generated = await asyncio.gather(*[job.future for job in jobs])
+            if jobs:
+                # Bis der erste eigene Chunk rechnet = queue, danach inference
+                first = min(job.started for job in jobs)
+                metrics.add("queue", first - submitted, submitted)
+                metrics.add("inference", time.perf_counter() - first, first)
+                for job in jobs:
+                    metrics.trace.add("chunk", Trace.wall(job.started), job.finished - job.started,
+                                      chars=len(job.text), batch_size=job.batch_size)
+            for i, audio in zip(missing, generated):
+                all_audio[i] = audio
+            await loop.run_in_executor(None, phrase_cache.put_many, [(keys[i], all_audio[i]) for i in missing], 24000)
+            
+            # Chunks zusammenfuegen mit kleiner Pause (150ms)
+            final_audio = join_chunks(all_audio, 24000, 0.15)
+            metrics.audio_seconds = len(final_audio) / 24000
+            
+            with metrics.phase("encoding"):
+                data = await encode_audio_async(final_audio, 24000, fmt)
+            return Response(content=data, media_type=media_type(fmt))
     
     except Exception as e:
         logger.error(f"TTS error: {e}")
@@ -238,6 +634,23 @@ async def text_to_speech(request: TTSRequest):
         raise HTTPException(500, str(e))
 
 
+@app.post("/voices/{name}/warm")
+async def warm_voice(name: str):
+    """Conditioning einer Stimme vorab in den Cache laden (Hub-Sessions zu Beginn)"""
+    if xtts_model is None:
+        raise HTTPException(503, "Model not loaded")
+    
+    voice_path = VOICES_DIR / f"{name}.wav"
+    if not voice_path.exists():
+        raise HTTPException(404, f"Stimme '{name}' nicht gefunden")
+    
+    cached = str(voice_path) in gpt_cond_latent_cache
+    start = time.time()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(batch_scheduler.executor, get_voice_conditioning, str(voice_path))
+    return {"status": "warm", "voice": name, "cached": cached, "seconds": round(time.time() - start, 3)}
+
+
 @app.delete("/voices/{name}")
 async def delete_voice(name: str):
     voice_path = VOICES_DIR / f"{name}.wav"
@@ -253,5 +666,4 @@ async def delete_voice(name: str):
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8766)
+    serve(app, 8766, UDS)